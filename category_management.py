@@ -16,6 +16,10 @@ import os
 import tempfile
 import subprocess
 from product_management import DatabaseManager
+
+# Names of the products in one category, for the list beside the categories
+CATEGORY_PRODUCTS_QUERY = 'SELECT name FROM products WHERE category_id = ? ORDER BY name'
+
 class CategoryManagementDialog(QDialog):
     """Category Management Dialog for adding, editing, and deleting categories"""
     
@@ -23,6 +27,7 @@ class CategoryManagementDialog(QDialog):
         super().__init__(parent)
         self.parent_window = parent
         self.db_manager = parent.db_manager if parent else DatabaseManager()
+        self.category_counts = {}   # category id -> product count from the last load
         self.init_ui()
         self.load_categories()
         
@@ -306,10 +311,11 @@ class CategoryManagementDialog(QDialog):
     def load_categories(self):
         """Load all categories into the table"""
         try:
-            categories = self.db_manager.get_categories()
+            categories = self.db_manager.get_categories_with_counts()
+            self.category_counts = {cat_id: product_count for cat_id, _, _, product_count in categories}
             self.category_list.setRowCount(len(categories))
             
-            for row, (cat_id, cat_name, color_code) in enumerate(categories):
+            for row, (cat_id, cat_name, color_code, product_count) in enumerate(categories):
                 # ID (hidden)
                 self.category_list.setItem(row, 0, QTableWidgetItem(str(cat_id)))
                 
@@ -323,23 +329,14 @@ class CategoryManagementDialog(QDialog):
                 self.category_list.setItem(row, 2, color_item)
                 
                 # Product count
-                product_count = self.get_category_product_count(cat_id)
                 self.category_list.setItem(row, 3, QTableWidgetItem(str(product_count)))
             
         except Exception as e:
             QMessageBox.critical(self, "Error", f"Failed to load categories: {str(e)}")
     
     def get_category_product_count(self, category_id):
-        """Get number of products in a category"""
-        try:
-            conn = sqlite3.connect(self.db_manager.db_path)
-            cursor = conn.cursor()
-            cursor.execute('SELECT COUNT(*) FROM products WHERE category_id = ?', (category_id,))
-            count = cursor.fetchone()[0]
-            conn.close()
-            return count
-        except:
-            return 0
+        """Get number of products in a category, as counted when the list was loaded"""
+        return self.category_counts.get(category_id, 0)
     
     def filter_categories(self):
         """Filter categories based on search text"""
@@ -369,25 +366,22 @@ class CategoryManagementDialog(QDialog):
             self.edit_btn.setEnabled(True)
             self.delete_btn.setEnabled(True)
             
-            # Load products in this category
+            # Load products in this category (also refreshes the count)
             self.load_category_products(cat_id)
-            
-            # Update product count
-            count = self.get_category_product_count(cat_id)
-            self.product_count_label.setText(f"Products in this category: {count}")
     
     def load_category_products(self, category_id):
         """Load products for selected category"""
         try:
-            conn = sqlite3.connect(self.db_manager.db_path)
-            cursor = conn.cursor()
-            cursor.execute('SELECT name FROM products WHERE category_id = ?', (category_id,))
-            products = cursor.fetchall()
-            conn.close()
+            with self.db_manager.connections.read() as conn:
+                cursor = conn.execute(CATEGORY_PRODUCTS_QUERY, (category_id,))
+                products = [product_name for (product_name,) in cursor]
             
             self.products_list.clear()
-            for (product_name,) in products:
-                self.products_list.addItem(product_name)
+            self.products_list.addItems(products)
+            
+            # The names just read are the current count; keep the cached figure in step
+            self.category_counts[category_id] = len(products)
+            self.product_count_label.setText(f"Products in this category: {len(products)}")
                 
         except Exception as e:
             print(f"Error loading category products: {e}")
@@ -458,18 +452,20 @@ class CategoryManagementDialog(QDialog):
         
         if reply == QMessageBox.StandardButton.Yes:
             try:
-                conn = sqlite3.connect(self.db_manager.db_path)
-                cursor = conn.cursor()
-                
-                # First, update products to use General category (ID = 1)
-                if product_count > 0:
+                with self.db_manager.connections.transaction() as conn:
+                    cursor = conn.cursor()
+                    
+                    # First, update products to use General category (ID = 1); always run,
+                    # since the count shown may predate products added since
                     cursor.execute('UPDATE products SET category_id = 1 WHERE category_id = ?', 
                                  (self.current_category_id,))
+                    
+                    # Then delete the category
+                    cursor.execute('DELETE FROM categories WHERE id = ?', (self.current_category_id,))
                 
-                # Then delete the category
-                cursor.execute('DELETE FROM categories WHERE id = ?', (self.current_category_id,))
-                conn.commit()
-                conn.close()
+                # Re-home the cached products and drop the category, without a full reload
+                self.db_manager.catalog.reassign_category(self.current_category_id, 1)
+                self.db_manager.catalog.refresh_category(self.current_category_id)
                 
                 QMessageBox.information(self, "Success", f"Category '{cat_name}' deleted successfully!")
                 self.load_categories()
@@ -499,22 +495,22 @@ class CategoryManagementDialog(QDialog):
             return
         
         try:
-            conn = sqlite3.connect(self.db_manager.db_path)
-            cursor = conn.cursor()
-            
-            if self.current_category_id:
-                # Update existing category
-                cursor.execute('UPDATE categories SET name = ?, color_code = ? WHERE id = ?',
-                             (name, color, self.current_category_id))
-                message = f"Category '{name}' updated successfully!"
-            else:
-                # Add new category
-                cursor.execute('INSERT INTO categories (name, color_code) VALUES (?, ?)',
-                             (name, color))
-                message = f"Category '{name}' added successfully!"
+            with self.db_manager.connections.transaction() as conn:
+                cursor = conn.cursor()
+                
+                if self.current_category_id:
+                    # Update existing category
+                    cursor.execute('UPDATE categories SET name = ?, color_code = ? WHERE id = ?',
+                                 (name, color, self.current_category_id))
+                    message = f"Category '{name}' updated successfully!"
+                else:
+                    # Add new category
+                    cursor.execute('INSERT INTO categories (name, color_code) VALUES (?, ?)',
+                                 (name, color))
+                    self.current_category_id = cursor.lastrowid
+                    message = f"Category '{name}' added successfully!"
             
-            conn.commit()
-            conn.close()
+            self.db_manager.catalog.refresh_category(self.current_category_id)
             
             QMessageBox.information(self, "Success", message)
             self.load_categories()
@@ -0,0 +1,174 @@
+import sqlite3
+import threading
+import queue
+import atexit
+import os
+from contextlib import contextmanager
+
+# Connection tuning applied to every connection we open
+BUSY_TIMEOUT_MS = 5000
+STATEMENT_CACHE_SIZE = 256
+CONNECTION_PRAGMAS = (
+    'PRAGMA journal_mode = WAL',
+    'PRAGMA synchronous = NORMAL',
+    'PRAGMA cache_size = -16000',      # ~16 MB page cache per connection
+    'PRAGMA mmap_size = 268435456',    # 256 MB memory-mapped I/O
+    f'PRAGMA busy_timeout = {BUSY_TIMEOUT_MS}',
+    'PRAGMA temp_store = MEMORY',
+)
+
+
+class ConnectionManager:
+    """Long-lived SQLite connections: one shared writer plus a small pool of readers"""
+
+    def __init__(self, db_path, read_pool_size=4):
+        # Every sqlite3.connect(':memory:') is a separate empty database, so the
+        # writer and readers would never see each other's data
+        if db_path == ':memory:':
+            raise ValueError("ConnectionManager needs a database file, not ':memory:'")
+        self.db_path = db_path
+        self.read_pool_size = read_pool_size
+
+        # Writer is shared by every thread, serialized by the lock
+        self._write_lock = threading.RLock()
+        self._write_depth = 0
+        self._writer = self._open_connection()
+
+        # Readers are created lazily and handed out one thread at a time
+        self._readers = queue.LifoQueue()
+        self._reader_count = 0
+        self._all_readers = []
+        # The reader a thread has borrowed, so nested read() blocks share it
+        # instead of waiting on a pool the thread itself has emptied
+        self._borrowed = threading.local()
+        self._pool_lock = threading.Lock()
+        self._closed = False
+
+    def _open_connection(self):
+        """Open a tuned connection with a prepared-statement cache"""
+        conn = sqlite3.connect(
+            self.db_path,
+            timeout=BUSY_TIMEOUT_MS / 1000,
+            isolation_level=None,  # transactions are managed explicitly
+            check_same_thread=False,
+            cached_statements=STATEMENT_CACHE_SIZE
+        )
+        for pragma in CONNECTION_PRAGMAS:
+            conn.execute(pragma)
+        return conn
+
+    def _acquire_reader(self):
+        """Take an idle reader, opening a new one while the pool is not full"""
+        try:
+            return self._readers.get_nowait()
+        except queue.Empty:
+            pass
+
+        with self._pool_lock:
+            if self._reader_count < self.read_pool_size:
+                self._reader_count += 1
+                conn = self._open_connection()
+                self._all_readers.append(conn)
+                return conn
+
+        return self._readers.get()
+
+    @contextmanager
+    def read(self):
+        """Borrow a pooled read connection for the duration of the block"""
+        conn = getattr(self._borrowed, 'conn', None)
+        if conn is not None:
+            # Nested in another read() on this thread: the outer block returns it
+            yield conn
+            return
+
+        conn = self._acquire_reader()
+        self._borrowed.conn = conn
+        try:
+            yield conn
+        finally:
+            self._borrowed.conn = None
+            if not self._closed:
+                if conn.in_transaction:
+                    conn.rollback()
+                self._readers.put(conn)
+
+    @contextmanager
+    def transaction(self):
+        """Run the block in one write transaction; nested blocks become savepoints"""
+        with self._write_lock:
+            depth = self._write_depth
+            if depth == 0:
+                self._writer.execute('BEGIN IMMEDIATE')
+            else:
+                self._writer.execute(f'SAVEPOINT sp_{depth}')
+            self._write_depth += 1
+
+            try:
+                yield self._writer
+            except BaseException:
+                self._write_depth -= 1
+                if depth == 0:
+                    self._writer.execute('ROLLBACK')
+                else:
+                    self._writer.execute(f'ROLLBACK TO sp_{depth}')
+                    self._writer.execute(f'RELEASE sp_{depth}')
+                raise
+            else:
+                self._write_depth -= 1
+                if depth == 0:
+                    try:
+                        self._writer.execute('COMMIT')
+                    except BaseException:
+                        # A failed COMMIT (SQLITE_BUSY, disk full) can leave the
+                        # transaction open; never hand the writer on in that state
+                        if self._writer.in_transaction:
+                            self._writer.execute('ROLLBACK')
+                        raise
+                else:
+                    self._writer.execute(f'RELEASE sp_{depth}')
+
+    def close(self):
+        """Close every connection owned by this manager"""
+        if self._closed:
+            return
+        self._closed = True
+
+        # Includes readers still borrowed by other threads; their next query
+        # fails with ProgrammingError rather than keeping the database open
+        with self._pool_lock:
+            readers, self._all_readers = self._all_readers, []
+        for conn in readers:
+            conn.close()
+        while True:
+            try:
+                self._readers.get_nowait()
+            except queue.Empty:
+                break
+
+        with self._write_lock:
+            self._writer.close()
+
+
+_managers = {}
+_managers_lock = threading.Lock()
+
+
+def get_connection_manager(db_path="pos_database.db"):
+    """Return the process-wide connection manager for a database file"""
+    key = os.path.abspath(db_path)
+    with _managers_lock:
+        manager = _managers.get(key)
+        if manager is None or manager._closed:
+            manager = ConnectionManager(db_path)
+            _managers[key] = manager
+        return manager
+
+
+@atexit.register
+def close_all_connections():
+    """Close all managed connections so the WAL is checkpointed on exit"""
+    with _managers_lock:
+        for manager in _managers.values():
+            manager.close()
+        _managers.clear()
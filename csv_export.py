@@ -0,0 +1,140 @@
+import csv
+import gzip
+import os
+import threading
+from PyQt6.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal
+from PyQt6.QtWidgets import QProgressDialog, QMessageBox
+
+# Rows pulled from the cursor per fetchmany call; bounds memory for any export size
+EXPORT_BATCH_SIZE = 1000
+
+# File dialog filter offered by every export
+EXPORT_FILE_FILTER = "CSV Files (*.csv);;Compressed CSV (*.csv.gz);;All Files (*)"
+
+
+class ExportCancelled(Exception):
+    """Raised inside an export when the user cancels it"""
+
+
+class CsvExportJob:
+    """One export: a query streamed to a CSV file, gzip-compressed when the path ends in .gz
+
+    formatter turns a database row into the list of values written for it;
+    without one the row is written as it comes from the cursor.
+    """
+
+    def __init__(self, connections, file_path, headers, query, params=(), formatter=None,
+                 batch_size=EXPORT_BATCH_SIZE):
+        self.connections = connections
+        self.file_path = file_path
+        self.headers = headers
+        self.query = query
+        self.params = list(params)
+        self.formatter = formatter
+        self.batch_size = batch_size
+        self.compress = file_path.lower().endswith('.gz')
+
+    def open_output(self, path):
+        if self.compress:
+            return gzip.open(path, 'wt', newline='', encoding='utf-8')
+        return open(path, 'w', newline='', encoding='utf-8')
+
+    def run(self, progress=None, cancelled=None):
+        """Stream every row to the file and return the number written
+
+        Rows are written to a temporary file that replaces the target only when
+        the export completes, so a cancelled or failed export leaves nothing behind.
+        """
+        partial_path = self.file_path + '.part'
+        rows_written = 0
+        try:
+            with self.open_output(partial_path) as output, self.connections.read() as conn:
+                writer = csv.writer(output)
+                writer.writerow(self.headers)
+
+                cursor = conn.execute(self.query, self.params)
+                while True:
+                    if cancelled and cancelled():
+                        raise ExportCancelled()
+                    rows = cursor.fetchmany(self.batch_size)
+                    if not rows:
+                        break
+                    if self.formatter:
+                        rows = [self.formatter(row) for row in rows]
+                    writer.writerows(rows)
+                    rows_written += len(rows)
+                    if progress:
+                        progress(rows_written)
+                cursor.close()
+
+            os.replace(partial_path, self.file_path)
+            return rows_written
+        except BaseException:
+            if os.path.exists(partial_path):
+                os.remove(partial_path)
+            raise
+
+
+class ExportSignals(QObject):
+    """Signals emitted by an export task"""
+    progress = pyqtSignal(int)         # rows written so far
+    finished = pyqtSignal(str, int)    # file path, rows written
+    failed = pyqtSignal(str)           # error message
+    cancelled = pyqtSignal()
+
+
+class CsvExportTask(QRunnable):
+    """Run an export job on a pool thread; cancel() stops it at the next batch"""
+
+    def __init__(self, job):
+        super().__init__()
+        self.job = job
+        self.signals = ExportSignals()
+        self.cancel_requested = threading.Event()
+
+    def cancel(self):
+        self.cancel_requested.set()
+
+    def run(self):
+        try:
+            rows = self.job.run(self.signals.progress.emit, self.cancel_requested.is_set)
+        except ExportCancelled:
+            self.signals.cancelled.emit()
+        except Exception as e:
+            self.signals.failed.emit(str(e))
+        else:
+            self.signals.finished.emit(self.job.file_path, rows)
+
+
+def start_export(parent, job, description):
+    """Run an export in the background behind a cancellable progress dialog
+
+    description names what is exported ("Inventory", "Customers") in the
+    messages shown to the user. Returns the task; keep a reference to it
+    until it finishes.
+    """
+    progress_dialog = QProgressDialog(f"Exporting {description.lower()}...", "Cancel", 0, 0, parent)
+    progress_dialog.setWindowTitle(f"Export {description}")
+    progress_dialog.setMinimumDuration(500)
+
+    task = CsvExportTask(job)
+    progress_dialog.canceled.connect(task.cancel)
+
+    def on_progress(rows):
+        progress_dialog.setLabelText(f"Exporting {description.lower()}... {rows:,} rows")
+
+    def on_finished(file_path, rows):
+        progress_dialog.reset()
+        QMessageBox.information(parent, "Success", f"{description} exported to:\n{file_path}\n({rows:,} rows)")
+
+    def on_failed(message):
+        progress_dialog.reset()
+        QMessageBox.critical(parent, "Error", f"Failed to export {description.lower()}: {message}")
+
+    task.signals.progress.connect(on_progress)
+    task.signals.finished.connect(on_finished)
+    task.signals.failed.connect(on_failed)
+    task.signals.cancelled.connect(progress_dialog.reset)
+
+    QThreadPool.globalInstance().start(task)
+    return task
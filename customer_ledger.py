@@ -0,0 +1,101 @@
+from datetime import datetime
+
+# Direction each transaction type moves the amount the customer owes
+BALANCE_SIGNS = {
+    'SALE': 1,
+    'DEBIT': 1,
+    'PAYMENT': -1,
+    'CREDIT': -1,
+}
+
+# Columns of a ledger row, newest first in every page
+LEDGER_COLUMNS = '''
+    id, transaction_date, transaction_type, amount, description, reference_number, balance_after
+'''
+
+
+def post_transaction(cursor, customer_id, transaction_type, amount, description,
+                     reference_number=None, transaction_date=None):
+    """Apply a transaction to the customer's balance and record it with the resulting balance
+
+    Must run inside the caller's write transaction so the balance and the
+    ledger row commit together. Returns the balance after the transaction.
+    """
+    delta = BALANCE_SIGNS[transaction_type] * amount
+    cursor.execute('''
+        UPDATE customers SET current_balance = COALESCE(current_balance, 0) + ? WHERE id = ?
+    ''', (delta, customer_id))
+    cursor.execute('SELECT current_balance FROM customers WHERE id = ?', (customer_id,))
+    balance_after = cursor.fetchone()[0]
+
+    cursor.execute('''
+        INSERT INTO customer_transactions
+        (customer_id, transaction_type, amount, description, reference_number,
+         transaction_date, balance_after)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+    ''', (customer_id, transaction_type, amount, description, reference_number,
+          transaction_date or datetime.now().isoformat(), balance_after))
+    return balance_after
+
+
+def backfill_balances(cursor):
+    """Fill balance_after for rows posted before it existed
+
+    Works backwards from each customer's current balance in posting order, so
+    the newest row always agrees with customers.current_balance.
+    """
+    cursor.execute('''
+        SELECT ct.id, ct.customer_id, ct.transaction_type, ct.amount, COALESCE(c.current_balance, 0)
+        FROM customer_transactions ct
+        LEFT JOIN customers c ON c.id = ct.customer_id
+        ORDER BY ct.customer_id, ct.id DESC
+    ''')
+    updates = []
+    customer, balance = None, 0.0
+    for transaction_id, customer_id, transaction_type, amount, current_balance in cursor.fetchall():
+        if customer_id != customer:
+            customer, balance = customer_id, current_balance
+        updates.append((balance, transaction_id))
+        balance -= BALANCE_SIGNS.get(transaction_type, 1) * (amount or 0)
+    cursor.executemany('UPDATE customer_transactions SET balance_after = ? WHERE id = ?', updates)
+
+
+def ledger_page(conn, customer_id, date_from=None, date_to=None, before=None, limit=50):
+    """Newest-first ledger rows for a customer, optionally within a date window
+
+    date_to includes the whole day. before is the (transaction_date, id) of
+    the last row already shown, to continue with older rows.
+    """
+    query = f'''
+        SELECT {LEDGER_COLUMNS}
+        FROM customer_transactions
+        WHERE customer_id = ?
+    '''
+    params = [customer_id]
+
+    if date_from:
+        query += ' AND transaction_date >= ?'
+        params.append(date_from)
+
+    if date_to:
+        query += " AND transaction_date < DATE(?, '+1 day')"
+        params.append(date_to)
+
+    if before is not None:
+        query += ' AND (transaction_date, id) < (?, ?)'
+        params += list(before)
+
+    query += ' ORDER BY transaction_date DESC, id DESC LIMIT ?'
+    params.append(-1 if limit is None else limit)
+    return conn.execute(query, params).fetchall()
+
+
+def opening_balance(conn, customer_id, date_from):
+    """Balance owed before the first transaction on or after date_from"""
+    row = conn.execute('''
+        SELECT balance_after FROM customer_transactions
+        WHERE customer_id = ? AND transaction_date < ?
+        ORDER BY transaction_date DESC, id DESC
+        LIMIT 1
+    ''', (customer_id, date_from)).fetchone()
+    return row[0] if row else 0.0
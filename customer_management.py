@@ -17,6 +17,22 @@ import tempfile
 import subprocess
 import csv
 from product_management import DatabaseManager
+from product_search import like_pattern
+import customer_ledger
+from customer_reports import REPORT_TYPES, get_report_engine
+from csv_export import CsvExportJob, EXPORT_FILE_FILTER, start_export
+
+# Ledger rows loaded per page of the transaction history
+HISTORY_PAGE_SIZE = 50
+
+# Every customer for the table, by name
+CUSTOMER_LIST_QUERY = '''
+    SELECT id, name, contact_number, company_name, customer_type,
+           current_balance, last_purchase_date
+    FROM customers
+    ORDER BY name
+'''
+
 class CustomerManagementDialog(QDialog):
     """Customer Management Dialog"""
     
@@ -24,65 +40,9 @@ class CustomerManagementDialog(QDialog):
         super().__init__(parent)
         self.parent_window = parent
         self.db_manager = parent.db_manager if parent else DatabaseManager()
-        self.init_database_tables()
         self.init_ui()
         self.load_customers()
         
-    def init_database_tables(self):
-        """Initialize customer-related database tables"""
-        try:
-            conn = sqlite3.connect(self.db_manager.db_path)
-            cursor = conn.cursor()
-            
-            # Customers table
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS customers (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    name TEXT NOT NULL,
-                    contact_number TEXT,
-                    cnic_tax_id TEXT,
-                    company_name TEXT,
-                    address TEXT,
-                    email TEXT,
-                    credit_limit REAL DEFAULT 0.0,
-                    current_balance REAL DEFAULT 0.0,
-                    customer_type TEXT DEFAULT 'Regular' CHECK(customer_type IN ('Regular', 'VIP', 'Wholesale')),
-                    discount_percentage REAL DEFAULT 0.0,
-                    created_date TEXT DEFAULT CURRENT_TIMESTAMP,
-                    last_purchase_date TEXT,
-                    total_purchases REAL DEFAULT 0.0,
-                    notes TEXT
-                )
-            ''')
-            
-            # Customer transactions table
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS customer_transactions (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    customer_id INTEGER,
-                    transaction_type TEXT CHECK(transaction_type IN ('SALE', 'PAYMENT', 'CREDIT', 'DEBIT')),
-                    amount REAL,
-                    description TEXT,
-                    reference_number TEXT,
-                    transaction_date TEXT DEFAULT CURRENT_TIMESTAMP,
-                    created_by TEXT DEFAULT 'POS User',
-                    FOREIGN KEY (customer_id) REFERENCES customers (id)
-                )
-            ''')
-            
-            # Add customer_id to sales table if not exists
-            try:
-                cursor.execute('ALTER TABLE sales ADD COLUMN customer_id INTEGER')
-                cursor.execute('ALTER TABLE sales ADD COLUMN customer_name TEXT')
-            except sqlite3.OperationalError:
-                pass  # Columns already exist
-            
-            conn.commit()
-            conn.close()
-            
-        except Exception as e:
-            print(f"Error initializing customer tables: {e}")
-    
     def init_ui(self):
         self.setWindowTitle("Customer Management")
         self.setMinimumSize(1000, 700)
@@ -412,6 +372,25 @@ class CustomerManagementDialog(QDialog):
         
         history_layout.addLayout(history_title_layout)
         
+        # Date range for the history; the opening balance is what was owed before it
+        history_filter_layout = QHBoxLayout()
+        self.history_from = QLineEdit()
+        self.history_from.setPlaceholderText("YYYY-MM-DD")
+        self.history_to = QLineEdit()
+        self.history_to.setPlaceholderText("YYYY-MM-DD")
+        history_filter_btn = QPushButton("Filter")
+        history_filter_btn.clicked.connect(self.filter_customer_history)
+        self.opening_balance_label = QLabel("")
+        
+        history_filter_layout.addWidget(QLabel("From:"))
+        history_filter_layout.addWidget(self.history_from)
+        history_filter_layout.addWidget(QLabel("to"))
+        history_filter_layout.addWidget(self.history_to)
+        history_filter_layout.addWidget(history_filter_btn)
+        history_filter_layout.addStretch()
+        history_filter_layout.addWidget(self.opening_balance_label)
+        history_layout.addLayout(history_filter_layout)
+        
         # Transaction history table
         self.history_table = QTableWidget()
         self.history_table.setColumnCount(6)
@@ -438,6 +417,14 @@ class CustomerManagementDialog(QDialog):
         self.history_table.setAlternatingRowColors(True)
         
         history_layout.addWidget(self.history_table)
+        
+        # Older transactions are read a page at a time, continuing from the last row shown
+        self.load_older_btn = QPushButton("Load Older")
+        self.load_older_btn.clicked.connect(self.load_older_history)
+        self.load_older_btn.setEnabled(False)
+        history_layout.addWidget(self.load_older_btn)
+        self.history_before = None
+        
         history_group.setLayout(history_layout)
         right_layout.addWidget(history_group)
         
@@ -482,18 +469,8 @@ class CustomerManagementDialog(QDialog):
     def load_customers(self):
         """Load all customers into table"""
         try:
-            conn = sqlite3.connect(self.db_manager.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                SELECT id, name, contact_number, company_name, customer_type,
-                       current_balance, last_purchase_date
-                FROM customers
-                ORDER BY name
-            ''')
-            
-            customers = cursor.fetchall()
-            conn.close()
+            with self.db_manager.connections.read() as conn:
+                customers = conn.execute(CUSTOMER_LIST_QUERY).fetchall()
             
             self.customer_table.setRowCount(len(customers))
             
@@ -567,19 +544,15 @@ class CustomerManagementDialog(QDialog):
     def load_customer_details(self, customer_id):
         """Load customer details into form"""
         try:
-            conn = sqlite3.connect(self.db_manager.db_path)
-            cursor = conn.cursor()
-            
             # Get customer details
-            cursor.execute('''
-                SELECT name, contact_number, cnic_tax_id, company_name, address,
-                       email, credit_limit, current_balance, customer_type,
-                       discount_percentage, notes, total_purchases, last_purchase_date
-                FROM customers
-                WHERE id = ?
-            ''', (customer_id,))
-            
-            customer = cursor.fetchone()
+            with self.db_manager.connections.read() as conn:
+                customer = conn.execute('''
+                    SELECT name, contact_number, cnic_tax_id, company_name, address,
+                           email, credit_limit, current_balance, customer_type,
+                           discount_percentage, notes, total_purchases, last_purchase_date
+                    FROM customers
+                    WHERE id = ?
+                ''', (customer_id,)).fetchone()
             
             if customer:
                 (name, contact, cnic, company, address, email, credit_limit,
@@ -619,33 +592,40 @@ class CustomerManagementDialog(QDialog):
                 # Load transaction history
                 self.load_customer_history(customer_id)
             
-            conn.close()
-            
         except Exception as e:
             QMessageBox.critical(self, "Error", f"Failed to load customer details: {str(e)}")
     
-    def load_customer_history(self, customer_id):
-        """Load customer transaction history"""
+    def filter_customer_history(self):
+        """Reload the history of the selected customer for the date range entered"""
+        if self.current_customer_id:
+            self.load_customer_history(self.current_customer_id)
+    
+    def load_older_history(self):
+        """Append the next page of older transactions"""
+        if self.current_customer_id:
+            self.load_customer_history(self.current_customer_id, older=True)
+    
+    def load_customer_history(self, customer_id, older=False):
+        """Load a page of customer transactions, newest first, within the date range"""
         try:
-            conn = sqlite3.connect(self.db_manager.db_path)
-            cursor = conn.cursor()
+            date_from = self.history_from.text().strip() or None
+            date_to = self.history_to.text().strip() or None
+            with self.db_manager.connections.read() as conn:
+                transactions = customer_ledger.ledger_page(conn, customer_id, date_from, date_to,
+                                                           self.history_before if older else None,
+                                                           HISTORY_PAGE_SIZE)
+                opening = customer_ledger.opening_balance(conn, customer_id, date_from) if date_from else None
             
-            cursor.execute('''
-                SELECT transaction_date, transaction_type, amount, description,
-                       reference_number
-                FROM customer_transactions
-                WHERE customer_id = ?
-                ORDER BY transaction_date DESC
-                LIMIT 50
-            ''', (customer_id,))
+            first_row = self.history_table.rowCount() if older else 0
+            self.history_table.setRowCount(first_row + len(transactions))
+            if transactions:
+                self.history_before = (transactions[-1][1], transactions[-1][0])
+            self.load_older_btn.setEnabled(len(transactions) == HISTORY_PAGE_SIZE)
+            self.opening_balance_label.setText(
+                f"Opening Balance: ${opening:.2f}" if opening is not None else "")
             
-            transactions = cursor.fetchall()
-            conn.close()
-            
-            self.history_table.setRowCount(len(transactions))
-            
-            running_balance = 0
-            for row, (date, trans_type, amount, description, reference) in enumerate(transactions):
+            for row, (transaction_id, date, trans_type, amount, description, reference,
+                      balance_after) in enumerate(transactions, first_row):
                 # Format date
                 try:
                     date_obj = datetime.fromisoformat(date)
@@ -659,16 +639,12 @@ class CustomerManagementDialog(QDialog):
                 type_item = QTableWidgetItem(trans_type)
                 if trans_type == "SALE":
                     type_item.setForeground(QColor("#dc3545"))  # Red
-                    running_balance += amount
                 elif trans_type == "PAYMENT":
                     type_item.setForeground(QColor("#28a745"))  # Green
-                    running_balance -= amount
                 elif trans_type == "CREDIT":
                     type_item.setForeground(QColor("#007bff"))  # Blue
-                    running_balance -= amount
                 else:  # DEBIT
                     type_item.setForeground(QColor("#ffc107"))  # Yellow
-                    running_balance += amount
                 
                 self.history_table.setItem(row, 1, type_item)
                 
@@ -682,7 +658,10 @@ class CustomerManagementDialog(QDialog):
                 self.history_table.setItem(row, 2, amount_item)
                 self.history_table.setItem(row, 3, QTableWidgetItem(description or ""))
                 self.history_table.setItem(row, 4, QTableWidgetItem(reference or ""))
-                self.history_table.setItem(row, 5, QTableWidgetItem(f"${running_balance:.2f}"))
+                
+                # Balance stored when the transaction was posted
+                balance_text = f"${balance_after:.2f}" if balance_after is not None else ""
+                self.history_table.setItem(row, 5, QTableWidgetItem(balance_text))
             
         except Exception as e:
             print(f"Error loading customer history: {e}")
@@ -718,18 +697,15 @@ class CustomerManagementDialog(QDialog):
         
         if reply == QMessageBox.StandardButton.Yes:
             try:
-                conn = sqlite3.connect(self.db_manager.db_path)
-                cursor = conn.cursor()
-                
-                # Delete customer transactions first
-                cursor.execute('DELETE FROM customer_transactions WHERE customer_id = ?',
-                             (self.current_customer_id,))
-                
-                # Delete customer
-                cursor.execute('DELETE FROM customers WHERE id = ?', (self.current_customer_id,))
-                
-                conn.commit()
-                conn.close()
+                with self.db_manager.connections.transaction() as conn:
+                    cursor = conn.cursor()
+                    
+                    # Delete customer transactions first
+                    cursor.execute('DELETE FROM customer_transactions WHERE customer_id = ?',
+                                 (self.current_customer_id,))
+                    
+                    # Delete customer
+                    cursor.execute('DELETE FROM customers WHERE id = ?', (self.current_customer_id,))
                 
                 QMessageBox.information(self, "Success", f"Customer '{customer_name}' deleted successfully!")
                 self.load_customers()
@@ -756,33 +732,30 @@ class CustomerManagementDialog(QDialog):
             return
         
         try:
-            conn = sqlite3.connect(self.db_manager.db_path)
-            cursor = conn.cursor()
-            
-            if self.current_customer_id:
-                # Update existing customer
-                cursor.execute('''
-                    UPDATE customers SET
-                        name = ?, contact_number = ?, cnic_tax_id = ?, company_name = ?,
-                        address = ?, email = ?, credit_limit = ?, customer_type = ?,
-                        discount_percentage = ?, notes = ?
-                    WHERE id = ?
-                ''', (name, contact, cnic, company, address, email, credit_limit,
-                      customer_type, discount, notes, self.current_customer_id))
-                message = f"Customer '{name}' updated successfully!"
-            else:
-                # Add new customer
-                cursor.execute('''
-                    INSERT INTO customers (name, contact_number, cnic_tax_id, company_name,
-                                         address, email, credit_limit, customer_type,
-                                         discount_percentage, notes)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                ''', (name, contact, cnic, company, address, email, credit_limit,
-                      customer_type, discount, notes))
-                message = f"Customer '{name}' added successfully!"
+            with self.db_manager.connections.transaction() as conn:
+                cursor = conn.cursor()
             
-            conn.commit()
-            conn.close()
+                if self.current_customer_id:
+                    # Update existing customer
+                    cursor.execute('''
+                        UPDATE customers SET
+                            name = ?, contact_number = ?, cnic_tax_id = ?, company_name = ?,
+                            address = ?, email = ?, credit_limit = ?, customer_type = ?,
+                            discount_percentage = ?, notes = ?
+                        WHERE id = ?
+                    ''', (name, contact, cnic, company, address, email, credit_limit,
+                          customer_type, discount, notes, self.current_customer_id))
+                    message = f"Customer '{name}' updated successfully!"
+                else:
+                    # Add new customer
+                    cursor.execute('''
+                        INSERT INTO customers (name, contact_number, cnic_tax_id, company_name,
+                                             address, email, credit_limit, customer_type,
+                                             discount_percentage, notes)
+                        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    ''', (name, contact, cnic, company, address, email, credit_limit,
+                          customer_type, discount, notes))
+                    message = f"Customer '{name}' added successfully!"
             
             QMessageBox.information(self, "Success", message)
             self.load_customers()
@@ -814,6 +787,9 @@ class CustomerManagementDialog(QDialog):
         
         # Clear history
         self.history_table.setRowCount(0)
+        self.history_before = None
+        self.load_older_btn.setEnabled(False)
+        self.opening_balance_label.setText("")
         
         # Disable action buttons
         self.edit_customer_btn.setEnabled(False)
@@ -845,43 +821,44 @@ class CustomerManagementDialog(QDialog):
             self.load_customers()
     
     def export_customers(self):
-        """Export customers to CSV"""
+        """Export the customers matching the search and type filters to CSV in the background"""
         try:
             timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
             file_path, _ = QFileDialog.getSaveFileName(
                 self, "Export Customers", f"customers_{timestamp}.csv",
-                "CSV Files (*.csv);;All Files (*)"
+                EXPORT_FILE_FILTER
             )
             
             if file_path:
-                conn = sqlite3.connect(self.db_manager.db_path)
-                cursor = conn.cursor()
+                conditions = []
+                params = []
+                
+                # Same filters as the table, applied in SQL
+                search_text = self.search_input.text().strip()
+                if search_text:
+                    conditions.append("(name LIKE ? ESCAPE '\\' OR contact_number LIKE ? ESCAPE '\\'"
+                                      " OR company_name LIKE ? ESCAPE '\\')")
+                    params += [like_pattern(search_text)] * 3
                 
-                cursor.execute('''
+                type_filter = self.type_filter.currentText()
+                if type_filter != "All Types":
+                    conditions.append("COALESCE(customer_type, 'Regular') = ?")
+                    params.append(type_filter)
+                
+                query = f'''
                     SELECT name, contact_number, cnic_tax_id, company_name, address,
                            email, customer_type, credit_limit, current_balance,
                            discount_percentage, total_purchases, last_purchase_date, notes
                     FROM customers
+                    {'WHERE ' + ' AND '.join(conditions) if conditions else ''}
                     ORDER BY name
-                ''')
-                
-                customers = cursor.fetchall()
-                conn.close()
-                
-                with open(file_path, 'w', newline='', encoding='utf-8') as csvfile:
-                    writer = csv.writer(csvfile)
-                    
-                    # Write headers
-                    headers = ['Name', 'Contact', 'CNIC/Tax ID', 'Company', 'Address',
-                              'Email', 'Type', 'Credit Limit', 'Current Balance',
-                              'Discount %', 'Total Purchases', 'Last Purchase', 'Notes']
-                    writer.writerow(headers)
-                    
-                    # Write data
-                    for customer in customers:
-                        writer.writerow(customer)
+                '''
                 
-                QMessageBox.information(self, "Success", f"Customers exported to:\n{file_path}")
+                headers = ['Name', 'Contact', 'CNIC/Tax ID', 'Company', 'Address',
+                          'Email', 'Type', 'Credit Limit', 'Current Balance',
+                          'Discount %', 'Total Purchases', 'Last Purchase', 'Notes']
+                job = CsvExportJob(self.db_manager.connections, file_path, headers, query, params)
+                self.export_task = start_export(self, job, "Customers")
                 
         except Exception as e:
             QMessageBox.critical(self, "Error", f"Failed to export customers: {str(e)}")
@@ -998,34 +975,10 @@ class CustomerTransactionDialog(QDialog):
             description = f"{self.transaction_type.title()} transaction"
         
         try:
-            conn = sqlite3.connect(self.db_manager.db_path)
-            cursor = conn.cursor()
-            
-            # Add transaction
-            cursor.execute('''
-                INSERT INTO customer_transactions 
-                (customer_id, transaction_type, amount, description, reference_number)
-                VALUES (?, ?, ?, ?, ?)
-            ''', (self.customer_id, self.transaction_type, amount, description, reference))
-            
-            # Update customer balance
-            if self.transaction_type == "PAYMENT":
-                # Payment reduces balance (customer paid money)
-                cursor.execute('''
-                    UPDATE customers 
-                    SET current_balance = current_balance - ?
-                    WHERE id = ?
-                ''', (amount, self.customer_id))
-            else:  # CREDIT
-                # Credit reduces balance (we gave customer credit)
-                cursor.execute('''
-                    UPDATE customers 
-                    SET current_balance = current_balance - ?
-                    WHERE id = ?
-                ''', (amount, self.customer_id))
-            
-            conn.commit()
-            conn.close()
+            with self.db_manager.connections.transaction() as conn:
+                # Payments and credits both reduce what the customer owes
+                customer_ledger.post_transaction(conn.cursor(), self.customer_id, self.transaction_type,
+                                                 amount, description, reference)
             
             QMessageBox.information(self, "Success", 
                                   f"{self.transaction_type.title()} of ${amount:.2f} saved successfully!")
@@ -1042,6 +995,7 @@ class CustomerReportDialog(QDialog):
         super().__init__(parent)
         self.parent_window = parent
         self.db_manager = parent.db_manager if parent else parent.db_manager
+        self.report_engine = get_report_engine(self.db_manager.connections)
         self.init_ui()
         self.generate_report()
     
@@ -1056,12 +1010,7 @@ class CustomerReportDialog(QDialog):
         
         report_type_label = QLabel("Report Type:")
         self.report_type_combo = QComboBox()
-        self.report_type_combo.addItems([
-            "Summary Report",
-            "Top Customers",
-            "Outstanding Balances", 
-            "Customer Activity"
-        ])
+        self.report_type_combo.addItems(REPORT_TYPES)
         
         generate_btn = QPushButton("📊 Generate Report")
         generate_btn.clicked.connect(self.generate_report)
@@ -1100,194 +1049,10 @@ class CustomerReportDialog(QDialog):
         report_type = self.report_type_combo.currentText()
         
         try:
-            if report_type == "Summary Report":
-                self.generate_summary_report()
-            elif report_type == "Top Customers":
-                self.generate_top_customers_report()
-            elif report_type == "Outstanding Balances":
-                self.generate_outstanding_balances_report()
-            elif report_type == "Customer Activity":
-                self.generate_activity_report()
-                
+            self.report_text.setPlainText(self.report_engine.report(report_type))
         except Exception as e:
             QMessageBox.critical(self, "Error", f"Failed to generate report: {str(e)}")
     
-    def generate_summary_report(self):
-        """Generate customer summary report"""
-        conn = sqlite3.connect(self.db_manager.db_path)
-        cursor = conn.cursor()
-        
-        # Get summary statistics
-        cursor.execute('SELECT COUNT(*) FROM customers')
-        total_customers = cursor.fetchone()[0]
-        
-        cursor.execute('SELECT COUNT(*) FROM customers WHERE customer_type = "VIP"')
-        vip_customers = cursor.fetchone()[0]
-        
-        cursor.execute('SELECT COUNT(*) FROM customers WHERE current_balance > 0')
-        customers_with_balance = cursor.fetchone()[0]
-        
-        cursor.execute('SELECT SUM(current_balance) FROM customers WHERE current_balance > 0')
-        total_outstanding = cursor.fetchone()[0] or 0
-        
-        cursor.execute('SELECT SUM(total_purchases) FROM customers')
-        total_sales = cursor.fetchone()[0] or 0
-        
-        cursor.execute('SELECT AVG(total_purchases) FROM customers WHERE total_purchases > 0')
-        avg_purchase = cursor.fetchone()[0] or 0
-        
-        conn.close()
-        
-        report = f"""
-CUSTOMER SUMMARY REPORT
-Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
-{'='*50}
-
-CUSTOMER STATISTICS:
-• Total Customers: {total_customers:,}
-• VIP Customers: {vip_customers:,}
-• Regular Customers: {total_customers - vip_customers:,}
-
-FINANCIAL OVERVIEW:
-• Customers with Outstanding Balance: {customers_with_balance:,}
-• Total Outstanding Amount: ${total_outstanding:,.2f}
-• Total Sales to Date: ${total_sales:,.2f}
-• Average Purchase per Customer: ${avg_purchase:,.2f}
-
-CUSTOMER BREAKDOWN BY TYPE:
-"""
-        
-        # Add customer type breakdown
-        conn = sqlite3.connect(self.db_manager.db_path)
-        cursor = conn.cursor()
-        cursor.execute('''
-            SELECT customer_type, COUNT(*), SUM(total_purchases), SUM(current_balance)
-            FROM customers
-            GROUP BY customer_type
-            ORDER BY COUNT(*) DESC
-        ''')
-        
-        type_stats = cursor.fetchall()
-        conn.close()
-        
-        for cust_type, count, sales, balance in type_stats:
-            report += f"• {cust_type}: {count:,} customers, ${sales or 0:,.2f} sales, ${balance or 0:,.2f} balance\n"
-        
-        self.report_text.setPlainText(report)
-    
-    def generate_top_customers_report(self):
-        """Generate top customers report"""
-        conn = sqlite3.connect(self.db_manager.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            SELECT name, company_name, total_purchases, current_balance, customer_type
-            FROM customers
-            WHERE total_purchases > 0
-            ORDER BY total_purchases DESC
-            LIMIT 20
-        ''')
-        
-        top_customers = cursor.fetchall()
-        conn.close()
-        
-        report = f"""
-TOP CUSTOMERS REPORT
-Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
-{'='*70}
-
-TOP 20 CUSTOMERS BY TOTAL PURCHASES:
-
-{'Rank':<4} {'Customer Name':<20} {'Company':<15} {'Purchases':<12} {'Balance':<10} {'Type':<8}
-{'-'*70}
-"""
-        
-        for i, (name, company, purchases, balance, cust_type) in enumerate(top_customers, 1):
-            company_short = (company or "")[:14]
-            name_short = name[:19]
-            report += f"{i:<4} {name_short:<20} {company_short:<15} ${purchases:>10.2f} ${balance:>8.2f} {cust_type:<8}\n"
-        
-        self.report_text.setPlainText(report)
-    
-    def generate_outstanding_balances_report(self):
-        """Generate outstanding balances report"""
-        conn = sqlite3.connect(self.db_manager.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            SELECT name, company_name, contact_number, current_balance, credit_limit
-            FROM customers
-            WHERE current_balance > 0
-            ORDER BY current_balance DESC
-        ''')
-        
-        outstanding = cursor.fetchall()
-        conn.close()
-        
-        total_outstanding = sum(balance for _, _, _, balance, _ in outstanding)
-        
-        report = f"""
-OUTSTANDING BALANCES REPORT
-Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
-{'='*80}
-
-CUSTOMERS WITH OUTSTANDING BALANCES:
-Total Outstanding Amount: ${total_outstanding:,.2f}
-Number of Customers: {len(outstanding):,}
-
-{'Customer Name':<20} {'Company':<15} {'Contact':<12} {'Balance':<10} {'Credit Limit':<12}
-{'-'*80}
-"""
-        
-        for name, company, contact, balance, credit_limit in outstanding:
-            company_short = (company or "")[:14]
-            contact_short = (contact or "")[:11]
-            name_short = name[:19]
-            report += f"{name_short:<20} {company_short:<15} {contact_short:<12} ${balance:>8.2f} ${credit_limit:>10.2f}\n"
-        
-        self.report_text.setPlainText(report)
-    
-    def generate_activity_report(self):
-        """Generate customer activity report"""
-        conn = sqlite3.connect(self.db_manager.db_path)
-        cursor = conn.cursor()
-        
-        # Recent activity
-        cursor.execute('''
-            SELECT c.name, ct.transaction_date, ct.transaction_type, ct.amount, ct.description
-            FROM customer_transactions ct
-            JOIN customers c ON ct.customer_id = c.id
-            ORDER BY ct.transaction_date DESC
-            LIMIT 50
-        ''')
-        
-        recent_activity = cursor.fetchall()
-        conn.close()
-        
-        report = f"""
-CUSTOMER ACTIVITY REPORT
-Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
-{'='*80}
-
-RECENT CUSTOMER TRANSACTIONS (Last 50):
-
-{'Date':<12} {'Customer':<20} {'Type':<8} {'Amount':<10} {'Description':<25}
-{'-'*80}
-"""
-        
-        for name, date, trans_type, amount, description in recent_activity:
-            try:
-                date_obj = datetime.fromisoformat(date)
-                formatted_date = date_obj.strftime('%Y-%m-%d')
-            except:
-                formatted_date = str(date)[:10]
-            
-            name_short = name[:19]
-            desc_short = (description or "")[:24]
-            report += f"{formatted_date:<12} {name_short:<20} {trans_type:<8} ${amount:>8.2f} {desc_short:<25}\n"
-        
-        self.report_text.setPlainText(report)
-    
     def export_report(self):
         """Export report to file"""
         try:
@@ -1405,17 +1170,12 @@ class CustomerSelectionDialog(QDialog):
     def load_customers(self):
         """Load customers into list"""
         try:
-            conn = sqlite3.connect(self.db_manager.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                SELECT id, name, contact_number, company_name, current_balance
-                FROM customers
-                ORDER BY name
-            ''')
-            
-            customers = cursor.fetchall()
-            conn.close()
+            with self.db_manager.connections.read() as conn:
+                customers = conn.execute('''
+                    SELECT id, name, contact_number, company_name, current_balance
+                    FROM customers
+                    ORDER BY name
+                ''').fetchall()
             
             self.customer_list.setRowCount(len(customers))
             
@@ -0,0 +1,199 @@
+import threading
+import os
+from datetime import datetime
+
+from data_versions import data_version
+
+TOP_CUSTOMERS_LIMIT = 20
+ACTIVITY_LIMIT = 50
+
+# One pass over customers: per-type figures, with the totals across all types
+# taken by window functions over the grouped rows
+SUMMARY_QUERY = '''
+    SELECT customer_type, COUNT(*), SUM(total_purchases), SUM(current_balance),
+           SUM(COUNT(*)) OVER (),
+           SUM(SUM(customer_type = 'VIP')) OVER (),
+           SUM(SUM(current_balance > 0)) OVER (),
+           SUM(SUM(CASE WHEN current_balance > 0 THEN current_balance END)) OVER (),
+           SUM(SUM(total_purchases)) OVER (),
+           SUM(SUM(CASE WHEN total_purchases > 0 THEN total_purchases END)) OVER (),
+           SUM(SUM(total_purchases > 0)) OVER ()
+    FROM customers
+    GROUP BY customer_type
+    ORDER BY COUNT(*) DESC
+'''
+
+TOP_CUSTOMERS_QUERY = f'''
+    SELECT name, company_name, total_purchases, current_balance, customer_type
+    FROM customers
+    WHERE total_purchases > 0
+    ORDER BY total_purchases DESC
+    LIMIT {TOP_CUSTOMERS_LIMIT}
+'''
+
+# Total and count come with every row, so the header needs no second query
+OUTSTANDING_QUERY = '''
+    SELECT name, company_name, contact_number, current_balance, credit_limit,
+           SUM(current_balance) OVER (), COUNT(*) OVER ()
+    FROM customers
+    WHERE current_balance > 0
+    ORDER BY current_balance DESC
+'''
+
+ACTIVITY_QUERY = f'''
+    SELECT SUBSTR(ct.transaction_date, 1, 10), c.name, ct.transaction_type, ct.amount, ct.description
+    FROM customer_transactions ct
+    JOIN customers c ON ct.customer_id = c.id
+    ORDER BY ct.transaction_date DESC
+    LIMIT {ACTIVITY_LIMIT}
+'''
+
+
+def report_header(title, width):
+    return f"""
+{title}
+Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
+{'='*width}
+"""
+
+
+def summary_report(conn):
+    """Customer counts and financial totals, overall and by customer type"""
+    rows = conn.execute(SUMMARY_QUERY).fetchall()
+    if rows:
+        (total_customers, vip_customers, customers_with_balance, total_outstanding,
+         total_sales, purchases_sum, purchasers) = rows[0][4:]
+    else:
+        total_customers = vip_customers = customers_with_balance = purchasers = 0
+        total_outstanding = total_sales = purchases_sum = None
+    avg_purchase = purchases_sum / purchasers if purchasers else 0
+
+    lines = [f"""
+CUSTOMER STATISTICS:
+• Total Customers: {total_customers:,}
+• VIP Customers: {vip_customers:,}
+• Regular Customers: {total_customers - vip_customers:,}
+
+FINANCIAL OVERVIEW:
+• Customers with Outstanding Balance: {customers_with_balance:,}
+• Total Outstanding Amount: ${total_outstanding or 0:,.2f}
+• Total Sales to Date: ${total_sales or 0:,.2f}
+• Average Purchase per Customer: ${avg_purchase:,.2f}
+
+CUSTOMER BREAKDOWN BY TYPE:"""]
+    for cust_type, count, sales, balance in (row[:4] for row in rows):
+        lines.append(f"• {cust_type}: {count:,} customers, ${sales or 0:,.2f} sales, ${balance or 0:,.2f} balance")
+    return '\n'.join(lines) + '\n'
+
+
+def top_customers_report(conn):
+    """Customers with the highest total purchases"""
+    lines = [f"""
+TOP {TOP_CUSTOMERS_LIMIT} CUSTOMERS BY TOTAL PURCHASES:
+
+{'Rank':<4} {'Customer Name':<20} {'Company':<15} {'Purchases':<12} {'Balance':<10} {'Type':<8}
+{'-'*70}"""]
+    for i, (name, company, purchases, balance, cust_type) in enumerate(conn.execute(TOP_CUSTOMERS_QUERY), 1):
+        lines.append(f"{i:<4} {name[:19]:<20} {(company or '')[:14]:<15} ${purchases:>10.2f} "
+                     f"${balance:>8.2f} {cust_type:<8}")
+    return '\n'.join(lines) + '\n'
+
+
+def outstanding_balances_report(conn):
+    """Every customer who owes money, largest balance first"""
+    rows = conn.execute(OUTSTANDING_QUERY).fetchall()
+    total_outstanding, count = rows[0][5:] if rows else (0, 0)
+
+    lines = [f"""
+CUSTOMERS WITH OUTSTANDING BALANCES:
+Total Outstanding Amount: ${total_outstanding:,.2f}
+Number of Customers: {count:,}
+
+{'Customer Name':<20} {'Company':<15} {'Contact':<12} {'Balance':<10} {'Credit Limit':<12}
+{'-'*80}"""]
+    for name, company, contact, balance, credit_limit, _, _ in rows:
+        lines.append(f"{name[:19]:<20} {(company or '')[:14]:<15} {(contact or '')[:11]:<12} "
+                     f"${balance:>8.2f} ${credit_limit or 0:>10.2f}")
+    return '\n'.join(lines) + '\n'
+
+
+def activity_report(conn):
+    """Most recent customer ledger transactions"""
+    lines = [f"""
+RECENT CUSTOMER TRANSACTIONS (Last {ACTIVITY_LIMIT}):
+
+{'Date':<12} {'Customer':<20} {'Type':<8} {'Amount':<10} {'Description':<25}
+{'-'*80}"""]
+    for date, name, trans_type, amount, description in conn.execute(ACTIVITY_QUERY):
+        lines.append(f"{date or '':<12} {name[:19]:<20} {trans_type:<8} ${amount:>8.2f} "
+                     f"{(description or '')[:24]:<25}")
+    return '\n'.join(lines) + '\n'
+
+
+# Each report renders its body from the data; the header goes on in CustomerReportEngine.report
+REPORTS = {
+    "Summary Report": summary_report,
+    "Top Customers": top_customers_report,
+    "Outstanding Balances": outstanding_balances_report,
+    "Customer Activity": activity_report,
+}
+
+# Title and rule width of each report's header, which is stamped when the report is shown
+REPORT_HEADERS = {
+    "Summary Report": ("CUSTOMER SUMMARY REPORT", 50),
+    "Top Customers": ("TOP CUSTOMERS REPORT", 70),
+    "Outstanding Balances": ("OUTSTANDING BALANCES REPORT", 80),
+    "Customer Activity": ("CUSTOMER ACTIVITY REPORT", 80),
+}
+
+# Report names as offered in the report dialog, in display order
+REPORT_TYPES = list(REPORTS)
+
+
+class CustomerReportEngine:
+    """Customer report bodies, cached until the customer data changes"""
+
+    def __init__(self, connections):
+        self.connections = connections
+        self._lock = threading.Lock()
+        self._cache = {}    # report name -> (data version, report body)
+
+    def report(self, report_type):
+        """Text of a report under a fresh header; the body is recomputed only when
+        customers or their ledger changed"""
+        return report_header(*REPORT_HEADERS[report_type]) + self.body(report_type)
+
+    def body(self, report_type):
+        with self.connections.read() as conn:
+            # Read the version first: the report is then at least as new as the
+            # version it is cached under, so a concurrent write only costs a rerun
+            version = data_version(conn, 'customers')
+            with self._lock:
+                cached = self._cache.get(report_type)
+            if cached and version is not None and cached[0] == version:
+                return cached[1]
+
+            body = REPORTS[report_type](conn)
+
+        with self._lock:
+            self._cache[report_type] = (version, body)
+        return body
+
+    def invalidate(self):
+        with self._lock:
+            self._cache.clear()
+
+
+_engines = {}
+_engines_lock = threading.Lock()
+
+
+def get_report_engine(connections):
+    """Return the process-wide report engine for a connection manager's database"""
+    key = os.path.abspath(connections.db_path)
+    with _engines_lock:
+        engine = _engines.get(key)
+        if engine is None or engine.connections is not connections:
+            engine = CustomerReportEngine(connections)
+            _engines[key] = engine
+        return engine
@@ -0,0 +1,41 @@
+# Version counters bumped by triggers whenever the tables behind them change.
+# name -> tables whose inserts, updates and deletes bump that counter
+TRACKED_TABLES = {
+    'customers': ('customers', 'customer_transactions'),
+    'products': ('products',),
+}
+
+
+def version_triggers(name, table):
+    """Insert, update and delete triggers on table that bump the named counter"""
+    bump = f"UPDATE data_versions SET version = version + 1 WHERE name = '{name}';"
+    return [
+        f'''
+        CREATE TRIGGER IF NOT EXISTS {table}_{name}_version_{event.lower()}
+        AFTER {event} ON {table} BEGIN
+            {bump}
+        END
+        '''
+        for event in ('INSERT', 'UPDATE', 'DELETE')
+    ]
+
+
+def create_data_versions(cursor, tracked=TRACKED_TABLES):
+    """Create the counter table and the triggers for each name in tracked (name -> tables)"""
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS data_versions (
+        name TEXT PRIMARY KEY,
+        version INTEGER NOT NULL DEFAULT 0
+    )
+    ''')
+    for name, tables in tracked.items():
+        cursor.execute('INSERT OR IGNORE INTO data_versions (name) VALUES (?)', (name,))
+        for table in tables:
+            for statement in version_triggers(name, table):
+                cursor.execute(statement)
+
+
+def data_version(conn, name):
+    """Current value of a counter; changes whenever its tables have changed"""
+    row = conn.execute('SELECT version FROM data_versions WHERE name = ?', (name,)).fetchone()
+    return row[0] if row else None
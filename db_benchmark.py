@@ -0,0 +1,413 @@
+"""Time the database layer on a synthetic database and report latency percentiles as JSON
+
+Runs every DatabaseManager method, the queries behind the inventory, stock
+history, customer and category dialogs and the reports, and the sale commit
+path, each many times with varying arguments. Works on a copy of the database
+unless --in-place is given, since several benchmarks write. Build the database
+with synthetic_data.py first:
+
+    python synthetic_data.py /tmp/bench.db --products 200000
+    python db_benchmark.py /tmp/bench.db [--iterations N] [--output results.json]
+                                         [--baseline old.json [--threshold 1.25]]
+
+With --baseline, benchmarks whose median grew past threshold times the
+baseline's are listed and the exit status is 1.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+import connection_manager
+import customer_ledger
+import customer_reports
+import receipt_numbers
+import sales_rollups
+import synthetic_data
+from category_management import CATEGORY_PRODUCTS_QUERY
+from customer_management import CUSTOMER_LIST_QUERY
+from inventory_management import InventoryTableModel, StockHistoryModel, STOCK_FILTERS
+from inventory_report import InventoryReportEngine, get_inventory_report_engine
+from product_management import DatabaseManager
+
+DEFAULT_ITERATIONS = 50
+
+# Benchmarks that read whole tables run at most this many times
+HEAVY_ITERATIONS = 5
+
+PERCENTILES = (50, 90, 95, 99)
+
+
+def percentile(samples, p):
+    """p-th percentile of sorted samples, interpolating between the closest ranks"""
+    if len(samples) == 1:
+        return samples[0]
+    rank = (len(samples) - 1) * p / 100
+    low = int(rank)
+    high = min(low + 1, len(samples) - 1)
+    return samples[low] + (samples[high] - samples[low]) * (rank - low)
+
+
+def summarize(samples):
+    """Latency statistics in milliseconds for a list of durations in seconds"""
+    samples = sorted(sample * 1000 for sample in samples)
+    summary = {'n': len(samples), 'min_ms': round(samples[0], 4)}
+    for p in PERCENTILES:
+        summary[f'p{p}_ms'] = round(percentile(samples, p), 4)
+    summary['max_ms'] = round(samples[-1], 4)
+    summary['mean_ms'] = round(sum(samples) / len(samples), 4)
+    return summary
+
+
+def copy_database(source, target):
+    """Consistent copy of a database, including anything still in its WAL"""
+    src = sqlite3.connect(source)
+    dst = sqlite3.connect(target)
+    try:
+        src.backup(dst)
+    finally:
+        src.close()
+        dst.close()
+
+
+class BenchmarkContext:
+    """What the benchmarks need to know about the database to pick real arguments"""
+
+    def __init__(self, db_manager, rng):
+        self.db = db_manager
+        self.connections = db_manager.connections
+        self.rng = rng
+        with self.connections.read() as conn:
+            self.max_product_id = conn.execute('SELECT MAX(id) FROM products').fetchone()[0] or 1
+            self.max_customer_id = conn.execute('SELECT MAX(id) FROM customers').fetchone()[0] or 1
+            self.category_names = [row[0] for row in conn.execute('SELECT name FROM categories')]
+            self.stock_types = [row[0] for row in conn.execute('SELECT name FROM stock_types')] or ['Piece']
+            first_day, last_day = conn.execute('SELECT MIN(sale_date), MAX(sale_date) FROM sales').fetchone()
+        self.last_day = datetime.fromisoformat(last_day).date() if last_day else date.today()
+        self.first_day = datetime.fromisoformat(first_day).date() if first_day else self.last_day
+        self.created_products = []
+        self.sequence = 0
+
+    def product_id(self):
+        return synthetic_data.skewed(self.rng, self.max_product_id)
+
+    def barcode(self):
+        return synthetic_data.barcode(self.product_id())
+
+    def customer_id(self):
+        return synthetic_data.skewed(self.rng, self.max_customer_id)
+
+    def search_text(self):
+        words = [self.rng.choice(synthetic_data.WORDS) for _ in range(self.rng.randint(1, 2))]
+        # Partial last word, as the search runs while the cashier types
+        words[-1] = words[-1][:self.rng.randint(2, len(words[-1]))]
+        return ' '.join(words).lower()
+
+    def date_window(self, days):
+        """Random (from, to) ISO dates spanning the given number of days within the sales history"""
+        span = max((self.last_day - self.first_day).days - days, 0)
+        start = self.first_day + timedelta(days=self.rng.randint(0, span))
+        return start.isoformat(), (start + timedelta(days=days)).isoformat()
+
+    def unique(self, prefix):
+        self.sequence += 1
+        return f'{prefix} {os.getpid()}-{self.sequence}'
+
+    def order_lines(self, count):
+        """Order table lines for random products, as the till builds them"""
+        lines = []
+        for _ in range(count):
+            product = self.db.get_product_by_barcode(self.barcode())
+            quantity = self.rng.choice([1, 1, 2, 3, 5])
+            lines.append({'description': product[1], 'quantity': quantity, 'price': product[8],
+                          'total': quantity * product[8], 'barcode': product[2], 'product_id': product[0]})
+        return lines
+
+
+def sale_commit(ctx, lines):
+    """One checkout through DatabaseManager.save_sale, a third of them on a customer account"""
+    items = ctx.order_lines(lines)
+    subtotal = sum(item['total'] for item in items)
+    customer = None
+    if ctx.rng.random() < 0.3:
+        customer_id = ctx.customer_id()
+        customer = {'id': customer_id, 'name': f'Customer {customer_id}'}
+    sale_data = (ctx.db.next_receipt_number(), subtotal, 0.0, 0.0, subtotal, subtotal, 0.0,
+                 datetime.now().isoformat())
+    return lambda: ctx.db.save_sale(sale_data, items, customer)
+
+
+def new_product_data(ctx):
+    """A product_data tuple for DatabaseManager.save_product"""
+    return (ctx.unique('Benchmark product'), ctx.db.generate_barcode(), ctx.rng.choice(ctx.stock_types),
+            ctx.rng.randint(0, 500), 1, 100.0, 110.0, 125.0, 10, None, None, 'B1',
+            ctx.rng.randint(1, max(len(ctx.category_names), 1)), '', None, '')
+
+
+def existing_product_data(ctx):
+    """(product_data, id) that rewrites a product with its current values"""
+    product_id = ctx.product_id()
+    row = ctx.db.get_product(product_id)
+    return row[1:17], product_id
+
+
+def save_new_product(ctx):
+    data = new_product_data(ctx)
+
+    def run():
+        ctx.created_products.append(ctx.db.save_product(data))
+    return run
+
+
+def delete_created_product(ctx):
+    product_id = ctx.created_products.pop() if ctx.created_products else None
+    return lambda: ctx.db.delete_product(product_id)
+
+
+def inventory_first_page(ctx):
+    model = InventoryTableModel(ctx.connections)
+    search_text = ctx.search_text() if ctx.rng.random() < 0.5 else ""
+    category = ctx.rng.randint(1, len(ctx.category_names)) if ctx.category_names and ctx.rng.random() < 0.3 else None
+    stock_filter = ctx.rng.choice(list(STOCK_FILTERS))
+    return lambda: model.set_filters(search_text, category, stock_filter)
+
+
+def inventory_next_page(ctx):
+    model = InventoryTableModel(ctx.connections)
+    model.refresh()
+    for _ in range(ctx.rng.randint(0, 20)):
+        model.fetchMore()
+    return model.fetchMore
+
+
+def stock_history_for_product(ctx):
+    model = StockHistoryModel(ctx.connections)
+    product_id = ctx.product_id()
+    return lambda: model.set_filters(product_id=product_id)
+
+
+def stock_history_for_month(ctx):
+    model = StockHistoryModel(ctx.connections)
+    date_from, date_to = ctx.date_window(30)
+    return lambda: model.set_filters(date_from=date_from, date_to=date_to)
+
+
+def stock_history_next_page(ctx):
+    model = StockHistoryModel(ctx.connections)
+    model.refresh()
+    for _ in range(ctx.rng.randint(0, 20)):
+        model.fetchMore()
+    return model.fetchMore
+
+
+def read_query(ctx, function, *args):
+    """Run function(conn, *args) on a pooled reader, as the dialogs do"""
+    def run():
+        with ctx.connections.read() as conn:
+            result = function(conn, *args)
+            if isinstance(result, sqlite3.Cursor):
+                result.fetchall()
+    return run
+
+
+def hot_query(ctx, sql, params):
+    return read_query(ctx, lambda conn: conn.execute(sql, params).fetchall())
+
+
+def customer_ledger_page(ctx):
+    return read_query(ctx, customer_ledger.ledger_page, ctx.customer_id())
+
+
+def customer_opening_balance(ctx):
+    date_from, _ = ctx.date_window(0)
+    return read_query(ctx, customer_ledger.opening_balance, ctx.customer_id(), date_from)
+
+
+def customer_report(report_type):
+    return lambda ctx: read_query(ctx, customer_reports.REPORTS[report_type])
+
+
+def sales_report(group, days=365):
+    """Totals plus one breakdown for a date window, as the sales report dialog runs them"""
+    def setup(ctx):
+        date_from, date_to = ctx.date_window(days)
+        if group in sales_rollups.PERIODS:
+            query, params = sales_rollups.period_query(group, date_from, date_to)
+        else:
+            query, params = sales_rollups.dimension_query(group, date_from, date_to, 100)
+
+        def run(conn):
+            sales_rollups.sales_totals(conn, date_from, date_to)
+            conn.execute(query, params).fetchall()
+        return read_query(ctx, run)
+    return setup
+
+
+def benchmarks():
+    """(name, setup, heavy) for every benchmark, in run order
+
+    setup(ctx) prepares the arguments of one run and returns the callable that
+    is timed. Heavy benchmarks read whole tables and run fewer times.
+    """
+    entries = [
+        ('DatabaseManager.get_product_by_barcode', lambda ctx: (lambda b=ctx.barcode(): ctx.db.get_product_by_barcode(b)), False),
+        ('DatabaseManager.barcode_exists', lambda ctx: (lambda b=ctx.barcode(): ctx.db.barcode_exists(b)), False),
+        ('DatabaseManager.get_product', lambda ctx: (lambda i=ctx.product_id(): ctx.db.get_product(i)), False),
+        ('DatabaseManager.get_products_by_category',
+         lambda ctx: (lambda name=ctx.rng.choice(ctx.category_names or ['General']): ctx.db.get_products_by_category(name)), False),
+        ('DatabaseManager.search_products', lambda ctx: (lambda text=ctx.search_text(): ctx.db.search_products(text)), False),
+        ('DatabaseManager.get_categories', lambda ctx: ctx.db.get_categories, False),
+        ('DatabaseManager.get_categories_with_counts', lambda ctx: ctx.db.get_categories_with_counts, False),
+        ('DatabaseManager.get_vendors', lambda ctx: ctx.db.get_vendors, False),
+        ('DatabaseManager.get_stock_types', lambda ctx: ctx.db.get_stock_types, False),
+        ('DatabaseManager.get_all_products', lambda ctx: ctx.db.get_all_products, True),
+        ('DatabaseManager.generate_barcode', lambda ctx: ctx.db.generate_barcode, False),
+        ('DatabaseManager.next_receipt_number', lambda ctx: ctx.db.next_receipt_number, False),
+        ('DatabaseManager.add_stock_type', lambda ctx: (lambda name=ctx.unique('Unit'): ctx.db.add_stock_type(name)), False),
+        ('DatabaseManager.add_category', lambda ctx: (lambda name=ctx.unique('Category'): ctx.db.add_category(name)), False),
+        ('DatabaseManager.add_vendor', lambda ctx: (lambda name=ctx.unique('Vendor'): ctx.db.add_vendor(name)), False),
+        ('DatabaseManager.save_product (insert)', save_new_product, False),
+        ('DatabaseManager.save_product (update)',
+         lambda ctx: (lambda args=existing_product_data(ctx): ctx.db.save_product(*args)), False),
+        ('DatabaseManager.delete_product', delete_created_product, False),
+        ('DatabaseManager.save_sale (1-9 lines)', lambda ctx: sale_commit(ctx, ctx.rng.randint(1, 9)), False),
+        ('DatabaseManager.save_sale (50 lines)', lambda ctx: sale_commit(ctx, 50), False),
+        ('ProductCatalog.load', lambda ctx: ctx.db.catalog.load, True),
+
+        ('inventory dialog: first page', inventory_first_page, False),
+        ('inventory dialog: next page', inventory_next_page, False),
+        ('stock history dialog: product', stock_history_for_product, False),
+        ('stock history dialog: 30 days', stock_history_for_month, False),
+        ('stock history dialog: next page', stock_history_next_page, False),
+        ('customer dialog: ledger page', customer_ledger_page, False),
+        ('customer dialog: opening balance', customer_opening_balance, False),
+        ('inventory report (cold)', lambda ctx: InventoryReportEngine(ctx.connections).report, True),
+        ('inventory report (cached columns)', lambda ctx: get_inventory_report_engine(ctx.connections).report, True),
+    ]
+    entries += [(f'customer report: {report_type}', customer_report(report_type), True)
+                for report_type in customer_reports.REPORT_TYPES]
+    entries += [(f'sales report: {group}', sales_report(group), False)
+                for group in list(sales_rollups.PERIODS) + ['cashier', 'customer', 'product']]
+    # Statements the category and customer dialogs run straight from their module constants
+    entries += [
+        ('category dialog: product names',
+         lambda ctx: hot_query(ctx, CATEGORY_PRODUCTS_QUERY, (ctx.rng.randint(1, max(len(ctx.category_names), 1)),)),
+         False),
+        ('customer dialog: customer list', lambda ctx: hot_query(ctx, CUSTOMER_LIST_QUERY, ()), True),
+    ]
+    return entries
+
+
+def run_benchmarks(db_manager, iterations, seed, only=None):
+    """Time every benchmark; returns {name: summary}"""
+    ctx = BenchmarkContext(db_manager, random.Random(seed))
+    results = {}
+    for name, setup, heavy in benchmarks():
+        if only and not any(pattern in name for pattern in only):
+            continue
+        count = min(iterations, HEAVY_ITERATIONS) if heavy else iterations
+        samples = []
+        # One untimed run first, so one-off costs (caches, statement preparation) are not counted
+        for i in range(count + 1):
+            run = setup(ctx)
+            start = time.perf_counter()
+            run()
+            if i:
+                samples.append(time.perf_counter() - start)
+        results[name] = summarize(samples)
+        print(f"{name:<58} p50 {results[name]['p50_ms']:>10.3f} ms  p99 {results[name]['p99_ms']:>10.3f} ms",
+              file=sys.stderr)
+    return results
+
+
+def table_counts(connections):
+    with connections.read() as conn:
+        return {table: conn.execute(f'SELECT COUNT(*) FROM {table}').fetchone()[0]
+                for table in ('products', 'categories', 'vendors', 'customers', 'sales', 'sale_items',
+                              'stock_movements', 'customer_transactions')}
+
+
+def regressions(results, baseline, threshold):
+    """(name, baseline p50, current p50) for benchmarks whose median grew past threshold times the baseline"""
+    found = []
+    for name, summary in results.items():
+        before = baseline.get('results', {}).get(name)
+        if before and summary['p50_ms'] > before['p50_ms'] * threshold:
+            found.append((name, before['p50_ms'], summary['p50_ms']))
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('path', help='database built by synthetic_data.py')
+    parser.add_argument('--iterations', type=int, default=DEFAULT_ITERATIONS,
+                        help=f'timed runs per benchmark (default {DEFAULT_ITERATIONS})')
+    parser.add_argument('--only', action='append', metavar='TEXT',
+                        help='run only benchmarks whose name contains TEXT (repeatable)')
+    parser.add_argument('--seed', type=int, default=1, help='random seed for benchmark arguments')
+    parser.add_argument('--in-place', action='store_true',
+                        help='benchmark the database itself instead of a copy (it keeps the rows written)')
+    parser.add_argument('--output', metavar='FILE', help='write the JSON results here instead of stdout')
+    parser.add_argument('--baseline', metavar='FILE', help='earlier JSON results to compare medians against')
+    parser.add_argument('--threshold', type=float, default=1.25,
+                        help='median growth over the baseline counted as a regression (default 1.25)')
+    args = parser.parse_args()
+
+    if not os.path.exists(args.path):
+        sys.exit(f"Error: {args.path} does not exist")
+
+    workdir = None
+    db_path = args.path
+    if not args.in_place:
+        workdir = tempfile.mkdtemp(prefix='pos_benchmark_')
+        db_path = os.path.join(workdir, 'benchmark.db')
+        copy_database(args.path, db_path)
+
+    try:
+        start = time.perf_counter()
+        db_manager = DatabaseManager(db_path)
+        startup = time.perf_counter() - start
+        report = {
+            'database': os.path.abspath(args.path),
+            'started': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'sqlite': sqlite3.sqlite_version,
+            'platform': platform.platform(),
+            'iterations': args.iterations,
+            'seed': args.seed,
+            'tables': table_counts(db_manager.connections),
+            'results': {'DatabaseManager.__init__': summarize([startup])},
+        }
+        report['results'].update(run_benchmarks(db_manager, args.iterations, args.seed, args.only))
+    finally:
+        # The copy is deleted below, so close it now rather than at exit
+        receipt_numbers.release_all_allocators()
+        connection_manager.close_all_connections()
+        if workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            found = regressions(report['results'], json.load(f), args.threshold)
+        for name, before, after in found:
+            print(f"REGRESSION  {name}: p50 {before:.3f} ms -> {after:.3f} ms", file=sys.stderr)
+        if found:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,370 @@
+"""Replay scripted checkout sessions against POSMainWindow and report UI latency percentiles as JSON
+
+Runs the real main window on Qt's offscreen platform, on a copy of a database
+built by synthetic_data.py, with every message box and input dialog answered
+automatically. Each session is a list of steps replayed as a cashier would:
+
+    {"scan": N}          scan N random barcodes as keyboard wedge bursts into keyPressEvent
+    {"page": N}          page the product grid forward N times
+    {"search": "text"}   type text into the product search box, then clear it
+    {"discount": P}      apply a P% discount through the discount dialog
+    {"pay": null}        process_payment with the exact total, then start a new order
+
+Measured: scan-to-render (first key of a scan until the order table has
+repainted), keystroke-to-results (last key typed until the grid shows the
+search results), payment-to-ready (process_payment until the till is clear
+for the next scan) and payment-to-receipt, plus paging and discount times.
+
+    python gui_benchmark.py /tmp/bench.db [--sessions N] [--session FILE] [--output results.json]
+                                          [--baseline old.json [--threshold 1.25]]
+"""
+import os
+
+# Must be set before Qt creates the application
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+import argparse
+import json
+import platform
+import random
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+from PyQt6.QtWidgets import QApplication, QMessageBox, QInputDialog
+from PyQt6.QtCore import Qt, QEvent, QT_VERSION_STR
+from PyQt6.QtGui import QKeyEvent
+
+import connection_manager
+import receipt_numbers
+import synthetic_data
+from db_benchmark import copy_database, regressions, summarize
+from main import POSMainWindow
+
+DEFAULT_SESSION = [
+    {"scan": 30},
+    {"page": 10},
+    {"search": "cola ri"},
+    {"scan": 20},
+    {"discount": 5},
+    {"pay": None},
+]
+
+DEFAULT_SESSIONS = 5
+
+# Milliseconds between keys a person types into the search box; scanner bursts
+# are sent back to back, as fast as a wedge scanner delivers them
+TYPING_GAP_MS = 120
+
+# Longest wait for a background search or receipt before the step counts as failed
+WAIT_TIMEOUT_S = 10
+
+
+class DialogAutoAnswer:
+    """Answers the static QMessageBox and QInputDialog calls the window makes
+
+    Questions are answered Yes, numeric inputs with the value queued for that
+    dialog title (or the dialog's own default), and every prompt is counted.
+    """
+
+    def __init__(self):
+        self.doubles = {}
+        self.prompts = {}
+        self._saved = []
+
+    def install(self):
+        for cls, name, answer in [
+            (QMessageBox, 'question', lambda *args, **kwargs: QMessageBox.StandardButton.Yes),
+            (QMessageBox, 'information', lambda *args, **kwargs: QMessageBox.StandardButton.Ok),
+            (QMessageBox, 'warning', lambda *args, **kwargs: QMessageBox.StandardButton.Ok),
+            (QMessageBox, 'critical', lambda *args, **kwargs: QMessageBox.StandardButton.Ok),
+            (QInputDialog, 'getDouble', self.get_double),
+        ]:
+            self._saved.append((cls, name, getattr(cls, name)))
+            setattr(cls, name, self.counted(name, answer))
+
+    def uninstall(self):
+        for cls, name, original in reversed(self._saved):
+            setattr(cls, name, original)
+        self._saved = []
+
+    def counted(self, name, answer):
+        def prompt(parent, title, *args, **kwargs):
+            key = f'{name}: {title}'
+            self.prompts[key] = self.prompts.get(key, 0) + 1
+            return answer(parent, title, *args, **kwargs)
+        return prompt
+
+    def get_double(self, parent, title, label, *args, **kwargs):
+        default = kwargs.get('value', args[0] if args else 0.0)
+        return self.doubles.pop(title, default), True
+
+
+class CheckoutHarness:
+    """Drives one POSMainWindow through scripted steps and collects latencies in seconds"""
+
+    def __init__(self, app, window, rng, max_product_id):
+        self.app = app
+        self.window = window
+        self.rng = rng
+        self.max_product_id = max_product_id
+        self.samples = {}
+        self.failures = {}
+        self.receipts_shown = 0
+        self.search_results = 0
+        # Connected after the window's own slots, so these run once the window has handled the signal
+        window.product_search.results_ready.connect(self.on_search_results)
+        window.receipt_renderer.receipt_ready.connect(self.on_receipt_ready)
+
+    def record(self, name, seconds):
+        self.samples.setdefault(name, []).append(seconds)
+
+    def fail(self, name):
+        self.failures[name] = self.failures.get(name, 0) + 1
+
+    def on_search_results(self, products):
+        self.search_results += 1
+
+    def on_receipt_ready(self, result):
+        self.receipts_shown += 1
+
+    def settle(self):
+        """Deliver pending events, including the repaints they scheduled"""
+        self.app.processEvents()
+
+    def wait_until(self, predicate, timeout=WAIT_TIMEOUT_S):
+        """Process events until predicate() holds; False on timeout"""
+        deadline = time.perf_counter() + timeout
+        while not predicate():
+            if time.perf_counter() > deadline:
+                return False
+            self.app.processEvents()
+            time.sleep(0.0005)
+        return True
+
+    def pause(self, ms):
+        """Keep the event loop running for ms milliseconds"""
+        deadline = time.perf_counter() + ms / 1000
+        while time.perf_counter() < deadline:
+            self.app.processEvents()
+            time.sleep(0.0005)
+
+    @staticmethod
+    def key_event(char):
+        """Key press for one character; synthetic events carry no timestamp, so the
+        scanner decoder times them by arrival, as it does on platforms without one"""
+        key = Qt.Key.Key_Return if char == '\r' else Qt.Key(ord(char.upper()))
+        return QKeyEvent(QEvent.Type.KeyPress, key, Qt.KeyboardModifier.NoModifier, char)
+
+    def scan(self, count):
+        """Scan random barcodes as scanner bursts, timing each until the order table repainted
+
+        A scan that did not add to the order (rejected or not found) is a failure, not a sample.
+        """
+        for _ in range(count):
+            barcode = synthetic_data.barcode(synthetic_data.skewed(self.rng, self.max_product_id))
+            quantity = self.ordered_quantity()
+            start = time.perf_counter()
+            for char in barcode + '\r':
+                QApplication.sendEvent(self.window, self.key_event(char))
+            self.settle()
+            elapsed = time.perf_counter() - start
+            if self.ordered_quantity() > quantity:
+                self.record('scan-to-render', elapsed)
+            else:
+                self.fail('scan not added')
+
+    def ordered_quantity(self):
+        """Units on the order; a scan merged into an existing line raises it too"""
+        return sum(item['quantity'] for item in self.window.order_items)
+
+    def page(self, count):
+        """Page the product grid forward, wrapping to the first page at the end"""
+        window = self.window
+        for _ in range(count):
+            start = time.perf_counter()
+            if window.current_product_page >= (len(window.current_products_list) - 1) // window.products_per_page:
+                window.current_product_page = -1
+            window.next_products_page()
+            self.settle()
+            self.record('grid page', time.perf_counter() - start)
+
+    def search(self, text):
+        """Type text into the search box at typing speed; time the last key until results show"""
+        field = self.window.search_input
+        field.setFocus()
+        seen = self.search_results
+        for i, char in enumerate(text):
+            if i:
+                self.pause(TYPING_GAP_MS)
+            last_key = time.perf_counter()
+            QApplication.sendEvent(field, self.key_event(char))
+            self.settle()
+            self.record('search keystroke', time.perf_counter() - last_key)
+        if self.wait_until(lambda: self.search_results > seen):
+            self.settle()
+            self.record('keystroke-to-results', time.perf_counter() - last_key)
+        else:
+            self.fail('search timed out')
+
+        start = time.perf_counter()
+        field.clear()
+        self.settle()
+        self.record('search clear to full grid', time.perf_counter() - start)
+        field.clearFocus()
+
+    def discount(self, percentage, answers):
+        answers.doubles['Percentage Discount'] = percentage
+        start = time.perf_counter()
+        self.window.apply_percentage_discount()
+        self.settle()
+        self.record('discount', time.perf_counter() - start)
+
+    def pay(self):
+        """Pay the exact total; ready once the order is cleared, receipt once it was shown"""
+        if not self.window.order_items:
+            return
+        receipts = self.receipts_shown
+        start = time.perf_counter()
+        self.window.process_payment()
+        self.settle()
+        self.record('payment-to-ready', time.perf_counter() - start)
+        if self.window.order_items:
+            self.fail('order not cleared after payment')
+        if self.wait_until(lambda: self.receipts_shown > receipts):
+            self.settle()
+            self.record('payment-to-receipt', time.perf_counter() - start)
+        else:
+            self.fail('receipt timed out')
+        self.close_dialogs()
+
+    def close_dialogs(self):
+        """Close the receipt windows the payment opened"""
+        for widget in QApplication.topLevelWidgets():
+            if widget is not self.window and widget.isVisible():
+                widget.close()
+        self.settle()
+
+    def run_session(self, steps, answers):
+        for step in steps:
+            (action, argument), = step.items()
+            if action == 'scan':
+                self.scan(int(argument))
+            elif action == 'page':
+                self.page(int(argument))
+            elif action == 'search':
+                self.search(str(argument))
+            elif action == 'discount':
+                self.discount(float(argument), answers)
+            elif action == 'pay':
+                self.pay()
+            else:
+                raise ValueError(f"Unknown session step: {action}")
+        # Leave the till empty for the next session
+        if self.window.order_items:
+            self.window.clear_order()
+        self.window.discount_percentage = 0.0
+        self.window.discount_amount = 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('path', help='database built by synthetic_data.py')
+    parser.add_argument('--sessions', type=int, default=DEFAULT_SESSIONS,
+                        help=f'times to replay the session (default {DEFAULT_SESSIONS})')
+    parser.add_argument('--session', metavar='FILE', help='JSON list of session steps (default: a built-in checkout)')
+    parser.add_argument('--seed', type=int, default=1, help='random seed for scanned products')
+    parser.add_argument('--output', metavar='FILE', help='write the JSON results here instead of stdout')
+    parser.add_argument('--baseline', metavar='FILE', help='earlier JSON results to compare medians against')
+    parser.add_argument('--threshold', type=float, default=1.25,
+                        help='median growth over the baseline counted as a regression (default 1.25)')
+    args = parser.parse_args()
+
+    if not os.path.exists(args.path):
+        sys.exit(f"Error: {args.path} does not exist")
+    steps = DEFAULT_SESSION
+    if args.session:
+        with open(args.session) as f:
+            steps = json.load(f)
+
+    # The window opens pos_database.db in the working directory, so run next to a copy
+    source = os.path.abspath(args.path)
+    workdir = tempfile.mkdtemp(prefix='pos_gui_benchmark_')
+    copy_database(source, os.path.join(workdir, 'pos_database.db'))
+    cwd = os.getcwd()
+    os.chdir(workdir)
+
+    answers = DialogAutoAnswer()
+    answers.install()
+    try:
+        app = QApplication.instance() or QApplication(sys.argv)
+        app.setStyle('Fusion')
+
+        start = time.perf_counter()
+        window = POSMainWindow()
+        window.show()
+        app.processEvents()
+        startup = time.perf_counter() - start
+
+        with window.db_manager.connections.read() as conn:
+            max_product_id = conn.execute('SELECT MAX(id) FROM products').fetchone()[0] or 1
+            products = conn.execute('SELECT COUNT(*) FROM products').fetchone()[0]
+
+        harness = CheckoutHarness(app, window, random.Random(args.seed), max_product_id)
+        for session in range(args.sessions):
+            harness.run_session(steps, answers)
+            print(f"session {session + 1}/{args.sessions} done", file=sys.stderr)
+
+        window.close()
+        receipt_numbers.release_all_allocators()
+        connection_manager.close_all_connections()
+    finally:
+        answers.uninstall()
+        os.chdir(cwd)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    results = {'window startup': summarize([startup])}
+    for name, samples in harness.samples.items():
+        results[name] = summarize(samples)
+    report = {
+        'database': source,
+        'started': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'sqlite': sqlite3.sqlite_version,
+        'qt': QT_VERSION_STR,
+        'qt_platform': os.environ['QT_QPA_PLATFORM'],
+        'products': products,
+        'sessions': args.sessions,
+        'session': steps,
+        'prompts': answers.prompts,
+        'failures': harness.failures,
+        'results': results,
+    }
+    for name, summary in results.items():
+        print(f"{name:<30} p50 {summary['p50_ms']:>10.3f} ms  p99 {summary['p99_ms']:>10.3f} ms", file=sys.stderr)
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+
+    found = []
+    if args.baseline:
+        with open(args.baseline) as f:
+            found = regressions(results, json.load(f), args.threshold)
+        for name, before, after in found:
+            print(f"REGRESSION  {name}: p50 {before:.3f} ms -> {after:.3f} ms", file=sys.stderr)
+    for name, count in harness.failures.items():
+        print(f"FAILED  {name}: {count} time(s)", file=sys.stderr)
+    # Timed-out steps are missing from the percentiles, so they fail the run on their own
+    if found or harness.failures:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -6,18 +6,251 @@ from PyQt6.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout,
                              QMessageBox, QSplitter, QHeaderView, QMenuBar,
                              QDialog, QDialogButtonBox, QTextEdit, QSpinBox,
                              QDoubleSpinBox, QInputDialog, QFileDialog,
-                             QListWidget, QColorDialog)  #
+                             QListWidget, QColorDialog, QTableView)  #
 
-from PyQt6.QtCore import Qt, QSize, pyqtSignal, QDateTime, QTimer
+from PyQt6.QtCore import (Qt, QSize, pyqtSignal, QDateTime, QTimer,
+                          QAbstractTableModel, QModelIndex)
 from PyQt6.QtGui import QFont, QPalette, QColor, QPixmap, QIcon, QAction, QKeySequence, QTextDocument
 from PyQt6.QtPrintSupport import QPrinter, QPrintDialog
 from datetime import datetime
 from product_management import DatabaseManager
+import inventory_summary
+from inventory_report import get_inventory_report_engine
+from product_search import like_pattern
+from csv_export import CsvExportJob, EXPORT_FILE_FILTER, start_export
 import sqlite3
 import json
 import os
 import tempfile
 import subprocess
+
+# Rows fetched per round trip as the inventory table scrolls
+INVENTORY_FETCH_SIZE = 200
+
+# Stock movements fetched per page as the history table scrolls
+HISTORY_FETCH_SIZE = 200
+
+# Search matches offered in the stock history product filter
+PRODUCT_FILTER_LIMIT = 50
+
+# Quiet period after the last keystroke before the inventory is filtered again
+INVENTORY_FILTER_DELAY_MS = 150
+
+# Inventory row columns, in the order InventoryTableModel selects them
+INVENTORY_COLUMNS = '''
+    p.id, p.name, p.barcode, COALESCE(c.name, 'General') as category,
+    COALESCE(p.quantity, 0) as quantity, COALESCE(p.min_stock_threshold, 10) as min_threshold,
+    COALESCE(p.purchase_price, 0) as purchase_price,
+    COALESCE(p.wholesale_price, 0) as wholesale_price,
+    COALESCE(p.sale_price, 0) as sale_price, COALESCE(p.supplier, '') as supplier
+'''
+
+# Stock level expression used to sort the status column
+STOCK_STATUS = '''
+    CASE WHEN COALESCE(p.quantity, 0) <= 0 THEN 'Out of Stock'
+         WHEN COALESCE(p.quantity, 0) <= COALESCE(p.min_stock_threshold, 10) THEN 'Low Stock'
+         ELSE 'In Stock' END
+'''
+
+# SQL sort key for each table column; ties are broken by product id
+INVENTORY_SORT_KEYS = [
+    'p.id',
+    'p.name',
+    'p.barcode',
+    "COALESCE(c.name, 'General')",
+    'COALESCE(p.quantity, 0)',
+    'COALESCE(p.min_stock_threshold, 10)',
+    'COALESCE(p.purchase_price, 0)',
+    'COALESCE(p.wholesale_price, 0)',
+    'COALESCE(p.sale_price, 0)',
+    'COALESCE(p.quantity, 0) * COALESCE(p.purchase_price, 0)',
+    "COALESCE(p.supplier, '')",
+    STOCK_STATUS,
+]
+
+# Category filter value for products without a category, which the table shows as 'General'
+NO_CATEGORY = -1
+
+# Conditions behind the stock level filter options
+STOCK_FILTERS = {
+    "All Products": None,
+    "Low Stock": 'COALESCE(p.quantity, 0) <= COALESCE(p.min_stock_threshold, 10)',
+    "Out of Stock": 'COALESCE(p.quantity, 0) <= 0',
+    "In Stock": 'COALESCE(p.quantity, 0) > 0',
+    "High Value Items": 'COALESCE(p.quantity, 0) * COALESCE(p.purchase_price, 0) >= 500',
+}
+
+STATUS_COLORS = {
+    'Out of Stock': "#dc3545",
+    'Low Stock': "#ffc107",
+    'In Stock': "#28a745",
+}
+
+STOCK_BACKGROUNDS = {
+    'Out of Stock': "#f8d7da",  # Red for out of stock
+    'Low Stock': "#fff3cd",     # Yellow for low stock
+    'In Stock': "#d4edda",      # Green for good stock
+}
+
+
+def stock_status(quantity, min_threshold):
+    """Status text for a stock level, matching STOCK_STATUS"""
+    if quantity <= 0:
+        return 'Out of Stock'
+    elif quantity <= min_threshold:
+        return 'Low Stock'
+    return 'In Stock'
+
+
+class InventoryTableModel(QAbstractTableModel):
+    """Inventory rows filtered and sorted in SQL and fetched a chunk at a time
+
+    Chunks are read with keyset pagination on (sort key, id), so scrolling to
+    the end of a large inventory never re-reads the rows already loaded.
+    """
+    HEADERS = ['ID', 'Product Name', 'Barcode', 'Category', 'Current Stock',
+               'Min Threshold', 'Purchase Price', 'Wholesale Price', 'Sale Price',
+               'Stock Value', 'Supplier', 'Status']
+    
+    def __init__(self, connections, fetch_size=INVENTORY_FETCH_SIZE, parent=None):
+        super().__init__(parent)
+        self.connections = connections
+        self.fetch_size = fetch_size
+        self.rows = []
+        self.display_rows = []  # display_values of each row, formatted once per fetched chunk
+        self.has_more = False
+        self.search_text = ""
+        self.category = None    # category id, NO_CATEGORY, or None for every category
+        self.stock_filter = None
+        self.sort_column = 1
+        self.sort_order = Qt.SortOrder.AscendingOrder
+    
+    def set_filters(self, search_text="", category=None, stock_filter=None):
+        """Apply new filters and reload from the first chunk"""
+        self.search_text = search_text.strip()
+        self.category = category
+        self.stock_filter = STOCK_FILTERS.get(stock_filter)
+        self.refresh()
+    
+    def refresh(self):
+        """Drop the loaded rows and fetch the first chunk again"""
+        self.beginResetModel()
+        self.rows = []
+        self.rows = self.fetch_chunk()
+        self.display_rows = [self.display_values(record) for record in self.rows]
+        self.endResetModel()
+    
+    def build_query(self, after=None, limit=None):
+        """SQL and parameters for the filtered rows, optionally after a keyset position"""
+        sort_key = INVENTORY_SORT_KEYS[self.sort_column]
+        descending = self.sort_order == Qt.SortOrder.DescendingOrder
+        conditions = []
+        params = []
+        
+        if self.search_text:
+            conditions.append("(p.name LIKE ? ESCAPE '\\' OR p.barcode LIKE ? ESCAPE '\\'"
+                              " OR p.supplier LIKE ? ESCAPE '\\')")
+            params += [like_pattern(self.search_text)] * 3
+        
+        # Filter on the column itself so idx_products_category_name serves the chunk
+        if self.category == NO_CATEGORY:
+            conditions.append("p.category_id IS NULL")
+        elif self.category is not None:
+            conditions.append("p.category_id = ?")
+            params.append(self.category)
+        
+        if self.stock_filter:
+            conditions.append(self.stock_filter)
+        
+        if after is not None:
+            conditions.append(f"({sort_key}, p.id) {'<' if descending else '>'} (?, ?)")
+            params += list(after)
+        
+        direction = 'DESC' if descending else 'ASC'
+        query = f'''
+            SELECT {INVENTORY_COLUMNS}, {sort_key} as sort_key
+            FROM products p
+            LEFT JOIN categories c ON p.category_id = c.id
+            {'WHERE ' + ' AND '.join(conditions) if conditions else ''}
+            ORDER BY sort_key {direction}, p.id {direction}
+        '''
+        if limit is not None:
+            query += ' LIMIT ?'
+            params.append(limit)
+        return query, params
+    
+    def fetch_chunk(self):
+        """Read the chunk that follows the last loaded row"""
+        after = (self.rows[-1][-1], self.rows[-1][0]) if self.rows else None
+        query, params = self.build_query(after, self.fetch_size)
+        with self.connections.read() as conn:
+            chunk = conn.execute(query, params).fetchall()
+        self.has_more = len(chunk) == self.fetch_size
+        return chunk
+    
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and self.has_more
+    
+    def fetchMore(self, parent=QModelIndex()):
+        if parent.isValid() or not self.has_more:
+            return
+        chunk = self.fetch_chunk()
+        if chunk:
+            self.beginInsertRows(QModelIndex(), len(self.rows), len(self.rows) + len(chunk) - 1)
+            self.rows.extend(chunk)
+            self.display_rows.extend(self.display_values(record) for record in chunk)
+            self.endInsertRows()
+    
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.rows)
+    
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.HEADERS)
+    
+    @staticmethod
+    def display_values(record):
+        """Column texts for one inventory row"""
+        (product_id, name, barcode, category, quantity, min_threshold,
+         purchase_price, wholesale_price, sale_price, supplier) = record[:10]
+        return [
+            str(product_id), name, barcode, category, str(quantity), str(min_threshold),
+            f"{purchase_price:.2f}", f"{wholesale_price:.2f}", f"{sale_price:.2f}",
+            f"{quantity * purchase_price:.2f}", supplier, stock_status(quantity, min_threshold)
+        ]
+    
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        
+        values = self.display_rows[index.row()]
+        column = index.column()
+        if role == Qt.ItemDataRole.DisplayRole:
+            return values[column]
+        elif role == Qt.ItemDataRole.BackgroundRole and column == 4:
+            return QColor(STOCK_BACKGROUNDS[values[11]])
+        elif role == Qt.ItemDataRole.ForegroundRole and column == 11:
+            return QColor(STATUS_COLORS[values[11]])
+        return None
+    
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if role == Qt.ItemDataRole.DisplayRole and orientation == Qt.Orientation.Horizontal:
+            return self.HEADERS[section]
+        return None
+    
+    def sort(self, column, order=Qt.SortOrder.AscendingOrder):
+        """Re-query in the new order instead of sorting the loaded rows"""
+        if column < 0 or (column, order) == (self.sort_column, self.sort_order):
+            return
+        self.sort_column = column
+        self.sort_order = order
+        self.refresh()
+    
+    def product_at(self, row):
+        """(product id, name, current stock) of a loaded row"""
+        record = self.rows[row]
+        return record[0], record[1], record[4]
+
+
 class InventoryManagementDialog(QDialog):
     """Comprehensive Inventory Management Dialog"""
     
@@ -25,61 +258,9 @@ class InventoryManagementDialog(QDialog):
         super().__init__(parent)
         self.parent_window = parent
         self.db_manager = parent.db_manager if parent else DatabaseManager()
-        self.init_database_tables()
         self.init_ui()
         self.load_inventory()
         
-    def init_database_tables(self):
-        """Initialize additional database tables for inventory tracking"""
-        try:
-            conn = sqlite3.connect(self.db_manager.db_path)
-            cursor = conn.cursor()
-            
-            # Add missing columns to products table if they don't exist
-            try:
-                cursor.execute('ALTER TABLE products ADD COLUMN purchase_price REAL DEFAULT 0.0')
-            except sqlite3.OperationalError:
-                pass  # Column already exists
-            
-            try:
-                cursor.execute('ALTER TABLE products ADD COLUMN wholesale_price REAL DEFAULT 0.0')
-            except sqlite3.OperationalError:
-                pass
-            
-            try:
-                cursor.execute('ALTER TABLE products ADD COLUMN min_stock_threshold INTEGER DEFAULT 10')
-            except sqlite3.OperationalError:
-                pass
-            
-            try:
-                cursor.execute('ALTER TABLE products ADD COLUMN supplier TEXT DEFAULT ""')
-            except sqlite3.OperationalError:
-                pass
-            
-            # Stock movements table for tracking changes
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS stock_movements (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    product_id INTEGER,
-                    movement_type TEXT CHECK(movement_type IN ('IN', 'OUT', 'ADJUSTMENT')),
-                    quantity_change INTEGER,
-                    old_quantity INTEGER,
-                    new_quantity INTEGER,
-                    reason TEXT,
-                    reference_number TEXT,
-                    movement_date TEXT DEFAULT CURRENT_TIMESTAMP,
-                    created_by TEXT DEFAULT 'POS User',
-                    notes TEXT,
-                    FOREIGN KEY (product_id) REFERENCES products (id)
-                )
-            ''')
-            
-            conn.commit()
-            conn.close()
-            
-        except Exception as e:
-            print(f"Error initializing inventory tables: {e}")
-    
     def init_ui(self):
         self.setWindowTitle("Inventory Management")
         self.setMinimumSize(1000, 700)
@@ -95,7 +276,12 @@ class InventoryManagementDialog(QDialog):
         search_label = QLabel("Search:")
         self.search_input = QLineEdit()
         self.search_input.setPlaceholderText("Product name, barcode, or supplier...")
-        self.search_input.textChanged.connect(self.filter_inventory)
+        # Filter once typing pauses rather than on every keystroke
+        self.filter_timer = QTimer(self)
+        self.filter_timer.setSingleShot(True)
+        self.filter_timer.setInterval(INVENTORY_FILTER_DELAY_MS)
+        self.filter_timer.timeout.connect(self.filter_inventory)
+        self.search_input.textChanged.connect(self.filter_timer.start)
         
         # Filter options
         filter_label = QLabel("Filter:")
@@ -162,13 +348,9 @@ class InventoryManagementDialog(QDialog):
         main_layout.addLayout(toolbar_layout)
         
         # Inventory table
-        self.inventory_table = QTableWidget()
-        self.inventory_table.setColumnCount(12)
-        self.inventory_table.setHorizontalHeaderLabels([
-            'ID', 'Product Name', 'Barcode', 'Category', 'Current Stock',
-            'Min Threshold', 'Purchase Price', 'Wholesale Price', 'Sale Price',
-            'Stock Value', 'Supplier', 'Status'
-        ])
+        self.inventory_model = InventoryTableModel(self.db_manager.connections, parent=self)
+        self.inventory_table = QTableView()
+        self.inventory_table.setModel(self.inventory_model)
         
         # Set column properties
         header = self.inventory_table.horizontalHeader()
@@ -202,12 +384,14 @@ class InventoryManagementDialog(QDialog):
         self.inventory_table.setColumnHidden(0, True)
         
         # Table properties
-        self.inventory_table.setSelectionBehavior(QTableWidget.SelectionBehavior.SelectRows)
+        self.inventory_table.setSelectionBehavior(QTableView.SelectionBehavior.SelectRows)
         self.inventory_table.setAlternatingRowColors(True)
+        # The model sorts in SQL; start with product name like before
+        header.setSortIndicator(1, Qt.SortOrder.AscendingOrder)
         self.inventory_table.setSortingEnabled(True)
         
         # Double-click to adjust stock
-        self.inventory_table.itemDoubleClicked.connect(self.quick_stock_adjustment)
+        self.inventory_table.doubleClicked.connect(self.quick_stock_adjustment)
         
         main_layout.addWidget(self.inventory_table)
         
@@ -294,121 +478,38 @@ class InventoryManagementDialog(QDialog):
         """Load categories for filter dropdown"""
         try:
             self.category_filter.clear()
-            self.category_filter.addItem("All Categories")
+            self.category_filter.addItem("All Categories", None)
             
+            # Item data is the category id the model filters on
             categories = self.db_manager.get_categories()
             for cat_id, cat_name, color_code in categories:
-                self.category_filter.addItem(cat_name)
+                self.category_filter.addItem(cat_name, cat_id)
+            
+            # Products without a category are listed as 'General'
+            if not any(cat_name == 'General' for cat_id, cat_name, color_code in categories):
+                self.category_filter.addItem("General", NO_CATEGORY)
                 
         except Exception as e:
             print(f"Error loading category filter: {e}")
     
     def load_inventory(self):
-        """Load all inventory data"""
+        """Load the first chunk of inventory and the summary figures"""
         try:
-            conn = sqlite3.connect(self.db_manager.db_path)
-            cursor = conn.cursor()
-            
-            # Get products with category information
-            cursor.execute('''
-                SELECT p.id, p.name, p.barcode, COALESCE(c.name, 'General') as category,
-                       p.quantity, COALESCE(p.min_stock_threshold, 10) as min_threshold,
-                       COALESCE(p.purchase_price, 0) as purchase_price,
-                       COALESCE(p.wholesale_price, 0) as wholesale_price,
-                       p.sale_price, COALESCE(p.supplier, '') as supplier
-                FROM products p
-                LEFT JOIN categories c ON p.category_id = c.id
-                ORDER BY p.name
-            ''')
-            
-            inventory_data = cursor.fetchall()
-            conn.close()
-            
-            self.display_inventory(inventory_data)
-            self.update_summary_statistics(inventory_data)
-            
+            self.inventory_model.set_filters(*self.current_filters())
+            self.update_summary_statistics()
+        
         except Exception as e:
             QMessageBox.critical(self, "Error", f"Failed to load inventory: {str(e)}")
     
-    def display_inventory(self, inventory_data):
-        """Display inventory data in table"""
-        self.inventory_table.setRowCount(len(inventory_data))
-        
-        for row, (product_id, name, barcode, category, quantity, min_threshold,
-                 purchase_price, wholesale_price, sale_price, supplier) in enumerate(inventory_data):
-            
-            # ID (hidden)
-            self.inventory_table.setItem(row, 0, QTableWidgetItem(str(product_id)))
-            
-            # Product Name
-            self.inventory_table.setItem(row, 1, QTableWidgetItem(name))
-            
-            # Barcode
-            self.inventory_table.setItem(row, 2, QTableWidgetItem(barcode))
-            
-            # Category
-            self.inventory_table.setItem(row, 3, QTableWidgetItem(category))
-            
-            # Current Stock
-            stock_item = QTableWidgetItem(str(quantity))
-            if quantity <= 0:
-                stock_item.setBackground(QColor("#f8d7da"))  # Red for out of stock
-            elif quantity <= min_threshold:
-                stock_item.setBackground(QColor("#fff3cd"))  # Yellow for low stock
-            else:
-                stock_item.setBackground(QColor("#d4edda"))  # Green for good stock
-            self.inventory_table.setItem(row, 4, stock_item)
-            
-            # Min Threshold
-            self.inventory_table.setItem(row, 5, QTableWidgetItem(str(min_threshold)))
-            
-            # Purchase Price
-            self.inventory_table.setItem(row, 6, QTableWidgetItem(f"{purchase_price:.2f}"))
-            
-            # Wholesale Price
-            self.inventory_table.setItem(row, 7, QTableWidgetItem(f"{wholesale_price:.2f}"))
-            
-            # Sale Price
-            self.inventory_table.setItem(row, 8, QTableWidgetItem(f"{sale_price:.2f}"))
-            
-            # Stock Value (quantity * purchase_price)
-            stock_value = quantity * purchase_price
-            self.inventory_table.setItem(row, 9, QTableWidgetItem(f"{stock_value:.2f}"))
-            
-            # Supplier
-            self.inventory_table.setItem(row, 10, QTableWidgetItem(supplier))
-            
-            # Status
-            if quantity <= 0:
-                status = "Out of Stock"
-                status_color = QColor("#dc3545")
-            elif quantity <= min_threshold:
-                status = "Low Stock"
-                status_color = QColor("#ffc107")
-            else:
-                status = "In Stock"
-                status_color = QColor("#28a745")
-            
-            status_item = QTableWidgetItem(status)
-            status_item.setForeground(status_color)
-            self.inventory_table.setItem(row, 11, status_item)
+    def current_filters(self):
+        """Search text, category and stock filter chosen in the toolbar"""
+        return self.search_input.text(), self.category_filter.currentData(), self.filter_combo.currentText()
     
-    def update_summary_statistics(self, inventory_data):
-        """Update summary statistics"""
-        total_products = len(inventory_data)
-        low_stock_count = 0
-        out_stock_count = 0
-        total_value = 0.0
-        
-        for (product_id, name, barcode, category, quantity, min_threshold,
-             purchase_price, wholesale_price, sale_price, supplier) in inventory_data:
-            
-            if quantity <= 0:
-                out_stock_count += 1
-            elif quantity <= min_threshold:
-                low_stock_count += 1
-            
-            total_value += quantity * purchase_price
+    def update_summary_statistics(self):
+        """Update summary statistics from the trigger-maintained summary row"""
+        with self.db_manager.connections.read() as conn:
+            total_products, low_stock_count, out_stock_count, total_value = \
+                inventory_summary.get_summary(conn)
         
         self.total_products_label.setText(f"Total Products: {total_products}")
         self.low_stock_label.setText(f"Low Stock: {low_stock_count}")
@@ -417,51 +518,15 @@ class InventoryManagementDialog(QDialog):
     
     def filter_inventory(self):
         """Filter inventory based on search and filter criteria"""
-        search_text = self.search_input.text().lower()
-        filter_option = self.filter_combo.currentText()
-        category_filter = self.category_filter.currentText()
-        
-        for row in range(self.inventory_table.rowCount()):
-            show_row = True
-            
-            # Search filter
-            if search_text:
-                name = self.inventory_table.item(row, 1).text().lower()
-                barcode = self.inventory_table.item(row, 2).text().lower()
-                supplier = self.inventory_table.item(row, 10).text().lower()
-                
-                if not (search_text in name or search_text in barcode or search_text in supplier):
-                    show_row = False
-            
-            # Category filter
-            if show_row and category_filter != "All Categories":
-                category = self.inventory_table.item(row, 3).text()
-                if category != category_filter:
-                    show_row = False
-            
-            # Stock level filter
-            if show_row and filter_option != "All Products":
-                quantity = int(self.inventory_table.item(row, 4).text())
-                min_threshold = int(self.inventory_table.item(row, 5).text())
-                purchase_price = float(self.inventory_table.item(row, 6).text())
-                
-                if filter_option == "Low Stock" and quantity > min_threshold:
-                    show_row = False
-                elif filter_option == "Out of Stock" and quantity > 0:
-                    show_row = False
-                elif filter_option == "In Stock" and quantity <= 0:
-                    show_row = False
-                elif filter_option == "High Value Items" and (quantity * purchase_price) < 500:
-                    show_row = False
-            
-            self.inventory_table.setRowHidden(row, not show_row)
+        self.filter_timer.stop()
+        try:
+            self.inventory_model.set_filters(*self.current_filters())
+        except Exception as e:
+            print(f"Error filtering inventory: {e}")
     
-    def quick_stock_adjustment(self, item):
+    def quick_stock_adjustment(self, index):
         """Quick stock adjustment on double-click"""
-        row = item.row()
-        product_id = int(self.inventory_table.item(row, 0).text())
-        product_name = self.inventory_table.item(row, 1).text()
-        current_stock = int(self.inventory_table.item(row, 4).text())
+        product_id, product_name, current_stock = self.inventory_model.product_at(index.row())
         
         self.open_stock_adjustment(product_id, product_name, current_stock)
     
@@ -475,45 +540,32 @@ class InventoryManagementDialog(QDialog):
     
     def show_stock_history(self):
         """Show stock movement history"""
-        current_row = self.inventory_table.currentRow()
+        current_index = self.inventory_table.currentIndex()
         product_id = None
         
-        if current_row >= 0:
-            product_id = int(self.inventory_table.item(current_row, 0).text())
+        if current_index.isValid():
+            product_id = self.inventory_model.product_at(current_index.row())[0]
         
         dialog = StockHistoryDialog(self, product_id)
         dialog.exec()
     
     def export_inventory(self):
-        """Export inventory to CSV"""
+        """Export the filtered inventory to CSV in the background"""
         try:
             timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
             file_path, _ = QFileDialog.getSaveFileName(
                 self, "Export Inventory", f"inventory_{timestamp}.csv",
-                "CSV Files (*.csv);;All Files (*)"
+                EXPORT_FILE_FILTER
             )
             
             if file_path:
-                with open(file_path, 'w', newline='', encoding='utf-8') as csvfile:
-                    import csv
-                    writer = csv.writer(csvfile)
-                    
-                    # Write headers
-                    headers = []
-                    for col in range(1, self.inventory_table.columnCount()):  # Skip ID column
-                        headers.append(self.inventory_table.horizontalHeaderItem(col).text())
-                    writer.writerow(headers)
-                    
-                    # Write data
-                    for row in range(self.inventory_table.rowCount()):
-                        if not self.inventory_table.isRowHidden(row):
-                            row_data = []
-                            for col in range(1, self.inventory_table.columnCount()):  # Skip ID column
-                                item = self.inventory_table.item(row, col)
-                                row_data.append(item.text() if item else "")
-                            writer.writerow(row_data)
-                
-                QMessageBox.information(self, "Success", f"Inventory exported to:\n{file_path}")
+                # Every filtered row, including those not fetched into the table yet
+                query, params = self.inventory_model.build_query()
+                job = CsvExportJob(self.db_manager.connections, file_path,
+                                   InventoryTableModel.HEADERS[1:],  # Skip ID column
+                                   query, params,
+                                   lambda record: InventoryTableModel.display_values(record)[1:])
+                self.export_task = start_export(self, job, "Inventory")
                 
         except Exception as e:
             QMessageBox.critical(self, "Error", f"Failed to export inventory: {str(e)}")
@@ -746,11 +798,9 @@ class StockAdjustmentDialog(QDialog):
             if self.product_id:
                 # Get current stock
                 try:
-                    conn = sqlite3.connect(self.db_manager.db_path)
-                    cursor = conn.cursor()
-                    cursor.execute('SELECT quantity FROM products WHERE id = ?', (self.product_id,))
-                    result = cursor.fetchone()
-                    conn.close()
+                    with self.db_manager.connections.read() as conn:
+                        cursor = conn.execute('SELECT quantity FROM products WHERE id = ?', (self.product_id,))
+                        result = cursor.fetchone()
                     
                     if result:
                         self.current_stock = result[0]
@@ -838,30 +888,29 @@ class StockAdjustmentDialog(QDialog):
             return
         
         try:
-            conn = sqlite3.connect(self.db_manager.db_path)
-            cursor = conn.cursor()
-            
-            # Update product stock
-            cursor.execute('UPDATE products SET quantity = ? WHERE id = ?',
-                         (new_stock, self.product_id))
-            
-            # Record stock movement
-            cursor.execute('''
-                INSERT INTO stock_movements 
-                (product_id, movement_type, quantity_change, old_quantity, new_quantity,
-                 reason, reference_number, notes, movement_date)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (self.product_id, movement_type, quantity_change, self.current_stock,
-                  new_stock, reason, reference, notes, datetime.now().isoformat()))
+            with self.db_manager.connections.transaction() as conn:
+                cursor = conn.cursor()
+                
+                # Update product stock
+                cursor.execute('UPDATE products SET quantity = ? WHERE id = ?',
+                             (new_stock, self.product_id))
+                
+                # Record stock movement
+                cursor.execute('''
+                    INSERT INTO stock_movements 
+                    (product_id, movement_type, quantity_change, old_quantity, new_quantity,
+                     reason, reference_number, notes, movement_date)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ''', (self.product_id, movement_type, quantity_change, self.current_stock,
+                      new_stock, reason, reference, notes, datetime.now().isoformat()))
             
-            conn.commit()
-            conn.close()
+            self.db_manager.catalog.update_quantity(self.product_id, new_stock)
             
             QMessageBox.information(self, "Success", 
                                   f"Stock adjustment saved successfully!\n\n"
                                   f"Old Stock: {self.current_stock}\n"
                                   f"New Stock: {new_stock}\n"
-                                  f"Change: {quantity_change:+d}")
+                                  f"Change: {quantity_change:+g}")
             
             self.accept()
             
@@ -869,6 +918,154 @@ class StockAdjustmentDialog(QDialog):
             QMessageBox.critical(self, "Error", f"Failed to save stock adjustment: {str(e)}")
 
 
+HISTORY_HEADERS = ['Date', 'Product', 'Type', 'Change', 'Old Stock', 'New Stock',
+                   'Reason', 'Reference', 'Notes']
+
+
+def history_display_values(record):
+    """Column texts for one stock movement row"""
+    date, product, movement_type, change, old_qty, new_qty, reason, reference, notes = record[:9]
+    
+    # Format date; ISO timestamps are sliced directly since strftime dominates large exports
+    if isinstance(date, str) and len(date) >= 16 and date[10] in 'T ' and date[13] == ':':
+        formatted_date = f"{date[:10]} {date[11:16]}"
+    else:
+        try:
+            date_obj = datetime.fromisoformat(date)
+            formatted_date = date_obj.strftime('%Y-%m-%d %H:%M')
+        except:
+            formatted_date = str(date)
+    
+    return [formatted_date, product, movement_type, f"{change:+g}", str(old_qty), str(new_qty),
+            reason or "", reference or "", notes or ""]
+
+
+MOVEMENT_TYPE_COLORS = {
+    'IN': "#28a745",
+    'OUT': "#dc3545",
+}
+
+
+class StockHistoryModel(QAbstractTableModel):
+    """Stock movements, newest first, loaded a page at a time as the table scrolls
+
+    Pages are read with keyset pagination on (movement_date, id), so loading
+    older movements costs the same however much history there is.
+    """
+    HEADERS = HISTORY_HEADERS
+    
+    def __init__(self, connections, fetch_size=HISTORY_FETCH_SIZE, parent=None):
+        super().__init__(parent)
+        self.connections = connections
+        self.fetch_size = fetch_size
+        self.rows = []
+        self.display_rows = []  # history_display_values of each row, formatted once per fetched page
+        self.has_more = False
+        self.product_id = None
+        self.date_from = ""
+        self.date_to = ""
+    
+    def set_filters(self, product_id=None, date_from="", date_to=""):
+        """Apply new filters and reload from the newest movement"""
+        self.product_id = product_id
+        self.date_from = date_from
+        self.date_to = date_to
+        self.refresh()
+    
+    def refresh(self):
+        """Drop the loaded rows and fetch the first page again"""
+        self.beginResetModel()
+        self.rows = []
+        self.rows = self.fetch_page()
+        self.display_rows = [history_display_values(record) for record in self.rows]
+        self.endResetModel()
+    
+    def build_query(self, after=None, limit=None):
+        """SQL and parameters for the filtered movements, optionally older than a keyset position"""
+        query = '''
+            SELECT sm.movement_date, p.name, sm.movement_type, sm.quantity_change,
+                   sm.old_quantity, sm.new_quantity, sm.reason, sm.reference_number,
+                   sm.notes, sm.id
+            FROM stock_movements sm
+            JOIN products p ON sm.product_id = p.id
+            WHERE 1=1
+        '''
+        params = []
+        
+        # Product filter
+        if self.product_id:
+            query += ' AND sm.product_id = ?'
+            params.append(self.product_id)
+        
+        # Date range filter; compare the raw column so the movement_date indexes can be used
+        if self.date_from:
+            query += ' AND sm.movement_date >= ?'
+            params.append(self.date_from)
+        
+        if self.date_to:
+            query += " AND sm.movement_date < DATE(?, '+1 day')"
+            params.append(self.date_to)
+        
+        if after is not None:
+            query += ' AND (sm.movement_date, sm.id) < (?, ?)'
+            params += list(after)
+        
+        query += ' ORDER BY sm.movement_date DESC, sm.id DESC'
+        if limit is not None:
+            query += ' LIMIT ?'
+            params.append(limit)
+        return query, params
+    
+    def fetch_page(self):
+        """Read the page of movements older than the last loaded row"""
+        after = (self.rows[-1][0], self.rows[-1][9]) if self.rows else None
+        query, params = self.build_query(after, self.fetch_size)
+        with self.connections.read() as conn:
+            page = conn.execute(query, params).fetchall()
+        self.has_more = len(page) == self.fetch_size
+        return page
+    
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and self.has_more
+    
+    def fetchMore(self, parent=QModelIndex()):
+        if parent.isValid() or not self.has_more:
+            return
+        page = self.fetch_page()
+        if page:
+            self.beginInsertRows(QModelIndex(), len(self.rows), len(self.rows) + len(page) - 1)
+            self.rows.extend(page)
+            self.display_rows.extend(history_display_values(record) for record in page)
+            self.endInsertRows()
+    
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.rows)
+    
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.HEADERS)
+    
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        
+        record = self.rows[index.row()]
+        column = index.column()
+        if role == Qt.ItemDataRole.DisplayRole:
+            return self.display_rows[index.row()][column]
+        elif role == Qt.ItemDataRole.ForegroundRole:
+            # Movement type and quantity change with color
+            if column == 2:
+                return QColor(MOVEMENT_TYPE_COLORS.get(record[2], "#ffc107"))
+            elif column == 3:
+                return QColor("#28a745" if record[3] > 0 else "#dc3545")
+        return None
+    
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if role == Qt.ItemDataRole.DisplayRole and orientation == Qt.Orientation.Horizontal:
+            return self.HEADERS[section]
+        return None
+
+
 class StockHistoryDialog(QDialog):
     """Stock Movement History Dialog"""
     
@@ -889,8 +1086,11 @@ class StockHistoryDialog(QDialog):
         # Filters
         filter_layout = QHBoxLayout()
         
-        # Product filter
+        # Product filter: offers only search matches, never the whole catalog
         product_label = QLabel("Product:")
+        self.product_search = QLineEdit()
+        self.product_search.setPlaceholderText("Search products...")
+        self.product_search.returnPressed.connect(self.search_product_filter)
         self.product_filter = QComboBox()
         self.product_filter.addItem("All Products", None)
         self.load_product_filter()
@@ -907,6 +1107,7 @@ class StockHistoryDialog(QDialog):
         filter_btn.clicked.connect(self.load_history)
         
         filter_layout.addWidget(product_label)
+        filter_layout.addWidget(self.product_search)
         filter_layout.addWidget(self.product_filter)
         filter_layout.addWidget(date_label)
         filter_layout.addWidget(self.date_from)
@@ -918,12 +1119,9 @@ class StockHistoryDialog(QDialog):
         layout.addLayout(filter_layout)
         
         # History table
-        self.history_table = QTableWidget()
-        self.history_table.setColumnCount(9)
-        self.history_table.setHorizontalHeaderLabels([
-            'Date', 'Product', 'Type', 'Change', 'Old Stock', 'New Stock',
-            'Reason', 'Reference', 'Notes'
-        ])
+        self.history_model = StockHistoryModel(self.db_manager.connections, parent=self)
+        self.history_table = QTableView()
+        self.history_table.setModel(self.history_model)
         
         # Set column properties
         header = self.history_table.horizontalHeader()
@@ -945,7 +1143,8 @@ class StockHistoryDialog(QDialog):
         self.history_table.setColumnWidth(7, 100)  # Reference
         
         self.history_table.setAlternatingRowColors(True)
-        self.history_table.setSortingEnabled(True)
+        # Always newest first: older pages are loaded on demand as the table scrolls
+        self.history_table.setSelectionBehavior(QTableView.SelectionBehavior.SelectRows)
         
         layout.addWidget(self.history_table)
         
@@ -967,143 +1166,134 @@ class StockHistoryDialog(QDialog):
         self.setLayout(layout)
     
     def load_product_filter(self):
-        """Load products for filter"""
+        """Add the product the dialog was opened for; others are found by searching"""
         try:
-            products = self.db_manager.get_all_products()
-            for product_id, name, barcode in [(p[0], p[1], p[2]) for p in products]:
-                self.product_filter.addItem(f"{name} ({barcode})", product_id)
-            
-            # Select specific product if provided
             if self.product_id:
-                for i in range(self.product_filter.count()):
-                    if self.product_filter.itemData(i) == self.product_id:
-                        self.product_filter.setCurrentIndex(i)
-                        break
-                        
+                product = self.db_manager.get_product(self.product_id)
+                if product:
+                    self.product_filter.addItem(f"{product[1]} ({product[2]})", product[0])
+                    self.product_filter.setCurrentIndex(1)
+
         except Exception as e:
             print(f"Error loading product filter: {e}")
     
-    def load_history(self):
-        """Load stock movement history"""
+    def search_product_filter(self):
+        """Offer the best search matches in the product filter and show the first one"""
         try:
-            conn = sqlite3.connect(self.db_manager.db_path)
-            cursor = conn.cursor()
-            
-            # Build query based on filters
-            query = '''
-                SELECT sm.movement_date, p.name, sm.movement_type, sm.quantity_change,
-                       sm.old_quantity, sm.new_quantity, sm.reason, sm.reference_number,
-                       sm.notes
-                FROM stock_movements sm
-                JOIN products p ON sm.product_id = p.id
-                WHERE 1=1
-            '''
-            params = []
-            
-            # Product filter
-            selected_product_id = self.product_filter.currentData()
-            if selected_product_id:
-                query += ' AND sm.product_id = ?'
-                params.append(selected_product_id)
-            
-            # Date range filter
-            date_from = self.date_from.text().strip()
-            date_to = self.date_to.text().strip()
-            
-            if date_from:
-                query += ' AND DATE(sm.movement_date) >= ?'
-                params.append(date_from)
-            
-            if date_to:
-                query += ' AND DATE(sm.movement_date) <= ?'
-                params.append(date_to)
+            text = self.product_search.text().strip()
+            products = self.db_manager.search_products(text, limit=PRODUCT_FILTER_LIMIT) if text else []
             
-            query += ' ORDER BY sm.movement_date DESC'
-            
-            cursor.execute(query, params)
-            history_data = cursor.fetchall()
-            conn.close()
+            self.product_filter.blockSignals(True)
+            self.product_filter.clear()
+            self.product_filter.addItem("All Products", None)
+            for product in products:
+                self.product_filter.addItem(f"{product[1]} ({product[2]})", product[0])
+            self.product_filter.setCurrentIndex(1 if products else 0)
+            self.product_filter.blockSignals(False)
             
-            self.display_history(history_data)
+            self.load_history()
             
         except Exception as e:
-            QMessageBox.critical(self, "Error", f"Failed to load history: {str(e)}")
+            QMessageBox.critical(self, "Error", f"Failed to search products: {str(e)}")
     
-    def display_history(self, history_data):
-        """Display history data in table"""
-        self.history_table.setRowCount(len(history_data))
-        
-        for row, (date, product, movement_type, change, old_qty, new_qty,
-                 reason, reference, notes) in enumerate(history_data):
-            
-            # Format date
-            try:
-                date_obj = datetime.fromisoformat(date)
-                formatted_date = date_obj.strftime('%Y-%m-%d %H:%M')
-            except:
-                formatted_date = str(date)
-            
-            self.history_table.setItem(row, 0, QTableWidgetItem(formatted_date))
-            self.history_table.setItem(row, 1, QTableWidgetItem(product))
-            
-            # Movement type with color
-            type_item = QTableWidgetItem(movement_type)
-            if movement_type == "IN":
-                type_item.setForeground(QColor("#28a745"))
-            elif movement_type == "OUT":
-                type_item.setForeground(QColor("#dc3545"))
-            else:
-                type_item.setForeground(QColor("#ffc107"))
-            self.history_table.setItem(row, 2, type_item)
-            
-            # Quantity change with color
-            change_item = QTableWidgetItem(f"{change:+d}")
-            if change > 0:
-                change_item.setForeground(QColor("#28a745"))
-            else:
-                change_item.setForeground(QColor("#dc3545"))
-            self.history_table.setItem(row, 3, change_item)
+    def load_history(self):
+        """Load the newest page of stock movement history"""
+        try:
+            self.history_model.set_filters(self.product_filter.currentData(),
+                                           self.date_from.text().strip(),
+                                           self.date_to.text().strip())
             
-            self.history_table.setItem(row, 4, QTableWidgetItem(str(old_qty)))
-            self.history_table.setItem(row, 5, QTableWidgetItem(str(new_qty)))
-            self.history_table.setItem(row, 6, QTableWidgetItem(reason or ""))
-            self.history_table.setItem(row, 7, QTableWidgetItem(reference or ""))
-            self.history_table.setItem(row, 8, QTableWidgetItem(notes or ""))
+        except Exception as e:
+            QMessageBox.critical(self, "Error", f"Failed to load history: {str(e)}")
     
     def export_history(self):
-        """Export history to CSV"""
+        """Export the filtered history to CSV in the background"""
         try:
             timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
             file_path, _ = QFileDialog.getSaveFileName(
                 self, "Export Stock History", f"stock_history_{timestamp}.csv",
-                "CSV Files (*.csv);;All Files (*)"
+                EXPORT_FILE_FILTER
             )
             
             if file_path:
-                with open(file_path, 'w', newline='', encoding='utf-8') as csvfile:
-                    import csv
-                    writer = csv.writer(csvfile)
-                    
-                    # Write headers
-                    headers = []
-                    for col in range(self.history_table.columnCount()):
-                        headers.append(self.history_table.horizontalHeaderItem(col).text())
-                    writer.writerow(headers)
-                    
-                    # Write data
-                    for row in range(self.history_table.rowCount()):
-                        row_data = []
-                        for col in range(self.history_table.columnCount()):
-                            item = self.history_table.item(row, col)
-                            row_data.append(item.text() if item else "")
-                        writer.writerow(row_data)
-                
-                QMessageBox.information(self, "Success", f"History exported to:\n{file_path}")
+                # Every filtered movement, including pages not loaded into the table yet
+                query, params = self.history_model.build_query()
+                job = CsvExportJob(self.db_manager.connections, file_path, HISTORY_HEADERS,
+                                   query, params, history_display_values)
+                self.export_task = start_export(self, job, "History")
                 
         except Exception as e:
             QMessageBox.critical(self, "Error", f"Failed to export history: {str(e)}")
 
 
+class InventoryReportDialog(QDialog):
+    """Inventory valuation, category breakdown and expiry aging report"""
+    
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.parent_window = parent
+        self.db_manager = parent.db_manager if parent else DatabaseManager()
+        self.report_engine = get_inventory_report_engine(self.db_manager.connections)
+        self.init_ui()
+        self.generate_report()
+    
+    def init_ui(self):
+        self.setWindowTitle("Inventory Report")
+        self.setMinimumSize(900, 650)
+        
+        layout = QVBoxLayout()
+        
+        # Report display
+        self.report_text = QTextEdit()
+        self.report_text.setReadOnly(True)
+        self.report_text.setFont(QFont("Courier New", 10))
+        layout.addWidget(self.report_text)
+        
+        # Buttons
+        buttons_layout = QHBoxLayout()
+        
+        refresh_btn = QPushButton("🔄 Refresh")
+        refresh_btn.clicked.connect(self.generate_report)
+        
+        export_btn = QPushButton("📤 Export Report")
+        export_btn.clicked.connect(self.export_report)
+        
+        close_btn = QPushButton("✖️ Close")
+        close_btn.clicked.connect(self.close)
+        
+        buttons_layout.addWidget(refresh_btn)
+        buttons_layout.addWidget(export_btn)
+        buttons_layout.addStretch()
+        buttons_layout.addWidget(close_btn)
+        
+        layout.addLayout(buttons_layout)
+        self.setLayout(layout)
+    
+    def generate_report(self):
+        """Generate the inventory report"""
+        try:
+            self.report_text.setPlainText(self.report_engine.report())
+        except Exception as e:
+            QMessageBox.critical(self, "Error", f"Failed to generate report: {str(e)}")
+    
+    def export_report(self):
+        """Export report to file"""
+        try:
+            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+            file_path, _ = QFileDialog.getSaveFileName(
+                self, "Export Report", f"inventory_report_{timestamp}.txt",
+                "Text Files (*.txt);;All Files (*)"
+            )
+            
+            if file_path:
+                with open(file_path, 'w', encoding='utf-8') as f:
+                    f.write(self.report_text.toPlainText())
+                
+                QMessageBox.information(self, "Success", f"Report exported to:\n{file_path}")
+                
+        except Exception as e:
+            QMessageBox.critical(self, "Error", f"Failed to export report: {str(e)}")
+
 # Update POSMainWindow methods
 def open_inventory_management(self):
     """Open inventory management dialog"""
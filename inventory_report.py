@@ -0,0 +1,228 @@
+import threading
+import os
+import time
+from datetime import date, datetime
+
+from data_versions import data_version
+
+# NumPy computes the report over column arrays; without it SQLite aggregates do
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+    print("NumPy not available. Install with: pip install numpy")
+
+# Stock expiring within this many days (or already expired) puts its margin at risk
+EXPIRY_RISK_DAYS = 30
+
+# Expiry buckets by days left: below the first edge is expired, past the last is long dated
+EXPIRY_EDGES = (0, 31, 91, 181)
+EXPIRY_BUCKETS = ("Expired", "0-30 days", "31-90 days", "91-180 days", "Over 180 days", "No expiry date")
+
+# One row per product, every column numeric: a missing expiry date reads as 0
+COLUMNS_QUERY = '''
+    SELECT COALESCE(quantity, 0), COALESCE(purchase_price, 0), COALESCE(wholesale_price, 0),
+           COALESCE(sale_price, 0), COALESCE(min_stock_threshold, 10),
+           COALESCE(JULIANDAY(expiry_date), 0), COALESCE(category_id, 0)
+    FROM products
+'''
+
+# Same figures from SQLite when NumPy is missing; ? is today's julian day
+ON_HAND = 'MAX(COALESCE(quantity, 0), 0)'
+DAYS_LEFT = 'JULIANDAY(expiry_date) - ?'
+MARGIN = f'(COALESCE(sale_price, 0) - COALESCE(purchase_price, 0)) * {ON_HAND}'
+
+CATEGORY_QUERY = f'''
+    SELECT COALESCE(category_id, 0), COUNT(*), SUM({ON_HAND}),
+           SUM({ON_HAND} * COALESCE(purchase_price, 0)),
+           SUM({ON_HAND} * COALESCE(wholesale_price, 0)),
+           SUM({ON_HAND} * COALESCE(sale_price, 0)),
+           SUM({MARGIN}),
+           SUM(CASE WHEN {DAYS_LEFT} <= {EXPIRY_RISK_DAYS} THEN {MARGIN} ELSE 0 END),
+           SUM(COALESCE(quantity, 0) > 0 AND COALESCE(quantity, 0) <= COALESCE(min_stock_threshold, 10)),
+           SUM(COALESCE(quantity, 0) <= 0),
+           SUM(COALESCE(sale_price, 0) < COALESCE(purchase_price, 0))
+    FROM products
+    GROUP BY COALESCE(category_id, 0)
+'''
+
+EXPIRY_QUERY = f'''
+    SELECT CASE WHEN JULIANDAY(expiry_date) IS NULL THEN {len(EXPIRY_EDGES) + 1}
+                {' '.join(f'WHEN {DAYS_LEFT} < {edge} THEN {i}' for i, edge in enumerate(EXPIRY_EDGES))}
+                ELSE {len(EXPIRY_EDGES)} END AS bucket,
+           COUNT(*), SUM({ON_HAND}),
+           SUM({ON_HAND} * COALESCE(purchase_price, 0)),
+           SUM({ON_HAND} * COALESCE(sale_price, 0)),
+           SUM({MARGIN})
+    FROM products
+    GROUP BY bucket
+'''
+
+
+def julian_day(day):
+    """Julian day number of a date at midnight, as SQLite's JULIANDAY returns it"""
+    return day.toordinal() + 1721424.5
+
+
+def load_columns(conn):
+    """Read products into one float array per column (quantity ... category id)"""
+    rows = conn.execute(COLUMNS_QUERY).fetchall()
+    table = np.array(rows, dtype=np.float64).reshape(-1, 7)
+    return tuple(np.ascontiguousarray(table[:, i]) for i in range(7))
+
+
+def compute_with_numpy(columns, today):
+    """Per-category and per-expiry-bucket rows from the column arrays"""
+    quantity, cost, wholesale, retail, threshold, expiry, category = columns
+    on_hand = np.maximum(quantity, 0)
+    cost_value = on_hand * cost
+    retail_value = on_hand * retail
+    margin = retail_value - cost_value
+
+    has_expiry = expiry > 0
+    days_left = expiry - today
+    at_risk = has_expiry & (days_left <= EXPIRY_RISK_DAYS)
+
+    # Bucket index = number of edges already passed; a few comparisons beat a binary search
+    bucket = np.zeros(len(expiry), dtype=np.int8)
+    for edge in EXPIRY_EDGES:
+        bucket += (days_left >= edge).view(np.int8)
+    bucket = np.where(has_expiry, bucket, len(EXPIRY_EDGES) + 1)
+
+    # Category ids are small integers, so they index the per-category sums directly
+    category = category.astype(np.intp)
+    figures = [
+        on_hand,
+        cost_value,
+        on_hand * wholesale,
+        retail_value,
+        margin,
+        np.where(at_risk, margin, 0),
+        (quantity > 0) & (quantity <= threshold),
+        quantity <= 0,
+        retail < cost,
+    ]
+    counts = np.bincount(category)
+    sums = [np.bincount(category, weights=values, minlength=len(counts)) for values in figures]
+    categories = [(int(code), int(counts[code])) + tuple(float(column[code]) for column in sums)
+                  for code in np.flatnonzero(counts)]
+
+    buckets = len(EXPIRY_BUCKETS)
+    bucket_counts = np.bincount(bucket, minlength=buckets)
+    bucket_sums = [np.bincount(bucket, weights=values, minlength=buckets)
+                   for values in (on_hand, cost_value, retail_value, margin)]
+    expiry_rows = [(i, int(bucket_counts[i])) + tuple(float(column[i]) for column in bucket_sums)
+                   for i in range(buckets) if bucket_counts[i]]
+    return categories, expiry_rows
+
+
+def compute_with_sql(conn, today):
+    """The rows compute_with_numpy returns, from two grouped queries"""
+    params = (today,) * CATEGORY_QUERY.count('?')
+    categories = [row[:2] + tuple(value or 0 for value in row[2:])
+                  for row in conn.execute(CATEGORY_QUERY, params)]
+    params = (today,) * EXPIRY_QUERY.count('?')
+    expiry_rows = sorted(row[:2] + tuple(value or 0 for value in row[2:])
+                         for row in conn.execute(EXPIRY_QUERY, params))
+    return categories, expiry_rows
+
+
+def render_report(categories, expiry_rows, category_names, timing):
+    """Report text from per-category and per-expiry-bucket rows"""
+    (products, units, cost_value, wholesale_value, retail_value, margin, margin_at_risk,
+     low_stock, out_of_stock, below_cost) = [sum(row[i] for row in categories) for i in range(1, 11)]
+
+    lines = [f"""
+INVENTORY VALUATION REPORT
+Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
+{'='*90}
+
+STOCK OVERVIEW:
+• Products: {products:,}
+• Units on Hand: {units:,.0f}
+• Low Stock: {low_stock:,.0f}
+• Out of Stock: {out_of_stock:,.0f}
+• Priced Below Cost: {below_cost:,.0f}
+
+VALUATION (units on hand):
+• At Cost: ${cost_value:,.2f}
+• At Wholesale: ${wholesale_value:,.2f}
+• At Retail: ${retail_value:,.2f}
+• Potential Margin: ${margin:,.2f}
+• Margin at Risk (expired or expiring within {EXPIRY_RISK_DAYS} days): ${margin_at_risk:,.2f}
+
+BY CATEGORY (highest cost value first):
+
+{'Category':<20} {'Products':>9} {'Units':>10} {'Cost Value':>14} {'Retail Value':>14} {'Margin':>12} {'Low':>5} {'Out':>5}
+{'-'*90}"""]
+    for row in sorted(categories, key=lambda row: row[3], reverse=True):
+        name = category_names.get(row[0], 'General')[:19]
+        lines.append(f"{name:<20} {row[1]:>9,} {row[2]:>10,.0f} {row[3]:>14,.2f} {row[5]:>14,.2f} "
+                     f"{row[6]:>12,.2f} {row[8]:>5,.0f} {row[9]:>5,.0f}")
+
+    lines.append(f"""
+EXPIRY AGING:
+
+{'Expiry':<20} {'Products':>9} {'Units':>10} {'Cost Value':>14} {'Retail Value':>14} {'Margin':>12}
+{'-'*90}""")
+    for bucket, count, bucket_units, bucket_cost, bucket_retail, bucket_margin in expiry_rows:
+        lines.append(f"{EXPIRY_BUCKETS[bucket]:<20} {count:>9,} {bucket_units:>10,.0f} {bucket_cost:>14,.2f} "
+                     f"{bucket_retail:>14,.2f} {bucket_margin:>12,.2f}")
+
+    lines.append(f"\n{timing}")
+    return '\n'.join(lines) + '\n'
+
+
+class InventoryReportEngine:
+    """Inventory valuation report; with NumPy the product columns stay loaded until products change"""
+
+    def __init__(self, connections):
+        self.connections = connections
+        self._lock = threading.Lock()
+        self._columns = None    # (data version, column arrays)
+
+    def report(self):
+        """Text of the inventory valuation and expiry aging report"""
+        today = julian_day(date.today())
+        with self.connections.read() as conn:
+            category_names = dict(conn.execute('SELECT id, name FROM categories'))
+
+            if not NUMPY_AVAILABLE:
+                start = time.perf_counter()
+                categories, expiry_rows = compute_with_sql(conn, today)
+                timing = f"Computed with SQLite in {(time.perf_counter() - start) * 1000:.1f} ms"
+                return render_report(categories, expiry_rows, category_names, timing)
+
+            version = data_version(conn, 'products')
+            with self._lock:
+                cached = self._columns
+            start = time.perf_counter()
+            if cached and version is not None and cached[0] == version:
+                columns = cached[1]
+                loaded = "Product columns reused"
+            else:
+                columns = load_columns(conn)
+                with self._lock:
+                    self._columns = (version, columns)
+                loaded = f"Loaded product columns in {(time.perf_counter() - start) * 1000:.1f} ms"
+
+        start = time.perf_counter()
+        categories, expiry_rows = compute_with_numpy(columns, today)
+        timing = f"{loaded}; computed with NumPy in {(time.perf_counter() - start) * 1000:.1f} ms"
+        return render_report(categories, expiry_rows, category_names, timing)
+
+
+_engines = {}
+_engines_lock = threading.Lock()
+
+
+def get_inventory_report_engine(connections):
+    """Return the process-wide inventory report engine for a connection manager's database"""
+    key = os.path.abspath(connections.db_path)
+    with _engines_lock:
+        engine = _engines.get(key)
+        if engine is None or engine.connections is not connections:
+            engine = InventoryReportEngine(connections)
+            _engines[key] = engine
+        return engine
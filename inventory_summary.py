@@ -0,0 +1,87 @@
+# One product's contribution to each summary figure, for {row} = new, old or p
+QUANTITY = 'COALESCE({row}.quantity, 0)'
+MIN_THRESHOLD = 'COALESCE({row}.min_stock_threshold, 10)'
+CONTRIBUTION = {
+    'low_stock': f'({QUANTITY} > 0 AND {QUANTITY} <= {MIN_THRESHOLD})',
+    'out_of_stock': f'({QUANTITY} <= 0)',
+    'total_value': f'({QUANTITY} * COALESCE({{row}}.purchase_price, 0))',
+}
+
+
+def summary_delta(new=None, old=None):
+    """SET clause applying a product row change to the summary: added (new), removed (old) or both"""
+    assignments = []
+    if new and not old:
+        assignments.append('total_products = total_products + 1')
+    elif old and not new:
+        assignments.append('total_products = total_products - 1')
+    for column, expression in CONTRIBUTION.items():
+        terms = ''
+        if new:
+            terms += f' + {expression.format(row=new)}'
+        if old:
+            terms += f' - {expression.format(row=old)}'
+        assignments.append(f'{column} = {column}{terms}')
+    return ', '.join(assignments)
+
+
+SUMMARY_SCHEMA = [
+    '''
+    CREATE TABLE IF NOT EXISTS inventory_summary (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        total_products INTEGER NOT NULL DEFAULT 0,
+        low_stock INTEGER NOT NULL DEFAULT 0,
+        out_of_stock INTEGER NOT NULL DEFAULT 0,
+        total_value REAL NOT NULL DEFAULT 0.0
+    )
+    ''',
+    f'''
+    CREATE TRIGGER IF NOT EXISTS products_summary_insert AFTER INSERT ON products BEGIN
+        UPDATE inventory_summary SET {summary_delta(new='new')} WHERE id = 1;
+    END
+    ''',
+    f'''
+    CREATE TRIGGER IF NOT EXISTS products_summary_delete AFTER DELETE ON products BEGIN
+        UPDATE inventory_summary SET {summary_delta(old='old')} WHERE id = 1;
+    END
+    ''',
+    f'''
+    CREATE TRIGGER IF NOT EXISTS products_summary_update
+    AFTER UPDATE OF quantity, min_stock_threshold, purchase_price ON products BEGIN
+        UPDATE inventory_summary SET {summary_delta(new='new', old='old')} WHERE id = 1;
+    END
+    ''',
+]
+
+
+def create_summary(cursor):
+    """Create the inventory summary row and its triggers, filling it on first creation"""
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE name = 'inventory_summary'")
+    exists = cursor.fetchone() is not None
+
+    for statement in SUMMARY_SCHEMA:
+        cursor.execute(statement)
+
+    if not exists:
+        rebuild_summary(cursor)
+
+
+def rebuild_summary(cursor):
+    """Recompute the summary from the products table (also clears float drift in the value)"""
+    cursor.execute(f'''
+        INSERT OR REPLACE INTO inventory_summary (id, total_products, low_stock, out_of_stock, total_value)
+        SELECT 1, COUNT(*),
+               COALESCE(SUM({CONTRIBUTION['low_stock'].format(row='p')}), 0),
+               COALESCE(SUM({CONTRIBUTION['out_of_stock'].format(row='p')}), 0),
+               COALESCE(SUM({CONTRIBUTION['total_value'].format(row='p')}), 0)
+        FROM products p
+    ''')
+
+
+def get_summary(conn):
+    """(total products, low stock, out of stock, total value) read from the summary row"""
+    row = conn.execute('''
+        SELECT total_products, low_stock, out_of_stock, total_value
+        FROM inventory_summary WHERE id = 1
+    ''').fetchone()
+    return row or (0, 0, 0, 0.0)
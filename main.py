@@ -5,19 +5,29 @@ from PyQt6.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout,
                              QFrame, QScrollArea, QCheckBox, QComboBox,
                              QMessageBox, QSplitter, QHeaderView, QMenuBar,
                              QDialog, QDialogButtonBox, QTextEdit, QSpinBox,QListWidget,
-                             QDoubleSpinBox, QInputDialog, QFileDialog)
-from PyQt6.QtCore import Qt, QSize, pyqtSignal, QDateTime, QTimer
-from PyQt6.QtGui import QFont, QPalette, QColor, QPixmap, QIcon, QAction, QKeySequence, QTextDocument
+                             QDoubleSpinBox, QInputDialog, QFileDialog,
+                             QTableView, QStyledItemDelegate)
+from PyQt6.QtCore import (Qt, QSize, pyqtSignal, QDateTime, QTimer, QAbstractTableModel,
+                          QModelIndex, QEvent, QRect)
+from PyQt6.QtGui import QFont, QPalette, QColor, QPixmap, QIcon, QAction, QKeySequence, QTextDocument, QPainter
 from PyQt6.QtPrintSupport import QPrinter, QPrintDialog
 from datetime import datetime
 import sqlite3
 import json
 import os
+import time
 import tempfile
 import subprocess
+from functools import lru_cache
 from category_management import CategoryManagementDialog
-from inventory_management import InventoryManagementDialog, StockAdjustmentDialog
+from inventory_management import InventoryManagementDialog, StockAdjustmentDialog, InventoryReportDialog
 from customer_management import CustomerManagementDialog, CustomerSelectionDialog
+from sales_report import SalesReportDialog
+from search_worker import ProductSearchWorker
+from receipt_renderer import ReceiptRenderer, render_receipt
+from print_spooler import PrintSpooler, default_document_backend, default_thermal_backend
+import parked_orders
+import scanner_input
 # ReportLab imports for professional PDF receipts
 try:
     from reportlab.pdfgen import canvas
@@ -27,6 +37,16 @@ except ImportError:
     REPORTLAB_AVAILABLE = False
     print("ReportLab not available. Install with: pip install reportlab")
 
+# Most search results paged through in the product grid
+SEARCH_RESULT_LIMIT = 160
+
+# Spooler printer names: PDF receipts and raw ESC/POS thermal output
+RECEIPT_PRINTER = 'receipt'
+THERMAL_PRINTER = 'thermal'
+
+# Shown on receipts previewed before payment; numbers are only allocated by a payment
+DRAFT_RECEIPT_NUMBER = 'DRAFT'
+
 # Import the product management database
 try:
     from product_management import DatabaseManager
@@ -88,7 +108,7 @@ except ImportError:
             conn.commit()
             conn.close()
             
-        def search_products(self, query):
+        def search_products(self, query, limit=20):
             """Search products by name or barcode"""
             conn = sqlite3.connect(self.db_path)
             cursor = conn.cursor()
@@ -96,42 +116,12 @@ except ImportError:
                 SELECT id, name, barcode, '', 0, sale_price, '', '', 0 
                 FROM products 
                 WHERE name LIKE ? OR barcode LIKE ?
-                LIMIT 20
-            ''', (f'%{query}%', f'%{query}%'))
+                LIMIT ?
+            ''', (f'%{query}%', f'%{query}%', -1 if limit is None else limit))
             products = cursor.fetchall()
             conn.close()
             return products
             
-        def save_sale(self, sale_data, sale_items):
-            """Save sale and items to database"""
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            try:
-                # Insert sale
-                cursor.execute('''
-                    INSERT INTO sales (receipt_number, subtotal, discount_amount, tax_amount, 
-                                     total_amount, payment_amount, change_amount, sale_date)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-                ''', sale_data)
-                
-                sale_id = cursor.lastrowid
-                
-                # Insert sale items
-                for item in sale_items:
-                    cursor.execute('''
-                        INSERT INTO sale_items (sale_id, product_id, product_name, quantity, unit_price, total_price)
-                        VALUES (?, ?, ?, ?, ?, ?)
-                    ''', (sale_id, item['product_id'], item['description'], item['quantity'], item['price'], item['total']))
-                
-                conn.commit()
-                return sale_id
-            except Exception as e:
-                conn.rollback()
-                raise e
-            finally:
-                conn.close()
-            
         def get_product_by_barcode(self, barcode):
             """Get product by barcode"""
             conn = sqlite3.connect(self.db_path)
@@ -159,8 +149,20 @@ except ImportError:
             conn.close()
             return products
             
-        def save_sale(self, sale_data, sale_items):
-            """Save sale and items to database"""
+        def next_receipt_number(self):
+            """Timestamp receipt number (no sequence without product_management)"""
+            return f"R{datetime.now().strftime('%Y%m%d%H%M%S%f')}"
+        
+        def save_sale(self, sale_data, sale_items, customer=None):
+            """Save sale and items to database
+            
+            The fallback database has no customer ledger, so a customer sale is
+            refused rather than saved without charging the customer's account.
+            """
+            if customer:
+                raise ValueError("Customer accounts need product_management; "
+                                 "remove the customer to complete the sale")
+            
             conn = sqlite3.connect(self.db_path)
             cursor = conn.cursor()
             
@@ -189,39 +191,81 @@ except ImportError:
             finally:
                 conn.close()
 
+EMPTY_SLOT_STYLE = """
+    QPushButton {
+        background-color: #f0f0f0;
+        border: 2px dashed #ccc;
+        border-radius: 8px;
+        color: #999;
+        font-style: italic;
+        font-size: 10px;
+    }
+"""
+
+
+def darken_color(color, factor=0.2):
+    """Darken a hex color by a factor"""
+    color = color.lstrip('#')
+    rgb = tuple(int(color[i:i+2], 16) for i in (0, 2, 4))
+    darkened = tuple(int(c * (1 - factor)) for c in rgb)
+    return f"#{darkened[0]:02x}{darkened[1]:02x}{darkened[2]:02x}"
+
+
+@lru_cache(maxsize=None)
+def product_button_style(category_color):
+    """Build the stylesheet for a category colour once and reuse it"""
+    return f"""
+        QPushButton {{
+            background-color: {category_color};
+            border: 2px solid #333;
+            border-radius: 8px;
+            color: white;
+            font-weight: bold;
+            font-size: 11px;
+            text-align: center;
+            padding: 5px;
+        }}
+        QPushButton:hover {{
+            background-color: {darken_color(category_color)};
+            border: 3px solid #555;
+        }}
+        QPushButton:pressed {{
+            background-color: {darken_color(category_color, 0.3)};
+        }}
+    """
+
+
 class ProductButton(QPushButton):
     """Custom product button with category styling"""
     def __init__(self, text, category_color="#FF6B6B", product_data=None):
         super().__init__(text)
         self.product_data = product_data or {}
+        self.style_key = None
         self.setMinimumSize(120, 80)
         self.setMaximumSize(200, 120)
-        self.setStyleSheet(f"""
-            QPushButton {{
-                background-color: {category_color};
-                border: 2px solid #333;
-                border-radius: 8px;
-                color: white;
-                font-weight: bold;
-                font-size: 11px;
-                text-align: center;
-                padding: 5px;
-            }}
-            QPushButton:hover {{
-                background-color: {self.darken_color(category_color)};
-                border: 3px solid #555;
-            }}
-            QPushButton:pressed {{
-                background-color: {self.darken_color(category_color, 0.3)};
-            }}
-        """)
+        self.set_color(category_color)
+    
+    def set_color(self, category_color):
+        """Apply the cached style for a colour, skipping the restyle if unchanged"""
+        if self.style_key != category_color:
+            self.style_key = category_color
+            self.setStyleSheet(product_button_style(category_color))
     
-    def darken_color(self, color, factor=0.2):
-        """Darken a hex color by a factor"""
-        color = color.lstrip('#')
-        rgb = tuple(int(color[i:i+2], 16) for i in (0, 2, 4))
-        darkened = tuple(int(c * (1 - factor)) for c in rgb)
-        return f"#{darkened[0]:02x}{darkened[1]:02x}{darkened[2]:02x}"
+    def bind(self, text, category_color, product_data):
+        """Rebind a recycled button to another product"""
+        self.product_data = product_data
+        self.setText(text)
+        self.set_color(category_color)
+        self.setEnabled(True)
+    
+    def clear_slot(self):
+        """Show the button as an empty grid slot"""
+        self.product_data = {}
+        self.setText("Empty Slot")
+        self.setEnabled(False)
+        if self.style_key is not None:
+            self.style_key = None
+            self.setStyleSheet(EMPTY_SLOT_STYLE)
 
 class NumericKeypad(QWidget):
     """Numeric keypad widget for quantity and payment input"""
@@ -267,20 +311,154 @@ class NumericKeypad(QWidget):
         
         self.setLayout(layout)
 
-class OrderTable(QTableWidget):
-    """Order display table widget"""
+class OrderTableModel(QAbstractTableModel):
+    """Order lines backed by the window's order_items list, with a barcode -> row index"""
+    HEADERS = ['DESCRIPTION', 'QTY', 'PRICE', 'TOTAL', 'ACTION', 'BARCODE']
+    
+    def __init__(self, items, parent=None):
+        super().__init__(parent)
+        self.items = items
+        self.barcode_rows = {}
+        self.subtotal = 0.0
+        self.rebuild_index()
+    
+    def rebuild_index(self):
+        """Recompute the barcode index and running subtotal from scratch"""
+        self.barcode_rows = {item['barcode']: row for row, item in enumerate(self.items)}
+        self.subtotal = sum(item['total'] for item in self.items)
+    
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.items)
+    
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.HEADERS)
+    
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        
+        if role == Qt.ItemDataRole.DisplayRole:
+            item = self.items[index.row()]
+            column = index.column()
+            if column == 0:
+                return item['description']
+            elif column == 1:
+                return f"{item['quantity']:.2f}"
+            elif column == 2:
+                return f"{item['price']:.2f}"
+            elif column == 3:
+                return f"{item['total']:.2f}"
+            elif column == 5:
+                return item['barcode']
+        return None
+    
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if role == Qt.ItemDataRole.DisplayRole and orientation == Qt.Orientation.Horizontal:
+            return self.HEADERS[section]
+        return None
+    
+    def add_item(self, order_item):
+        """Add a line, or bump the quantity of the line with the same barcode; returns the row"""
+        row = self.barcode_rows.get(order_item['barcode'])
+        if row is not None:
+            item = self.items[row]
+            self.set_quantity(row, item['quantity'] + order_item['quantity'])
+            return row
+        
+        row = len(self.items)
+        self.beginInsertRows(QModelIndex(), row, row)
+        self.items.append(order_item)
+        self.barcode_rows[order_item['barcode']] = row
+        self.subtotal += order_item['total']
+        self.endInsertRows()
+        return row
+    
+    def set_quantity(self, row, quantity):
+        """Change one line's quantity and repaint only that row"""
+        item = self.items[row]
+        total = quantity * item['price']
+        self.subtotal += total - item['total']
+        item['quantity'] = quantity
+        item['total'] = total
+        self.dataChanged.emit(self.index(row, 1), self.index(row, 3))
+    
+    def remove_row(self, row):
+        """Remove one line and shift the index of the lines after it"""
+        self.beginRemoveRows(QModelIndex(), row, row)
+        item = self.items.pop(row)
+        self.barcode_rows.pop(item['barcode'], None)
+        for later_row in range(row, len(self.items)):
+            self.barcode_rows[self.items[later_row]['barcode']] = later_row
+        # Avoid carrying float drift into the next order
+        self.subtotal = self.subtotal - item['total'] if self.items else 0.0
+        self.endRemoveRows()
+    
+    def clear(self):
+        """Remove every line"""
+        self.beginResetModel()
+        self.items.clear()
+        self.barcode_rows = {}
+        self.subtotal = 0.0
+        self.endResetModel()
+    
+    def reset(self):
+        """Reload the view after the items list was changed in bulk"""
+        self.beginResetModel()
+        self.rebuild_index()
+        self.endResetModel()
+
+
+class RemoveButtonDelegate(QStyledItemDelegate):
+    """Paints the red remove button in the ACTION column and reports clicks"""
+    clicked = pyqtSignal(int)
+    
+    def paint(self, painter, option, index):
+        rect = QRect(0, 0, min(30, option.rect.width() - 4), min(30, option.rect.height() - 4))
+        rect.moveCenter(option.rect.center())
+        
+        painter.save()
+        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+        painter.setPen(QColor("#333"))
+        painter.setBrush(QColor("#DC143C"))
+        painter.drawRoundedRect(rect, 3, 3)
+        font = painter.font()
+        font.setBold(True)
+        painter.setFont(font)
+        painter.setPen(QColor("white"))
+        painter.drawText(rect, Qt.AlignmentFlag.AlignCenter, "X")
+        painter.restore()
+    
+    def editorEvent(self, event, model, option, index):
+        if (event.type() == QEvent.Type.MouseButtonRelease
+                and event.button() == Qt.MouseButton.LeftButton):
+            self.clicked.emit(index.row())
+            return True
+        return False
+
+
+class OrderTable(QTableView):
+    """Order display table backed by OrderTableModel"""
     item_quantity_changed = pyqtSignal(int, float)
     item_removed = pyqtSignal(int)
     
-    def __init__(self):
+    def __init__(self, order_items=None):
         super().__init__()
+        self.order_model = OrderTableModel(order_items if order_items is not None else [], self)
+        self.setModel(self.order_model)
+        
+        # Remove buttons are drawn by the delegate instead of one widget per row
+        self.remove_delegate = RemoveButtonDelegate(self)
+        self.remove_delegate.clicked.connect(self.item_removed.emit)
+        self.setItemDelegateForColumn(4, self.remove_delegate)
+        
         self.init_ui()
+    
+    def currentRow(self):
+        """Row of the current index, or -1"""
+        return self.currentIndex().row()
         
     def init_ui(self):
         """Initialize OrderTable with optimized column sizing"""
-        self.setColumnCount(6)
-        self.setHorizontalHeaderLabels(['DESCRIPTION', 'QTY', 'PRICE', 'TOTAL', 'ACTION', 'BARCODE'])
-        
         # Get header and set resize modes
         header = self.horizontalHeader()
         
@@ -309,7 +487,7 @@ class OrderTable(QTableWidget):
         
         # Styling for better visibility
         self.setStyleSheet("""
-            QTableWidget {
+            QTableView {
                 background-color: #E8F4F8;
                 border: 2px solid #333;
                 gridline-color: #333;
@@ -324,11 +502,11 @@ class OrderTable(QTableWidget):
                 border: 1px solid #333;
                 font-size: 10px;
             }
-            QTableWidget::item {
+            QTableView::item {
                 padding: 3px;
                 border-bottom: 1px solid #ccc;
             }
-            QTableWidget::item:selected {
+            QTableView::item:selected {
                 background-color: #357ABD;
                 color: white;
             }
@@ -338,7 +516,7 @@ class OrderTable(QTableWidget):
         self.verticalHeader().setDefaultSectionSize(25)
         self.verticalHeader().hide()  # Hide row numbers
         
-        self.setSelectionBehavior(QTableWidget.SelectionBehavior.SelectRows)
+        self.setSelectionBehavior(QTableView.SelectionBehavior.SelectRows)
         self.setAlternatingRowColors(True)
 
 class PDFReceiptDialog(QDialog):
@@ -942,8 +1120,13 @@ class ReceiptDialog(QDialog):
                 return b''.join(esc_pos_commands)
             
             commands = create_escpos_for_80x297mm()
-            QMessageBox.information(self, "ESC/POS Ready - 80x297mm", 
-                                  f"ESC/POS commands generated ({len(commands)} bytes)\n"
+            try:
+                job_id = self.pos_window.print_spooler.submit(THERMAL_PRINTER, commands, 'application/vnd.escpos')
+            except Exception as e:
+                QMessageBox.critical(self, "Print Error", f"Could not queue receipt: {str(e)}")
+                return
+            QMessageBox.information(self, "ESC/POS Queued - 80x297mm", 
+                                  f"ESC/POS commands queued as print job {job_id} ({len(commands)} bytes)\n"
                                   "Optimized for 80x297mm thermal paper\n\n"
                                   "Features:\n"
                                   "• 40 character width for perfect 80mm fit\n"
@@ -1016,6 +1199,7 @@ class POSMainWindow(QMainWindow):
         self.tax_enabled = True
         self.current_payment = 0.0
         self.current_quantity_input = ""
+        self.last_receipt_data = None  # Receipt of the paid order, reused by reprints
         
         # Add pagination variables
         self.current_product_page = 0
@@ -1025,11 +1209,35 @@ class POSMainWindow(QMainWindow):
         # Initialize database manager
         self.db_manager = DatabaseManager()
         
-        # Initialize barcode buffer for keyboard wedge scanners
-        self.barcode_buffer = ""
-        self.barcode_timer = QTimer()
-        self.barcode_timer.timeout.connect(self.process_barcode_buffer)
-        self.barcode_timer.setSingleShot(True)
+        # Warm the in-memory catalog so the first scan is as fast as the rest
+        if hasattr(self.db_manager, 'catalog'):
+            self.db_manager.catalog.load()
+        
+        # Product searches run off the GUI thread; only the newest result set is shown
+        self.product_search = ProductSearchWorker(self.db_manager, limit=SEARCH_RESULT_LIMIT, parent=self)
+        self.product_search.results_ready.connect(self.on_search_results)
+        self.product_search.search_failed.connect(self.on_search_failed)
+        
+        # Receipts are rendered on a worker pool so the next order can start right away
+        self.receipt_renderer = ReceiptRenderer(parent=self)
+        self.receipt_renderer.receipt_ready.connect(self.on_receipt_rendered)
+        # A receipt finished while "Start new order?" is open waits here until it closes
+        self.asking_new_order = False
+        self.deferred_receipt = None
+        
+        # Printing goes through a persistent spooler so a jammed printer cannot block checkout
+        self.print_spooler = PrintSpooler(self.db_manager.connections, parent=self)
+        self.print_spooler.job_status_changed.connect(self.on_print_job_status)
+        self.print_spooler.register_printer(RECEIPT_PRINTER, default_document_backend())
+        self.print_spooler.register_printer(THERMAL_PRINTER, default_thermal_backend())
+        
+        # Keyboard wedge scanners: bursts are told from typing by key timing and
+        # dispatched as soon as the suffix arrives; the timer only ends scans
+        # from scanners set up without a suffix
+        self.scanner = scanner_input.decoder_from_environment()
+        self.scanner_timer = QTimer()
+        self.scanner_timer.timeout.connect(self.flush_scanner)
+        self.scanner_timer.setSingleShot(True)
         
         self.init_ui()
         self.setup_menu()
@@ -1279,6 +1487,29 @@ class POSMainWindow(QMainWindow):
             self.product_grid.setColumnMinimumWidth(col, 120)
             self.product_grid.setColumnStretch(col, 1)
         
+        # Fixed pool of buttons, rebound to new products on every page/search/category change
+        self.product_slots = []
+        for i in range(16):
+            btn = ProductButton("Empty Slot")
+            btn.clear_slot()
+            btn.clicked.connect(lambda checked, slot=btn: self.add_product_to_order(slot.product_data))
+            self.product_grid.addWidget(btn, i // 4, i % 4)
+            self.product_slots.append(btn)
+        
+        self.no_products_label = QLabel("No products available.\nUse Products menu to add products.")
+        self.no_products_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        self.no_products_label.setStyleSheet("""
+            QLabel {
+                color: #666;
+                font-size: 14px;
+                padding: 20px;
+                border: 2px dashed #ccc;
+                border-radius: 10px;
+            }
+        """)
+        self.no_products_label.hide()
+        self.product_grid.addWidget(self.no_products_label, 0, 0, 4, 4)
+        
         scroll_widget.setLayout(self.product_grid)
         scroll_area.setWidget(scroll_widget)
         scroll_area.setWidgetResizable(True)
@@ -1435,21 +1666,27 @@ class POSMainWindow(QMainWindow):
             self.current_products_list = []
             self.display_no_products_message()
 
-    def search_products(self, text):
-        """Search products with pagination support"""
+    def search_products(self, text, immediate=False):
+        """Search products in the background; results arrive in on_search_results"""
         if not text.strip():
+            self.product_search.cancel()
             self.load_products_from_database()
             return
         
-        try:
-            products = self.db_manager.search_products(text.strip())
-            self.current_products_list = products
-            self.current_product_page = 0
-            self.update_products_page()
-        except Exception as e:
-            print(f"Error searching products: {e}")
-            self.current_products_list = []
-            self.display_no_products_message()
+        self.product_search.search(text.strip(), immediate)
+
+    def on_search_results(self, products):
+        """Show the newest search results with pagination support"""
+        self.current_products_list = products
+        self.current_product_page = 0
+        self.update_products_page()
+
+    def on_search_failed(self, message):
+        """Clear the grid when a background search fails"""
+        print(f"Error searching products: {message}")
+        self.current_products_list = []
+        self.current_product_page = 0
+        self.update_products_page()
 
     def load_category_products(self, category_name):
         """Load products from a specific category with pagination support"""
@@ -1606,8 +1843,9 @@ class POSMainWindow(QMainWindow):
         layout.setSpacing(5)
         
         # Order table - flexible sizing
-        self.order_table = OrderTable()
-        self.order_table.itemDoubleClicked.connect(self.edit_order_item)
+        self.order_table = OrderTable(self.order_items)
+        self.order_table.doubleClicked.connect(self.edit_order_item)
+        self.order_table.item_removed.connect(self.remove_order_item)
         layout.addWidget(self.order_table, 1)  # Give it stretch factor of 1
         
         # Keypad and totals - fixed sizing
@@ -1837,31 +2075,18 @@ class POSMainWindow(QMainWindow):
         panel.setLayout(layout)
         return panel
     
-    def load_products_from_database(self):
-        """Load products from database into the grid"""
-        try:
-            products = self.db_manager.get_all_products()
-            self.display_products(products[:20])  # Show first 20 products
-        except Exception as e:
-            print(f"Error loading products: {e}")
-            self.display_no_products_message()
-    
     def display_products(self, products):
         """Display products in a fixed 4x4 grid (16 products per page)"""
-        # Clear existing products
-        for i in reversed(range(self.product_grid.count())): 
-            widget = self.product_grid.itemAt(i).widget()
-            if widget:
-                widget.setParent(None)
-        
         if not products:
             self.display_no_products_message()
             return
         
+        self.no_products_label.hide()
+        
         # Display products in exactly 4x4 grid (16 products)
         products_to_show = products[:16]  # Limit to 16 products for 4x4 grid
         
-        for i, product in enumerate(products_to_show):
+        for btn, product in zip(self.product_slots, products_to_show):
             product_data = {
                 'id': product[0],
                 'name': product[1],
@@ -1875,49 +2100,19 @@ class POSMainWindow(QMainWindow):
             if len(product) > 6 and product[6]:  # Has category
                 color = self.get_category_color(product[6])
             
-            btn = ProductButton(product[1], color, product_data)
-            btn.clicked.connect(lambda checked, data=product_data: self.add_product_to_order(data))
-            
-            # Fixed 4x4 grid layout
-            row = i // 4  # 4 columns per row
-            col = i % 4
-            self.product_grid.addWidget(btn, row, col)
-        
-        # Fill empty slots with placeholder buttons if less than 16 products
-        for i in range(len(products_to_show), 16):
-            placeholder = QPushButton("Empty Slot")
-            placeholder.setMinimumSize(120, 80)
-            placeholder.setMaximumSize(200, 120)
-            placeholder.setEnabled(False)
-            placeholder.setStyleSheet("""
-                QPushButton {
-                    background-color: #f0f0f0;
-                    border: 2px dashed #ccc;
-                    border-radius: 8px;
-                    color: #999;
-                    font-style: italic;
-                    font-size: 10px;
-                }
-            """)
-            
-            row = i // 4
-            col = i % 4
-            self.product_grid.addWidget(placeholder, row, col)
+            btn.bind(product[1], color, product_data)
+            btn.show()
+        
+        # Remaining slots become empty placeholders if less than 16 products
+        for btn in self.product_slots[len(products_to_show):]:
+            btn.clear_slot()
+            btn.show()
     
     def display_no_products_message(self):
         """Display message when no products are available"""
-        empty_label = QLabel("No products available.\nUse Products menu to add products.")
-        empty_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
-        empty_label.setStyleSheet("""
-            QLabel {
-                color: #666;
-                font-size: 14px;
-                padding: 20px;
-                border: 2px dashed #ccc;
-                border-radius: 10px;
-            }
-        """)
-        self.product_grid.addWidget(empty_label, 0, 0, 1, 5)
+        for btn in self.product_slots:
+            btn.hide()
+        self.no_products_label.show()
     
     def get_category_color(self, category_name):
         """Get color for category (simplified version)"""
@@ -1925,20 +2120,6 @@ class POSMainWindow(QMainWindow):
         colors = ["#FF6B6B", "#4ECDC4", "#04C2ED", "#00BC64", "#FDC716", "#FF53FF", "#FF8147", "#4E41FF"]
         return colors[hash(category_name) % len(colors)]
     
-    def search_products(self, text):
-        """Search products by name or barcode"""
-        if not text.strip():
-            self.load_products_from_database()
-            return
-        
-        try:
-            # Search in database
-            products = self.db_manager.search_products(text.strip())
-            self.display_products(products)
-        except Exception as e:
-            print(f"Error searching products: {e}")
-            self.display_no_products_message()
-    
     def on_search_enter(self):
         """Handle Enter key in search field - try to add product directly"""
         search_text = self.search_input.text().strip()
@@ -1954,7 +2135,7 @@ class POSMainWindow(QMainWindow):
                     'name': product[1],
                     'barcode': product[2],
                     'sale_price': product[8],  # sale_price is at index 8 in product tuple
-                    'category': 'General'
+                    'category': product[5] or 'General'
                 }
                 self.add_product_to_order(product_data)
                 self.search_input.clear()
@@ -1962,8 +2143,8 @@ class POSMainWindow(QMainWindow):
         except Exception as e:
             print(f"Error searching by barcode: {e}")
         
-        # If no exact barcode match, show search results
-        self.search_products(search_text)
+        # If no exact barcode match, show search results without waiting for the debounce
+        self.search_products(search_text, immediate=True)
     
     def manual_barcode_entry(self):
         """Manual barcode entry dialog"""
@@ -1986,7 +2167,7 @@ class POSMainWindow(QMainWindow):
                     'name': product[1],
                     'barcode': product[2],
                     'sale_price': product[8],  # sale_price is at index 8
-                    'category': 'General'
+                    'category': product[5] or 'General'
                 }
                 self.add_product_to_order(product_data)
                 
@@ -1999,45 +2180,55 @@ class POSMainWindow(QMainWindow):
         except Exception as e:
             QMessageBox.critical(self, "Error", f"Error processing barcode: {str(e)}")
     
-    def process_barcode_buffer(self):
-        """Process accumulated barcode data from keyboard wedge scanner"""
-        if self.barcode_buffer:
-            self.process_barcode(self.barcode_buffer)
-            self.barcode_buffer = ""
+    def show_rejected_scan(self, burst):
+        """Tell the cashier a scan was read but not accepted as a barcode"""
+        QMessageBox.warning(self, "Product Not Found", 
+                          f"Scan not recognised as a barcode: {burst}")
+    
+    def flush_scanner(self):
+        """End a scan from a scanner that sends no suffix once its keys stop"""
+        scan = self.scanner.flush()
+        if scan:
+            self.process_barcode(scan.code)
+        elif self.scanner.rejected:
+            self.show_rejected_scan(self.scanner.rejected)
     
     def keyPressEvent(self, event):
         """Handle keyboard input for barcode scanners"""
         # Handle barcode scanner input (keyboard wedge mode)
         if event.key() == Qt.Key.Key_Return or event.key() == Qt.Key.Key_Enter:
-            if self.barcode_buffer:
-                self.process_barcode_buffer()
-            else:
-                super().keyPressEvent(event)
-        elif event.text().isdigit():
-            # Accumulate digits for barcode
-            self.barcode_buffer += event.text()
-            self.barcode_timer.start(500)  # 500ms timeout for barcode completion
+            text = '\r'
         else:
-            # Reset buffer for non-digit keys
-            self.barcode_buffer = ""
-            super().keyPressEvent(event)
+            text = event.text()
+        scan = self.scanner.feed(text, event.timestamp() or time.monotonic() * 1000)
+        if scan:
+            self.scanner_timer.stop()
+            self.process_barcode(scan.code)
+            return
+        if self.scanner.rejected:
+            self.scanner_timer.stop()
+            self.show_rejected_scan(self.scanner.rejected)
+            return
+        if not self.scanner.suffix and self.scanner.pending():
+            self.scanner_timer.start(self.scanner.max_gap_ms)
+        super().keyPressEvent(event)
+    
+    def closeEvent(self, event):
+        """Stop background work while the database connections are still open"""
+        # Searches first, then receipts still rendering, then the printer threads;
+        # the connections themselves are closed at exit, after all of these
+        self.scanner_timer.stop()
+        self.product_search.shutdown()
+        self.receipt_renderer.shutdown()
+        self.print_spooler.shutdown()
+        super().closeEvent(event)
     
     def add_product_to_order(self, product_data):
         """Add selected product to the order"""
         if not product_data:
             return
-            
-        # Check if product already exists in order
-        for i, item in enumerate(self.order_items):
-            if item['barcode'] == product_data.get('barcode', ''):
-                # Increase quantity
-                item['quantity'] += 1
-                item['total'] = item['quantity'] * item['price']
-                self.update_order_display()
-                self.calculate_totals()
-                return
         
-        # Add new item
+        # Lines with the same barcode are merged by the model
         order_item = {
             'description': product_data.get('name', 'Unknown Product'),
             'quantity': 1,
@@ -2047,47 +2238,23 @@ class POSMainWindow(QMainWindow):
             'product_id': product_data.get('id', 0)
         }
         
-        self.order_items.append(order_item)
-        self.update_order_display()
+        self.order_table.order_model.add_item(order_item)
         self.calculate_totals()
     
     def update_order_display(self):
-        """Update the order table display"""
-        self.order_table.setRowCount(len(self.order_items))
-        
-        for i, item in enumerate(self.order_items):
-            self.order_table.setItem(i, 0, QTableWidgetItem(item['description']))
-            self.order_table.setItem(i, 1, QTableWidgetItem(f"{item['quantity']:.2f}"))
-            self.order_table.setItem(i, 2, QTableWidgetItem(f"{item['price']:.2f}"))
-            self.order_table.setItem(i, 3, QTableWidgetItem(f"{item['total']:.2f}"))
-            
-            # Add remove button
-            remove_btn = QPushButton("X")
-            remove_btn.setMaximumSize(30, 30)
-            remove_btn.setStyleSheet("""
-                QPushButton {
-                    background-color: #DC143C;
-                    color: white;
-                    border: 1px solid #333;
-                    border-radius: 3px;
-                    font-weight: bold;
-                }
-            """)
-            remove_btn.clicked.connect(lambda checked, row=i: self.remove_order_item(row))
-            self.order_table.setCellWidget(i, 4, remove_btn)
-            
-            self.order_table.setItem(i, 5, QTableWidgetItem(item['barcode']))
+        """Reload the whole order table after order_items was replaced in bulk"""
+        self.order_table.order_model.reset()
     
     def remove_order_item(self, row):
         """Remove item from order"""
         if 0 <= row < len(self.order_items):
-            del self.order_items[row]
-            self.update_order_display()
+            self.order_table.order_model.remove_row(row)
             self.calculate_totals()
     
     def calculate_totals(self):
         """Calculate order totals"""
-        self.subtotal = sum(item['total'] for item in self.order_items)
+        # Subtotal is kept up to date by the order model as lines change
+        self.subtotal = self.order_table.order_model.subtotal
         
         # Apply discount
         if self.discount_percentage > 0:
@@ -2125,189 +2292,20 @@ class POSMainWindow(QMainWindow):
             except ValueError:
                 pass
     
-    def create_receipt(self):
-        """Create professional PDF receipt using ReportLab for 80x297mm paper with customer info"""
-        if not REPORTLAB_AVAILABLE:
-            # Fallback to text receipt if ReportLab not available
-            return self.create_text_receipt()
-        
-        if not self.order_items:
-            return None
-        
-        # Receipt configuration for 80x297mm paper
-        receipt_width = 80 * mm  # 80mm width
-        base_height = 130 * mm   # Increased base height for customer info
-        item_height = 5 * mm     # Height per item
-        
-        # Calculate dynamic height based on items (max 297mm)
-        calculated_height = base_height + (len(self.order_items) * item_height)
-        receipt_height = min(calculated_height, 297 * mm)  # Cap at 297mm
+    def prepare_receipt(self, context=None):
+        """Snapshot the current order for rendering; a payment allocates and records its receipt number"""
+        if self.tax_enabled:
+            tax_amount = (self.subtotal - self.discount_amount) * self.tax_rate
+        else:
+            tax_amount = 0
         
-        # Create temporary PDF file
-        receipt_file = os.path.join(tempfile.gettempdir(), f"receipt_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf")
+        total = self.subtotal - self.discount_amount + tax_amount
+        change = self.current_payment - total if self.current_payment > total else 0
+        sale_date = datetime.now()
         
-        try:
-            c = canvas.Canvas(receipt_file, pagesize=(receipt_width, receipt_height))
-            y_position = receipt_height - 10 * mm  # Start from top with margin
-            
-            # Define compact column positions for 80mm width
-            left_margin = 1 * mm
-            right_margin = 1 * mm
-            usable_width = receipt_width - left_margin - right_margin  # 78mm usable
-            
-            # Store Header
-            c.setFont("Helvetica-Bold", 11)
-            c.drawCentredString(receipt_width / 2, y_position, "WHOLESALE DEALER POS")
-            y_position -= 4 * mm
-            
-            c.setFont("Helvetica", 9)
-            c.drawCentredString(receipt_width / 2, y_position, "Your Business Name")
-            y_position -= 3 * mm
-            c.drawCentredString(receipt_width / 2, y_position, "123 Business Street")
-            y_position -= 3 * mm
-            c.drawCentredString(receipt_width / 2, y_position, "City, State 12345")
-            y_position -= 3 * mm
-            c.drawCentredString(receipt_width / 2, y_position, "Phone: (555) 123-4567")
-            y_position -= 5 * mm
-            
-            # Separator line
-            c.line(left_margin, y_position, receipt_width - right_margin, y_position)
-            y_position -= 4 * mm
-            
-            # Receipt Details
-            receipt_number = f"R{datetime.now().strftime('%Y%m%d%H%M%S')}"
-            c.setFont("Helvetica", 8)
-            c.drawString(left_margin, y_position, f"Receipt #: {receipt_number}")
-            y_position -= 3 * mm
-            c.drawString(left_margin, y_position, f"Date: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-            y_position -= 3 * mm
-            c.drawString(left_margin, y_position, "Cashier: POS User")
-            y_position -= 3 * mm
-            
-            # Customer information if available
-            if self.current_customer:
-                c.drawString(left_margin, y_position, f"Customer: {self.current_customer['name']}")
-                y_position -= 3 * mm
-            
-            y_position -= 1 * mm
-            
-            # Items Header
-            c.line(left_margin, y_position, receipt_width - right_margin, y_position)
-            y_position -= 3 * mm
-            
-            c.setFont("Helvetica-Bold", 7)
-            c.drawString(left_margin, y_position, "Item")
-            c.drawString(left_margin + 45 * mm, y_position, "Qty")
-            c.drawString(left_margin + 55 * mm, y_position, "Price")
-            c.drawString(left_margin + 67 * mm, y_position, "Tot")
-            y_position -= 3 * mm
-            
-            c.line(left_margin, y_position, receipt_width - right_margin, y_position)
-            y_position -= 3 * mm
-            
-            # Items with compact alignment
-            c.setFont("Helvetica", 6)
-            for item in self.order_items:
-                # Item name (truncate to fit in 45mm ≈ 18 chars at 6pt)
-                item_name = item['description']
-                if len(item_name) > 18:
-                    item_name = item_name[:15] + "..."
-                
-                c.drawString(left_margin, y_position, item_name)
-                
-                # Quantity
-                qty_text = f"{item['quantity']:.1f}"
-                c.drawRightString(left_margin + 54 * mm, y_position, qty_text)
-                
-                # Price
-                price_text = f"{item['price']:.0f}"
-                c.drawRightString(left_margin + 66 * mm, y_position, price_text)
-                
-                # Total
-                total_text = f"{item['total']:.0f}"
-                c.drawRightString(left_margin + 77 * mm, y_position, total_text)
-                
-                y_position -= 3.5 * mm
-                
-                # Check if we're running out of space
-                if y_position < 35 * mm:
-                    break
-            
-            # Totals Section
-            y_position -= 2 * mm
-            c.line(left_margin, y_position, receipt_width - right_margin, y_position)
-            y_position -= 4 * mm
-            
-            # Calculate totals
-            if self.tax_enabled:
-                tax_amount = (self.subtotal - self.discount_amount) * self.tax_rate
-            else:
-                tax_amount = 0
-            
-            total = self.subtotal - self.discount_amount + tax_amount
-            
-            c.setFont("Helvetica", 8)
-            
-            # Subtotal
-            c.drawString(left_margin, y_position, "Subtotal:")
-            c.drawRightString(receipt_width - right_margin, y_position, f"{self.subtotal:.2f}")
-            y_position -= 3 * mm
-            
-            # Discount (if applicable)
-            if self.discount_amount > 0:
-                c.drawString(left_margin, y_position, "Discount:")
-                c.drawRightString(receipt_width - right_margin, y_position, f"-{self.discount_amount:.2f}")
-                y_position -= 3 * mm
-            
-            # Tax (if applicable)
-            if self.tax_enabled and tax_amount > 0:
-                c.drawString(left_margin, y_position, f"Tax ({int(self.tax_rate * 100)}%):")
-                c.drawRightString(receipt_width - right_margin, y_position, f"{tax_amount:.2f}")
-                y_position -= 3 * mm
-            
-            # Total
-            y_position -= 1 * mm
-            c.line(left_margin, y_position, receipt_width - right_margin, y_position)
-            y_position -= 4 * mm
-            
-            c.setFont("Helvetica-Bold", 10)
-            c.drawString(left_margin, y_position, "TOTAL:")
-            c.drawRightString(receipt_width - right_margin, y_position, f"{total:.2f}")
-            y_position -= 5 * mm
-            
-            # Payment & Change
-            c.setFont("Helvetica", 8)
-            c.drawString(left_margin, y_position, "Payment:")
-            c.drawRightString(receipt_width - right_margin, y_position, f"{self.current_payment:.2f}")
-            y_position -= 3 * mm
-            
-            change = self.current_payment - total if self.current_payment > total else 0
-            c.drawString(left_margin, y_position, "Change:")
-            c.drawRightString(receipt_width - right_margin, y_position, f"{change:.2f}")
-            y_position -= 5 * mm
-            
-            # Footer
-            c.line(left_margin, y_position, receipt_width - right_margin, y_position)
-            y_position -= 4 * mm
-            
-            c.setFont("Helvetica", 8)
-            c.drawCentredString(receipt_width / 2, y_position, "Thank you for your business!")
-            y_position -= 3 * mm
-            
-            if self.current_customer:
-                c.drawCentredString(receipt_width / 2, y_position, f"Thank you, {self.current_customer['name']}!")
-                y_position -= 3 * mm
-            
-            c.drawCentredString(receipt_width / 2, y_position, "Please come again!")
-            y_position -= 4 * mm
-            
-            c.setFont("Helvetica", 7)
-            c.drawCentredString(receipt_width / 2, y_position, "Return Policy: 30 days")
-            y_position -= 2.5 * mm
-            c.drawCentredString(receipt_width / 2, y_position, "Keep this receipt for returns")
-            
-            # Save PDF
-            c.save()
+        if context and context.get('payment'):
+            # The only place a number is taken from the sequence, so previews leave no gaps
+            receipt_number = self.db_manager.next_receipt_number()
             
             # Store receipt data for database
             self.last_receipt_data = {
@@ -2318,123 +2316,90 @@ class POSMainWindow(QMainWindow):
                 'total_amount': total,
                 'payment_amount': self.current_payment,
                 'change_amount': change,
-                'sale_date': datetime.now().isoformat(),
-                'receipt_file': receipt_file
+                'sale_date': sale_date.isoformat()
             }
-            
-            # Verify the file was created successfully
-            if os.path.exists(receipt_file) and os.path.getsize(receipt_file) > 0:
-                return receipt_file
-            else:
-                print("PDF creation failed - file not created or empty")
-                return self.create_text_receipt()
-                
-        except Exception as e:
-            print(f"Error creating PDF receipt: {e}")
-            # Return text receipt as fallback
-            return self.create_text_receipt()
-
-    # Update the create_text_receipt method to include customer info
-    def create_text_receipt(self):
-        """Compact text receipt with customer info for 80mm thermal paper"""
-        receipt_lines = []
-        
-        # Header (32 characters wide for 80mm paper)
-        receipt_lines.append("================================")
-        receipt_lines.append("     WHOLESALE DEALER POS")
-        receipt_lines.append("      Your Business Name")
-        receipt_lines.append("    123 Business Street")
-        receipt_lines.append("      City, State 12345")
-        receipt_lines.append("    Phone: (555) 123-4567")
-        receipt_lines.append("================================")
-        receipt_lines.append("")
-        
-        # Receipt info
-        receipt_number = f"R{datetime.now().strftime('%Y%m%d%H%M%S')}"
-        receipt_lines.append(f"Receipt #: {receipt_number}")
-        receipt_lines.append(f"Date: {datetime.now().strftime('%Y-%m-%d %H:%M')}")
-        receipt_lines.append(f"Cashier: POS User")
-        
-        # Customer info if available
-        if self.current_customer:
-            receipt_lines.append(f"Customer: {self.current_customer['name'][:22]}")
-        
-        receipt_lines.append("--------------------------------")
-        receipt_lines.append("")
-        
-        # Compact items header (32 chars total)
-        receipt_lines.append("Item            Qty  Prc  Tot")
-        receipt_lines.append("--------------------------------")
-        
-        # Items with tight alignment for 32 chars
-        for item in self.order_items:
-            # Item name (15 chars max)
-            name = item['description'][:15].ljust(15)
-            # Qty (3 chars)
-            qty_str = f"{item['quantity']:.0f}".rjust(3)
-            # Price (4 chars)
-            price_str = f"{item['price']:.0f}".rjust(4)
-            # Total (5 chars)
-            total_str = f"{item['total']:.0f}".rjust(5)
-            
-            # Create 32-char line
-            line = f"{name} {qty_str} {price_str} {total_str}"
-            receipt_lines.append(line)
-        
-        receipt_lines.append("--------------------------------")
-        receipt_lines.append("")
-        
-        # Totals with compact alignment
-        receipt_lines.append(f"{'Subtotal:':<20} {self.subtotal:>10.2f}")
-        
-        if self.discount_amount > 0:
-            receipt_lines.append(f"{'Discount:':<20} -{self.discount_amount:>9.2f}")
-        
-        if self.tax_enabled:
-            tax_amount = (self.subtotal - self.discount_amount) * self.tax_rate
-            receipt_lines.append(f"{'Tax:':<20} {tax_amount:>10.2f}")
+        elif self.last_receipt_data:
+            # Reprint of the order just paid: same number and date as the sale
+            receipt_number = self.last_receipt_data['receipt_number']
+            sale_date = datetime.fromisoformat(self.last_receipt_data['sale_date'])
         else:
-            tax_amount = 0
-        
-        total = self.subtotal - self.discount_amount + tax_amount
-        receipt_lines.append("================================")
-        receipt_lines.append(f"{'TOTAL:':<20} {total:>10.2f}")
-        receipt_lines.append("================================")
-        receipt_lines.append("")
-        
-        # Payment info
-        receipt_lines.append(f"{'Payment:':<20} {self.current_payment:>10.2f}")
-        change = self.current_payment - total if self.current_payment > total else 0
-        receipt_lines.append(f"{'Change:':<20} {change:>10.2f}")
-        receipt_lines.append("")
-        
-        # Footer
-        receipt_lines.append("================================")
-        receipt_lines.append("    Thank you for your business!")
+            receipt_number = DRAFT_RECEIPT_NUMBER
         
-        if self.current_customer:
-            customer_name = self.current_customer['name'][:20]
-            receipt_lines.append(f"    Thank you, {customer_name}!")
-        
-        receipt_lines.append("       Please come again!")
-        receipt_lines.append("")
-        receipt_lines.append("      Return Policy: 30 days")
-        receipt_lines.append("   Keep this receipt for returns")
-        receipt_lines.append("================================")
-        
-        # Store data for fallback
-        self.last_receipt_data = {
+        # Copies only, so the order can be cleared while the receipt renders
+        return {
             'receipt_number': receipt_number,
+            'sale_date': sale_date,
+            'items': [dict(item) for item in self.order_items],
+            'customer_name': self.current_customer['name'] if self.current_customer else None,
             'subtotal': self.subtotal,
             'discount_amount': self.discount_amount,
+            'tax_enabled': self.tax_enabled,
+            'tax_rate': self.tax_rate,
             'tax_amount': tax_amount,
             'total_amount': total,
             'payment_amount': self.current_payment,
             'change_amount': change,
-            'sale_date': datetime.now().isoformat()
+            'context': context or {}
         }
+    
+    def create_receipt(self):
+        """Render the receipt synchronously: a PDF path, or receipt text without ReportLab"""
+        if not self.order_items:
+            return None
         
-        return "\n".join(receipt_lines)
+        result = render_receipt(self.prepare_receipt(), REPORTLAB_AVAILABLE)
+        if self.last_receipt_data:
+            self.last_receipt_data['receipt_file'] = result['content'] if result['kind'] == 'pdf' else None
+        return result['content']
+    
+    def create_text_receipt(self):
+        """Compact text receipt with customer info for 80mm thermal paper"""
+        return render_receipt(self.prepare_receipt(), prefer_pdf=False)['content']
+    
+    def on_print_job_status(self, job_id, printer, status, message):
+        """Report spooler progress in the status bar"""
+        if status == 'done':
+            self.statusBar().showMessage(f"Print job {job_id} sent to {printer} printer", 3000)
+        elif status == 'retrying':
+            self.statusBar().showMessage(f"Printer {printer} not responding, retrying job {job_id}: {message}", 5000)
+        elif status == 'failed':
+            self.statusBar().showMessage(f"Print job {job_id} failed on {printer} printer: {message}", 10000)
+    
+    def on_receipt_rendered(self, result):
+        """Show a receipt once the background renderer has produced it"""
+        context = result['context']
+        if self.asking_new_order:
+            self.deferred_receipt = result
+            return
+        self.statusBar().showMessage(
+            f"Receipt {result['receipt_number']} rendered in {result['render_ms']:.0f} ms", 3000
+        )
+        
+        if result['kind'] == 'text':
+            # Text receipt
+            receipt_dialog = ReceiptDialog(result['content'], self)
+            receipt_dialog.receipt_saved = context.get('sale_saved', False)
+            receipt_dialog.setAttribute(Qt.WidgetAttribute.WA_DeleteOnClose)
+            receipt_dialog.show()
+        elif os.path.exists(result['content']):
+            # PDF receipt
+            if context.get('payment'):
+                customer_info = ""
+                if context.get('customer_name'):
+                    customer_info = f"\n👤 Customer: {context['customer_name']}"
+                
+                QMessageBox.information(self, "Payment Complete", 
+                                    f"Payment processed successfully!{customer_info}\n\n"
+                                    f"📄 Professional PDF receipt created\n"
+                                    f"💾 Sale {'saved' if context.get('sale_saved') else 'not saved'} to database\n"
+                                    f"🖨️ Ready for thermal printer\n\n"
+                                    f"Receipt: {result['receipt_number']}")
+            
+            pdf_dialog = PDFReceiptDialog(result['content'], self)
+            pdf_dialog.setAttribute(Qt.WidgetAttribute.WA_DeleteOnClose)
+            pdf_dialog.show()
+        else:
+            QMessageBox.warning(self, "Warning", "Receipt creation failed!")
         
     def save_sale_to_database(self):
         """Save the sale to database"""
@@ -2461,8 +2426,8 @@ class POSMainWindow(QMainWindow):
                 receipt_data['sale_date']
             )
             
-            # Save to database using the database manager
-            sale_id = self.db_manager.save_sale(sale_data, self.order_items)
+            # Sale, stock and customer ledger are committed in one transaction
+            sale_id = self.db_manager.save_sale(sale_data, self.order_items, self.current_customer)
             
             if sale_id:
                 self.statusBar().showMessage(
@@ -2515,80 +2480,15 @@ class POSMainWindow(QMainWindow):
                 QMessageBox.critical(self, "Error", "Failed to create receipt!")
     
     def print_pdf_direct(self, pdf_file):
-        """Print PDF receipt directly to thermal printer"""
+        """Queue a PDF receipt on the receipt printer spooler"""
         try:
-            if os.name == "nt":  # Windows
-                # Try to find SumatraPDF in common locations
-                sumatra_paths = [
-                    r"C:\Users\DeLL\AppData\Local\SumatraPDF\SumatraPDF.exe",
-                    r"C:\Program Files\SumatraPDF\SumatraPDF.exe",
-                    r"C:\Program Files (x86)\SumatraPDF\SumatraPDF.exe",
-                    os.path.expanduser(r"~\AppData\Local\SumatraPDF\SumatraPDF.exe")
-                ]
-                
-                sumatra_path = None
-                for path in sumatra_paths:
-                    if os.path.exists(path):
-                        sumatra_path = path
-                        break
-                
-                if sumatra_path:
-                    # Silent print to default printer
-                    subprocess.run([sumatra_path, "-print-to-default", pdf_file], 
-                                 check=True, shell=True)
-                    QMessageBox.information(self, "Success", 
-                                          "Receipt sent to thermal printer!\n"
-                                          f"PDF saved: {pdf_file}")
-                else:
-                    # Fallback: try to print using Windows default
-                    os.startfile(pdf_file, "print")
-                    QMessageBox.information(self, "Print", 
-                                          "Receipt opened for printing.\n"
-                                          "Please select your thermal printer.")
-                    
-            else:  # macOS & Linux
-                # Use lp command for Unix-like systems
-                subprocess.run(["lp", pdf_file], check=True)
-                QMessageBox.information(self, "Success", 
-                                      "Receipt sent to printer!\n"
-                                      f"PDF saved: {pdf_file}")
-                
-        except subprocess.CalledProcessError as e:
-            QMessageBox.warning(self, "Print Error", 
-                              f"Failed to print receipt: {e}\n"
-                              f"PDF saved at: {pdf_file}")
+            with open(pdf_file, 'rb') as f:
+                job_id = self.print_spooler.submit(RECEIPT_PRINTER, f.read(), 'application/pdf')
+            self.statusBar().showMessage(f"Receipt queued for printing (job {job_id})", 3000)
         except Exception as e:
             QMessageBox.warning(self, "Print Error", 
                               f"Print error: {e}\n"
                               f"PDF saved at: {pdf_file}")
-        
-        try:
-            # Prepare sale data
-            receipt_data = self.last_receipt_data
-            sale_data = (
-                receipt_data['receipt_number'],
-                receipt_data['subtotal'],
-                receipt_data['discount_amount'],
-                receipt_data['tax_amount'],
-                receipt_data['total_amount'],
-                receipt_data['payment_amount'],
-                receipt_data['change_amount'],
-                receipt_data['sale_date']
-            )
-            
-            # Save to database
-            sale_id = self.db_manager.save_sale(sale_data, self.order_items)
-            
-            if sale_id:
-                self.statusBar().showMessage(f"Sale saved successfully! Receipt: {receipt_data['receipt_number']}", 3000)
-                return True
-            else:
-                QMessageBox.warning(self, "Warning", "Failed to save sale to database!")
-                return False
-                
-        except Exception as e:
-            QMessageBox.critical(self, "Error", f"Error saving sale: {str(e)}")
-            return False
     
     def print_receipt(self):
         """Print or preview receipt"""
@@ -2596,9 +2496,8 @@ class POSMainWindow(QMainWindow):
             QMessageBox.warning(self, "Warning", "No items in order to print!")
             return
         
-        receipt_text = self.create_receipt()
-        dialog = ReceiptDialog(receipt_text, self)
-        dialog.exec()
+        # The dialog opens from on_receipt_rendered when the text is ready
+        self.receipt_renderer.render(self.prepare_receipt(), prefer_pdf=False)
 
     # Menu action handlers
     def new_order(self):
@@ -2611,17 +2510,21 @@ class POSMainWindow(QMainWindow):
             if reply == QMessageBox.StandardButton.No:
                 return
         
-        self.order_items.clear()
+        self.clear_order()
+        
+        # Update status bar
+        self.statusBar().showMessage("New order started - Ready", 2000)
+    
+    def clear_order(self):
+        """Empty the order and reset payment, discount and customer"""
+        self.order_table.order_model.clear()
         self.current_payment = 0.0
         self.discount_amount = 0.0
         self.discount_percentage = 0.0
         self.current_quantity_input = ""
         self.current_customer = None  # Clear customer selection
-        self.update_order_display()
+        self.last_receipt_data = None
         self.calculate_totals()
-        
-        # Update status bar
-        self.statusBar().showMessage("New order started - Ready", 2000)
     
     def open_product_management(self):
         """Open product management dialog"""
@@ -2680,19 +2583,92 @@ class POSMainWindow(QMainWindow):
         QMessageBox.information(self, "Vendor Management", "Vendor management window will be implemented in separate module.")
     
     def open_sales_report(self):
-        QMessageBox.information(self, "Sales Report", "Sales report window will be implemented in separate module.")
+        """Open sales report dialog"""
+        try:
+            dialog = SalesReportDialog(self)
+            dialog.exec()
+        except Exception as e:
+            QMessageBox.critical(self, "Error", f"Failed to open sales report: {str(e)}")
     
     def open_inventory_report(self):
-        QMessageBox.information(self, "Inventory Report", "Inventory report window will be implemented in separate module.")
+        """Open inventory report dialog"""
+        try:
+            dialog = InventoryReportDialog(self)
+            dialog.exec()
+        except Exception as e:
+            QMessageBox.critical(self, "Error", f"Failed to open inventory report: {str(e)}")
     
     def open_customer_report(self):
         QMessageBox.information(self, "Customer Report", "Customer report window will be implemented in separate module.")
     
     def hold_order(self):
-        QMessageBox.information(self, "Hold Order", "Hold order functionality will be implemented.")
+        """Park the current order and start an empty one"""
+        if not self.order_items:
+            QMessageBox.information(self, "Hold Order", "There is no order to hold.")
+            return
+        
+        try:
+            with self.db_manager.connections.transaction() as conn:
+                order_id = parked_orders.park_order(conn.cursor(), self.order_items, self.current_customer,
+                                                    self.discount_amount, self.discount_percentage)
+            
+            self.clear_order()
+            self.statusBar().showMessage(f"Order parked as #{order_id} - Ready for next customer", 3000)
+        except Exception as e:
+            QMessageBox.critical(self, "Error", f"Failed to hold order: {str(e)}")
     
     def recall_order(self):
-        QMessageBox.information(self, "Recall Order", "Recall order functionality will be implemented.")
+        """Bring a parked order back to the till"""
+        try:
+            with self.db_manager.connections.read() as conn:
+                parked = parked_orders.list_parked_orders(conn)
+            
+            if not parked:
+                QMessageBox.information(self, "Recall Order", "There are no parked orders.")
+                return
+            
+            choices = [f"#{order_id}  {str(parked_date)[11:16]}  {customer_name or 'Walk-in'}  "
+                       f"{item_count} items  ${subtotal:.2f}"
+                       for order_id, customer_name, item_count, subtotal, parked_date in parked]
+            choice, ok = QInputDialog.getItem(self, "Recall Order", "Parked orders:", choices, 0, False)
+            if not ok:
+                return
+            order_id = parked[choices.index(choice)][0]
+            
+            if self.order_items:
+                reply = QMessageBox.question(self, "Recall Order",
+                                             "Park the current order and recall the selected one?",
+                                             QMessageBox.StandardButton.Yes |
+                                             QMessageBox.StandardButton.No)
+                if reply == QMessageBox.StandardButton.No:
+                    return
+            
+            # Park the current order and take the selected one in a single transaction
+            with self.db_manager.connections.transaction() as conn:
+                cursor = conn.cursor()
+                held_id = None
+                if self.order_items:
+                    held_id = parked_orders.park_order(cursor, self.order_items, self.current_customer,
+                                                       self.discount_amount, self.discount_percentage)
+                order = parked_orders.take_parked_order(cursor, order_id)
+                if order is None:
+                    raise LookupError(f"Parked order #{order_id} was already recalled")
+            
+            self.clear_order()
+            # Swap the lines in and rebuild the table once
+            self.order_items[:] = order['items']
+            self.update_order_display()
+            self.current_customer = order['customer']
+            self.discount_amount = order['discount_amount']
+            self.discount_percentage = order['discount_percentage']
+            self.calculate_totals()
+            
+            message = f"Recalled order #{order_id} ({len(self.order_items)} items)"
+            if held_id:
+                message += f" - current order parked as #{held_id}"
+            self.statusBar().showMessage(message, 3000)
+        except Exception as e:
+            QMessageBox.critical(self, "Error", f"Failed to recall order: {str(e)}")
     
     def open_settings(self):
         QMessageBox.information(self, "Settings", "Settings window will be implemented in separate module.")
@@ -2844,29 +2820,29 @@ Built with: PyQt6 + SQLite
     def void_last_item(self):
         """Void the last item in order"""
         if self.order_items:
-            self.order_items.pop()
-            self.update_order_display()
-            self.calculate_totals()
+            self.remove_order_item(len(self.order_items) - 1)
     
-    def edit_order_item(self, item):
+    def edit_order_item(self, index):
         """Edit order item on double click"""
-        row = item.row()
+        # Clicks on the remove button are handled by its delegate
+        if index.column() == 4:
+            return
+        
+        row = index.row()
         if 0 <= row < len(self.order_items):
             current_qty = self.order_items[row]['quantity']
             new_qty, ok = QInputDialog.getDouble(self, "Edit Quantity", 
                                                f"Enter new quantity for {self.order_items[row]['description']}:", 
                                                value=current_qty, min=0.01, decimals=2)
             if ok:
-                self.order_items[row]['quantity'] = new_qty
-                self.order_items[row]['total'] = new_qty * self.order_items[row]['price']
-                self.update_order_display()
+                self.order_table.order_model.set_quantity(row, new_qty)
                 self.calculate_totals()
     
     def change_quantity(self):
         """Change quantity of selected item"""
         current_row = self.order_table.currentRow()
         if current_row >= 0 and current_row < len(self.order_items):
-            self.edit_order_item(self.order_table.item(current_row, 0))
+            self.edit_order_item(self.order_table.order_model.index(current_row, 0))
     
     def remove_selected_item(self):
         """Remove selected item from order"""
@@ -2908,89 +2884,35 @@ Built with: PyQt6 + SQLite
         self.current_payment = payment
         self.calculate_totals()
         
-        # Create receipt (PDF or text)
-        receipt_result = self.create_receipt()
+        # Snapshot the order for its receipt; rendering happens in the background
+        receipt = self.prepare_receipt({
+            'payment': True,
+            'customer_name': self.current_customer['name'] if self.current_customer else None
+        })
         
-        # Save sale to database with customer information
+        # Save sale, stock movements and customer ledger in one commit
         sale_saved = self.save_sale_to_database()
         
-        # Handle customer transaction if customer is selected
-        if self.current_customer and sale_saved:
-            try:
-                conn = sqlite3.connect(self.db_manager.db_path)
-                cursor = conn.cursor()
-                
-                # Add sale transaction to customer account
-                cursor.execute('''
-                    INSERT INTO customer_transactions 
-                    (customer_id, transaction_type, amount, description, reference_number)
-                    VALUES (?, ?, ?, ?, ?)
-                ''', (self.current_customer['id'], 'SALE', total, 
-                    f"POS Sale - {len(self.order_items)} items", 
-                    self.last_receipt_data.get('receipt_number', '')))
-                
-                # Update customer balance and statistics
-                cursor.execute('''
-                    UPDATE customers 
-                    SET current_balance = current_balance + ?,
-                        total_purchases = total_purchases + ?,
-                        last_purchase_date = ?
-                    WHERE id = ?
-                ''', (total, total, datetime.now().isoformat(), self.current_customer['id']))
-                
-                # Update the sale record with customer information
-                cursor.execute('''
-                    UPDATE sales 
-                    SET customer_id = ?, customer_name = ?
-                    WHERE receipt_number = ?
-                ''', (self.current_customer['id'], self.current_customer['name'], 
-                    self.last_receipt_data.get('receipt_number', '')))
-                
-                conn.commit()
-                conn.close()
-                
-            except Exception as e:
-                print(f"Error updating customer transaction: {e}")
-        
-        # Show receipt based on type
-        if isinstance(receipt_result, str):
-            # Text receipt
-            receipt_dialog = ReceiptDialog(receipt_result, self)
-            receipt_dialog.receipt_saved = sale_saved
-            receipt_dialog.exec()
-        else:
-            # PDF receipt
-            if receipt_result and os.path.exists(receipt_result):
-                if REPORTLAB_AVAILABLE:
-                    customer_info = ""
-                    if self.current_customer:
-                        customer_info = f"\n👤 Customer: {self.current_customer['name']}"
-                    
-                    QMessageBox.information(self, "Payment Complete", 
-                                        f"Payment processed successfully!{customer_info}\n\n"
-                                        f"📄 Professional PDF receipt created\n"
-                                        f"💾 Sale {'saved' if sale_saved else 'not saved'} to database\n"
-                                        f"🖨️ Ready for thermal printer\n\n"
-                                        f"Receipt: {self.last_receipt_data.get('receipt_number', 'N/A')}")
-                    
-                    # Show PDF dialog
-                    pdf_dialog = PDFReceiptDialog(receipt_result, self)
-                    pdf_dialog.exec()
-                else:
-                    QMessageBox.information(self, "Payment Complete", 
-                                        "Payment processed successfully!\n"
-                                        "Install ReportLab for professional PDF receipts:\n"
-                                        "pip install reportlab")
-            else:
-                QMessageBox.warning(self, "Warning", "Payment processed but receipt creation failed!")
+        # The receipt dialog opens from on_receipt_rendered when the file is ready
+        receipt['context']['sale_saved'] = sale_saved
+        self.receipt_renderer.render(receipt, REPORTLAB_AVAILABLE)
         
         # Ask if want to start new order
-        reply = QMessageBox.question(self, "New Order", 
-                                "Start new order?",
-                                QMessageBox.StandardButton.Yes | 
-                                QMessageBox.StandardButton.No)
+        self.asking_new_order = True
+        try:
+            reply = QMessageBox.question(self, "New Order", 
+                                    "Start new order?",
+                                    QMessageBox.StandardButton.Yes | 
+                                    QMessageBox.StandardButton.No)
+        finally:
+            self.asking_new_order = False
         if reply == QMessageBox.StandardButton.Yes:
             self.new_order()
+        
+        # Show the receipt that was rendered while the question was open
+        if self.deferred_receipt:
+            result, self.deferred_receipt = self.deferred_receipt, None
+            self.on_receipt_rendered(result)
 
 def main():
     app = QApplication(sys.argv)
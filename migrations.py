@@ -0,0 +1,361 @@
+import os
+import threading
+import customer_ledger
+import data_versions
+import inventory_summary
+import product_search
+import sales_rollups
+
+# Databases already migrated by this process
+_migrated = set()
+_migrated_lock = threading.Lock()
+
+
+def add_column(cursor, table, column, definition):
+    """Add a column unless the table already has it"""
+    cursor.execute(f"PRAGMA table_info({table})")
+    if column not in [row[1] for row in cursor.fetchall()]:
+        cursor.execute(f'ALTER TABLE {table} ADD COLUMN {column} {definition}')
+
+
+def create_product_tables(cursor):
+    """Products, categories, vendors and stock types"""
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS products (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT NOT NULL,
+        barcode TEXT UNIQUE NOT NULL,
+        stock_type TEXT NOT NULL,
+        quantity INTEGER DEFAULT 0,
+        sub_quantity INTEGER DEFAULT 1,
+        purchase_price REAL DEFAULT 0.0,
+        wholesale_price REAL DEFAULT 0.0,
+        sale_price REAL DEFAULT 0.0,
+        min_stock_threshold INTEGER DEFAULT 0,
+        manufacture_date TEXT,
+        expiry_date TEXT,
+        shelf_number TEXT,
+        category_id INTEGER,
+        description TEXT,
+        vendor_id INTEGER,
+        image_path TEXT,
+        created_date TEXT DEFAULT CURRENT_TIMESTAMP,
+        updated_date TEXT DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (category_id) REFERENCES categories (id),
+        FOREIGN KEY (vendor_id) REFERENCES vendors (id)
+    )
+    ''')
+
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS categories (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT UNIQUE NOT NULL,
+        description TEXT,
+        color_code TEXT DEFAULT '#4A90E2',
+        created_date TEXT DEFAULT CURRENT_TIMESTAMP
+    )
+    ''')
+
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS vendors (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT NOT NULL,
+        contact_person TEXT,
+        address TEXT,
+        phone TEXT,
+        email TEXT,
+        tax_info TEXT,
+        created_date TEXT DEFAULT CURRENT_TIMESTAMP
+    )
+    ''')
+
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS stock_types (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT UNIQUE NOT NULL,
+        abbreviation TEXT,
+        item_type TEXT,
+        created_date TEXT DEFAULT CURRENT_TIMESTAMP
+    )
+    ''')
+
+
+def upgrade_product_columns(cursor):
+    """Columns added to products and stock_types after their first release"""
+    add_column(cursor, 'stock_types', 'item_type', 'TEXT')
+    add_column(cursor, 'stock_types', 'created_date', 'TEXT DEFAULT CURRENT_TIMESTAMP')
+    add_column(cursor, 'products', 'category_id', 'INTEGER')
+    add_column(cursor, 'products', 'purchase_price', 'REAL DEFAULT 0.0')
+    add_column(cursor, 'products', 'wholesale_price', 'REAL DEFAULT 0.0')
+    add_column(cursor, 'products', 'min_stock_threshold', 'INTEGER DEFAULT 10')
+    add_column(cursor, 'products', 'supplier', 'TEXT DEFAULT ""')
+
+
+def create_sales_tables(cursor):
+    """Sales, their items and stock movements written at checkout"""
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS sales (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        receipt_number TEXT UNIQUE NOT NULL,
+        customer_name TEXT,
+        subtotal REAL DEFAULT 0.0,
+        discount_amount REAL DEFAULT 0.0,
+        tax_amount REAL DEFAULT 0.0,
+        total_amount REAL DEFAULT 0.0,
+        payment_amount REAL DEFAULT 0.0,
+        change_amount REAL DEFAULT 0.0,
+        sale_date TEXT DEFAULT CURRENT_TIMESTAMP,
+        cashier TEXT DEFAULT 'POS User',
+        customer_id INTEGER
+    )
+    ''')
+
+    # Older sales tables predate customer tracking
+    add_column(cursor, 'sales', 'customer_id', 'INTEGER')
+    add_column(cursor, 'sales', 'customer_name', 'TEXT')
+
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS sale_items (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        sale_id INTEGER,
+        product_id INTEGER,
+        product_name TEXT,
+        quantity REAL,
+        unit_price REAL,
+        total_price REAL,
+        FOREIGN KEY (sale_id) REFERENCES sales (id),
+        FOREIGN KEY (product_id) REFERENCES products (id)
+    )
+    ''')
+
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS stock_movements (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        product_id INTEGER,
+        movement_type TEXT CHECK(movement_type IN ('IN', 'OUT', 'ADJUSTMENT')),
+        quantity_change INTEGER,
+        old_quantity INTEGER,
+        new_quantity INTEGER,
+        reason TEXT,
+        reference_number TEXT,
+        movement_date TEXT DEFAULT CURRENT_TIMESTAMP,
+        created_by TEXT DEFAULT 'POS User',
+        notes TEXT,
+        FOREIGN KEY (product_id) REFERENCES products (id)
+    )
+    ''')
+
+
+def create_customer_tables(cursor):
+    """Customers and their account ledger"""
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS customers (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT NOT NULL,
+        contact_number TEXT,
+        cnic_tax_id TEXT,
+        company_name TEXT,
+        address TEXT,
+        email TEXT,
+        credit_limit REAL DEFAULT 0.0,
+        current_balance REAL DEFAULT 0.0,
+        customer_type TEXT DEFAULT 'Regular' CHECK(customer_type IN ('Regular', 'VIP', 'Wholesale')),
+        discount_percentage REAL DEFAULT 0.0,
+        created_date TEXT DEFAULT CURRENT_TIMESTAMP,
+        last_purchase_date TEXT,
+        total_purchases REAL DEFAULT 0.0,
+        notes TEXT
+    )
+    ''')
+
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS customer_transactions (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        customer_id INTEGER,
+        transaction_type TEXT CHECK(transaction_type IN ('SALE', 'PAYMENT', 'CREDIT', 'DEBIT')),
+        amount REAL,
+        description TEXT,
+        reference_number TEXT,
+        transaction_date TEXT DEFAULT CURRENT_TIMESTAMP,
+        created_by TEXT DEFAULT 'POS User',
+        FOREIGN KEY (customer_id) REFERENCES customers (id)
+    )
+    ''')
+
+
+def create_search_index(cursor):
+    """FTS5 product search index (skipped when SQLite has no FTS5)"""
+    product_search.create_search_index(cursor)
+
+
+def create_print_jobs(cursor):
+    """Persistent print spooler queue"""
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS print_jobs (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        printer TEXT NOT NULL,
+        content_type TEXT,
+        payload BLOB,
+        status TEXT NOT NULL DEFAULT 'queued',
+        attempts INTEGER DEFAULT 0,
+        last_error TEXT,
+        created_date TEXT DEFAULT CURRENT_TIMESTAMP,
+        updated_date TEXT DEFAULT CURRENT_TIMESTAMP
+    )
+    ''')
+    cursor.execute('''
+    CREATE INDEX IF NOT EXISTS idx_print_jobs_pending
+    ON print_jobs(printer, status)
+    ''')
+
+
+def create_receipt_sequences(cursor):
+    """Receipt number sequences and the block log used to audit gaps"""
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS receipt_sequences (
+        terminal_id TEXT PRIMARY KEY,
+        next_value INTEGER NOT NULL DEFAULT 1
+    )
+    ''')
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS receipt_number_blocks (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        terminal_id TEXT NOT NULL,
+        first_value INTEGER NOT NULL,
+        last_value INTEGER NOT NULL,
+        last_used INTEGER,
+        reserved_date TEXT DEFAULT CURRENT_TIMESTAMP,
+        released_date TEXT
+    )
+    ''')
+
+
+# Secondary indexes for the hot lookups, joins and sorts (checked by query_plan_check.py)
+INDEXES = [
+    ('idx_products_name', 'products(name)'),
+    ('idx_products_category_name', 'products(category_id, name)'),
+    ('idx_sale_items_sale_id', 'sale_items(sale_id)'),
+    ('idx_sale_items_product_id', 'sale_items(product_id)'),
+    ('idx_sales_sale_date', 'sales(sale_date)'),
+    ('idx_stock_movements_product_date', 'stock_movements(product_id, movement_date)'),
+    ('idx_stock_movements_date', 'stock_movements(movement_date)'),
+    ('idx_customer_transactions_customer_date', 'customer_transactions(customer_id, transaction_date)'),
+    ('idx_customer_transactions_date', 'customer_transactions(transaction_date)'),
+    ('idx_customers_name', 'customers(name)'),
+]
+
+
+def create_indexes(cursor):
+    """Secondary indexes for hot queries"""
+    for name, definition in INDEXES:
+        cursor.execute(f'CREATE INDEX IF NOT EXISTS {name} ON {definition}')
+    # Give the planner statistics for the new indexes
+    cursor.execute('ANALYZE')
+
+
+def create_inventory_summary(cursor):
+    """Trigger-maintained inventory summary figures"""
+    inventory_summary.create_summary(cursor)
+
+
+def add_ledger_balance(cursor):
+    """Running balance stored on every customer ledger row"""
+    add_column(cursor, 'customer_transactions', 'balance_after', 'REAL')
+    customer_ledger.backfill_balances(cursor)
+
+
+def create_data_version_counters(cursor):
+    """Trigger-maintained data version counters for report caching"""
+    data_versions.create_data_versions(cursor, {'customers': ('customers', 'customer_transactions')})
+
+
+def create_sales_rollups(cursor):
+    """Daily sales rollups for the sales report"""
+    sales_rollups.create_rollups(cursor)
+
+
+def add_products_data_version(cursor):
+    """Data version counter for products, for the inventory report"""
+    data_versions.create_data_versions(cursor, {'products': ('products',)})
+
+
+def create_parked_orders(cursor):
+    """Orders parked at the till to be recalled later"""
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS parked_orders (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        customer_id INTEGER,
+        customer_name TEXT,
+        item_count INTEGER NOT NULL,
+        subtotal REAL NOT NULL,
+        discount_amount REAL DEFAULT 0.0,
+        discount_percentage REAL DEFAULT 0.0,
+        lines BLOB NOT NULL,
+        parked_date TEXT DEFAULT CURRENT_TIMESTAMP
+    )
+    ''')
+
+
+def add_vendor_delete_search_trigger(cursor):
+    """Clear vendor names from the product search index when the vendor is deleted"""
+    if product_search.search_index_exists(cursor.connection):
+        product_search.create_vendor_delete_trigger(cursor)
+
+
+# Ordered schema versions. Never edit or reorder a released step; append a new one.
+# Every step must be safe on databases created before versioning existed.
+MIGRATIONS = [
+    (1, create_product_tables),
+    (2, upgrade_product_columns),
+    (3, create_sales_tables),
+    (4, create_customer_tables),
+    (5, create_search_index),
+    (6, create_print_jobs),
+    (7, create_receipt_sequences),
+    (8, create_indexes),
+    (9, create_inventory_summary),
+    (10, add_ledger_balance),
+    (11, create_data_version_counters),
+    (12, create_sales_rollups),
+    (13, add_products_data_version),
+    (14, create_parked_orders),
+    (15, add_vendor_delete_search_trigger),
+]
+
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+
+def schema_version(conn):
+    """Current PRAGMA user_version of a database"""
+    return conn.execute('PRAGMA user_version').fetchone()[0]
+
+
+def migrate(connections):
+    """Bring a database up to SCHEMA_VERSION, once per process
+
+    Each step runs in its own transaction together with its user_version
+    bump, so an interrupted upgrade resumes at the step that failed.
+    Returns the version numbers applied by this call.
+    """
+    applied = []
+    key = os.path.abspath(connections.db_path)
+    with _migrated_lock:
+        if key in _migrated:
+            return applied
+
+        with connections.read() as conn:
+            version = schema_version(conn)
+
+        for number, step in MIGRATIONS:
+            if number <= version:
+                continue
+            with connections.transaction() as conn:
+                # Re-check under the write lock in case another process got here first
+                if schema_version(conn) >= number:
+                    continue
+                step(conn.cursor())
+                conn.execute(f'PRAGMA user_version = {number}')
+            applied.append(number)
+
+        _migrated.add(key)
+    return applied
@@ -0,0 +1,106 @@
+import struct
+import sys
+import zlib
+from array import array
+from datetime import datetime
+
+# Layout version written at the start of every packed order
+FORMAT_VERSION = 1
+HEADER = struct.Struct('<BI')   # version, line count
+
+# Separates descriptions and barcodes in the packed text block
+TEXT_SEPARATOR = '\x00'
+
+
+def pack_lines(items):
+    """Pack order lines into one compressed blob
+
+    Product ids, quantities and prices are stored as little-endian column
+    arrays, followed by the descriptions and barcodes as one text block.
+    Line totals are not stored; they are quantity * price again on unpack.
+    """
+    product_ids = array('q', [item.get('product_id') or 0 for item in items])
+    quantities = array('d', [item['quantity'] for item in items])
+    prices = array('d', [item['price'] for item in items])
+    if sys.byteorder == 'big':
+        for column in (product_ids, quantities, prices):
+            column.byteswap()
+
+    text = TEXT_SEPARATOR.join([item['description'] for item in items] +
+                               [item['barcode'] for item in items])
+    return zlib.compress(HEADER.pack(FORMAT_VERSION, len(items)) + product_ids.tobytes() +
+                         quantities.tobytes() + prices.tobytes() + text.encode('utf-8'), 1)
+
+
+def unpack_lines(blob):
+    """Order line dicts, as the order table holds them, from a packed blob"""
+    data = zlib.decompress(blob)
+    version, count = HEADER.unpack_from(data)
+    if version != FORMAT_VERSION:
+        raise ValueError(f"Unknown parked order format {version}")
+
+    offset = HEADER.size
+    columns = []
+    for typecode in ('q', 'd', 'd'):
+        column = array(typecode)
+        end = offset + count * column.itemsize
+        column.frombytes(data[offset:end])
+        if sys.byteorder == 'big':
+            column.byteswap()
+        columns.append(column)
+        offset = end
+
+    texts = data[offset:].decode('utf-8').split(TEXT_SEPARATOR) if count else []
+    return [{
+        'description': description,
+        'quantity': quantity,
+        'price': price,
+        'total': quantity * price,
+        'barcode': barcode,
+        'product_id': product_id,
+    } for product_id, quantity, price, description, barcode
+        in zip(columns[0], columns[1], columns[2], texts[:count], texts[count:])]
+
+
+def park_order(cursor, items, customer=None, discount_amount=0.0, discount_percentage=0.0):
+    """Store an order so the till can serve someone else; returns the parked order id"""
+    cursor.execute('''
+        INSERT INTO parked_orders (customer_id, customer_name, item_count, subtotal,
+                                   discount_amount, discount_percentage, lines, parked_date)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    ''', (customer['id'] if customer else None, customer['name'] if customer else None,
+          len(items), sum(item['total'] for item in items), discount_amount, discount_percentage,
+          pack_lines(items), datetime.now().isoformat()))
+    return cursor.lastrowid
+
+
+def list_parked_orders(conn):
+    """(id, customer name, item count, subtotal, parked date) of every parked order, oldest first"""
+    return conn.execute('''
+        SELECT id, customer_name, item_count, subtotal, parked_date
+        FROM parked_orders
+        ORDER BY id
+    ''').fetchall()
+
+
+def take_parked_order(cursor, order_id):
+    """Remove a parked order and return it as a dict, or None if it is gone
+
+    Run in a write transaction so two tills cannot recall the same order.
+    """
+    cursor.execute('''
+        SELECT customer_id, customer_name, discount_amount, discount_percentage, lines
+        FROM parked_orders WHERE id = ?
+    ''', (order_id,))
+    row = cursor.fetchone()
+    if row is None:
+        return None
+    cursor.execute('DELETE FROM parked_orders WHERE id = ?', (order_id,))
+
+    customer_id, customer_name, discount_amount, discount_percentage, lines = row
+    return {
+        'items': unpack_lines(lines),
+        'customer': {'id': customer_id, 'name': customer_name} if customer_id is not None else None,
+        'discount_amount': discount_amount or 0.0,
+        'discount_percentage': discount_percentage or 0.0,
+    }
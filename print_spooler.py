@@ -0,0 +1,321 @@
+import os
+import queue
+import socket
+import subprocess
+import tempfile
+import threading
+import time
+from datetime import datetime
+from PyQt6.QtCore import QObject, pyqtSignal
+
+# Retry policy for a job that fails to reach its printer
+MAX_ATTEMPTS = 5
+BACKOFF_SECONDS = 1.0
+MAX_BACKOFF_SECONDS = 30.0
+
+# Longest a single backend call may block its dispatcher thread
+SEND_TIMEOUT_SECONDS = 30
+
+# Longest shutdown waits for all dispatchers together; it runs as the window closes
+SHUTDOWN_WAIT_SECONDS = 2
+
+# Job states reported to the UI
+QUEUED = 'queued'
+PRINTING = 'printing'
+RETRYING = 'retrying'
+DONE = 'done'
+FAILED = 'failed'
+
+
+class CommandBackend:
+    """Print by running a command; the payload goes to stdin or to a temp file for '{file}'"""
+
+    def __init__(self, command, suffix='.bin'):
+        self.command = command
+        self.suffix = suffix
+
+    def send(self, payload):
+        if '{file}' not in self.command:
+            subprocess.run(self.command, input=payload, check=True,
+                           capture_output=True, timeout=SEND_TIMEOUT_SECONDS)
+            return
+
+        fd, path = tempfile.mkstemp(suffix=self.suffix, prefix='pos_print_')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(payload)
+            command = [path if part == '{file}' else part for part in self.command]
+            subprocess.run(command, check=True, capture_output=True, timeout=SEND_TIMEOUT_SECONDS)
+        finally:
+            os.remove(path)
+
+    def __repr__(self):
+        return f"CommandBackend({' '.join(self.command)})"
+
+
+class LpBackend(CommandBackend):
+    """Print through CUPS/lp, optionally to a named destination"""
+
+    def __init__(self, destination=None, options=None):
+        command = ['lp']
+        if destination:
+            command += ['-d', destination]
+        for option in options or []:
+            command += ['-o', option]
+        super().__init__(command)
+
+
+class RawDeviceBackend:
+    """Write the payload straight to a printer device such as /dev/usb/lp0 or LPT1"""
+
+    def __init__(self, device):
+        self.device = device
+
+    def send(self, payload):
+        with open(self.device, 'wb') as device:
+            device.write(payload)
+
+    def __repr__(self):
+        return f"RawDeviceBackend({self.device})"
+
+
+class SocketBackend:
+    """Send the payload to a network printer's raw port (JetDirect, usually 9100)"""
+
+    def __init__(self, host, port=9100, timeout=SEND_TIMEOUT_SECONDS):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+
+    def send(self, payload):
+        with socket.create_connection((self.host, self.port), timeout=self.timeout) as sock:
+            sock.sendall(payload)
+
+    def __repr__(self):
+        return f"SocketBackend({self.host}:{self.port})"
+
+
+class FileBackend:
+    """Write every job to its own file in a directory (testing and archiving)"""
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.count = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def send(self, payload):
+        self.count += 1
+        name = f"job_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{self.count}.bin"
+        with open(os.path.join(self.directory, name), 'wb') as f:
+            f.write(payload)
+
+    def __repr__(self):
+        return f"FileBackend({self.directory})"
+
+
+def backend_from_uri(uri):
+    """Build a backend from a printer URI
+
+    lp: / lp:NAME, tcp://HOST[:PORT], file:DIRECTORY, dev:PATH (or any absolute device path)
+    """
+    if uri == 'lp' or uri.startswith('lp:'):
+        return LpBackend(uri[3:] or None)
+    if uri.startswith('tcp://'):
+        host, _, port = uri[6:].partition(':')
+        return SocketBackend(host, int(port) if port else 9100)
+    if uri.startswith('file:'):
+        return FileBackend(uri[5:])
+    if uri.startswith('dev:'):
+        return RawDeviceBackend(uri[4:])
+    if os.path.isabs(uri):
+        return RawDeviceBackend(uri)
+    raise ValueError(f"Unknown printer URI: {uri}")
+
+
+class ShellPrintBackend:
+    """Hand a document to the Windows shell 'print' verb (default printer and viewer)"""
+
+    def __init__(self, suffix='.pdf'):
+        self.suffix = suffix
+
+    def send(self, payload):
+        # The shell prints asynchronously, so the file is left for the viewer to read
+        fd, path = tempfile.mkstemp(suffix=self.suffix, prefix='pos_print_')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(payload)
+        os.startfile(path, "print")
+
+    def __repr__(self):
+        return "ShellPrintBackend()"
+
+
+def find_sumatra_pdf():
+    """Locate SumatraPDF for silent PDF printing on Windows"""
+    sumatra_paths = [
+        r"C:\Program Files\SumatraPDF\SumatraPDF.exe",
+        r"C:\Program Files (x86)\SumatraPDF\SumatraPDF.exe",
+        os.path.expanduser(r"~\AppData\Local\SumatraPDF\SumatraPDF.exe")
+    ]
+    for path in sumatra_paths:
+        if os.path.exists(path):
+            return path
+    return None
+
+
+def default_document_backend():
+    """Backend for PDF receipts: SumatraPDF or the shell on Windows, lp elsewhere"""
+    uri = os.environ.get('POS_RECEIPT_PRINTER')
+    if uri:
+        return backend_from_uri(uri)
+    if os.name == "nt":
+        sumatra_path = find_sumatra_pdf()
+        if sumatra_path:
+            return CommandBackend([sumatra_path, "-print-to-default", "{file}"], suffix='.pdf')
+        return ShellPrintBackend()
+    return LpBackend()
+
+
+def default_thermal_backend():
+    """Backend for raw ESC/POS bytes: LPT1 on Windows, lp in raw mode elsewhere"""
+    uri = os.environ.get('POS_THERMAL_PRINTER')
+    if uri:
+        return backend_from_uri(uri)
+    if os.name == "nt":
+        return RawDeviceBackend("LPT1")
+    return LpBackend(options=['raw'])
+
+
+class PrinterDispatcher(threading.Thread):
+    """Background thread that feeds one printer's jobs to its backend, retrying with backoff"""
+
+    def __init__(self, spooler, printer, backend):
+        super().__init__(name=f"print-{printer}", daemon=True)
+        self.spooler = spooler
+        self.printer = printer
+        self.backend = backend
+        self.jobs = queue.Queue()
+        self.stopping = threading.Event()
+
+    def run(self):
+        while not self.stopping.is_set():
+            job = self.jobs.get()
+            if job is None:
+                break
+            self.dispatch(*job)
+
+    def dispatch(self, job_id, payload):
+        delay = BACKOFF_SECONDS
+        for attempt in range(1, MAX_ATTEMPTS + 1):
+            self.spooler.set_status(job_id, self.printer, PRINTING, attempt)
+            try:
+                self.backend.send(payload)
+            except Exception as e:
+                if attempt == MAX_ATTEMPTS:
+                    self.spooler.set_status(job_id, self.printer, FAILED, attempt, str(e))
+                    return
+                self.spooler.set_status(job_id, self.printer, RETRYING, attempt, str(e))
+                # Waiting on the event lets shutdown interrupt the backoff
+                if self.stopping.wait(delay):
+                    return
+                delay = min(delay * 2, MAX_BACKOFF_SECONDS)
+            else:
+                self.spooler.set_status(job_id, self.printer, DONE, attempt)
+                return
+
+    def stop(self):
+        self.stopping.set()
+        self.jobs.put(None)
+
+
+class PrintSpooler(QObject):
+    """Persistent print queue with one background dispatcher per printer
+
+    Jobs are stored in the print_jobs table before they are dispatched, so
+    anything unfinished is picked up again when the printer is registered
+    after a restart. Submitting never blocks on the printer.
+    """
+    job_status_changed = pyqtSignal(int, str, str, str)  # job id, printer, status, message
+
+    def __init__(self, connections, parent=None):
+        super().__init__(parent)
+        self.connections = connections
+        self.dispatchers = {}
+
+    def register_printer(self, printer, backend):
+        """Start a dispatcher for a printer and resume its unfinished jobs"""
+        if printer in self.dispatchers:
+            self.dispatchers[printer].stop()
+
+        dispatcher = PrinterDispatcher(self, printer, backend)
+        self.dispatchers[printer] = dispatcher
+        dispatcher.start()
+
+        with self.connections.read() as conn:
+            pending = conn.execute('''
+                SELECT id, payload FROM print_jobs
+                WHERE printer = ? AND status IN (?, ?, ?)
+                ORDER BY id
+            ''', (printer, QUEUED, PRINTING, RETRYING)).fetchall()
+        for job_id, payload in pending:
+            dispatcher.jobs.put((job_id, payload))
+
+    def submit(self, printer, payload, content_type='application/octet-stream'):
+        """Store a job and hand it to the printer's dispatcher; returns the job id"""
+        if printer not in self.dispatchers:
+            raise KeyError(f"No printer registered as '{printer}'")
+
+        with self.connections.transaction() as conn:
+            cursor = conn.execute('''
+                INSERT INTO print_jobs (printer, content_type, payload, status)
+                VALUES (?, ?, ?, ?)
+            ''', (printer, content_type, payload, QUEUED))
+            job_id = cursor.lastrowid
+
+        self.job_status_changed.emit(job_id, printer, QUEUED, "")
+        self.dispatchers[printer].jobs.put((job_id, payload))
+        return job_id
+
+    def retry(self, job_id):
+        """Queue a failed job again"""
+        with self.connections.read() as conn:
+            row = conn.execute('SELECT printer, payload FROM print_jobs WHERE id = ? AND status = ?',
+                               (job_id, FAILED)).fetchone()
+        if row and row[0] in self.dispatchers:
+            self.set_status(job_id, row[0], QUEUED, 0)
+            self.dispatchers[row[0]].jobs.put((job_id, row[1]))
+            return True
+        return False
+
+    def set_status(self, job_id, printer, status, attempts, message=""):
+        """Record a job's state and tell the UI; printed payloads are dropped"""
+        try:
+            with self.connections.transaction() as conn:
+                conn.execute('''
+                    UPDATE print_jobs
+                    SET status = ?, attempts = ?, last_error = ?, updated_date = ?,
+                        payload = CASE WHEN ? = 'done' THEN NULL ELSE payload END
+                    WHERE id = ?
+                ''', (status, attempts, message or None, datetime.now().isoformat(), status, job_id))
+        except Exception as e:
+            print(f"Error updating print job {job_id}: {e}")
+        self.job_status_changed.emit(job_id, printer, status, message)
+
+    def pending_jobs(self):
+        """Jobs that have not printed yet, oldest first"""
+        with self.connections.read() as conn:
+            return conn.execute('''
+                SELECT id, printer, status, attempts, last_error, created_date
+                FROM print_jobs WHERE status != ?
+                ORDER BY id
+            ''', (DONE,)).fetchall()
+
+    def shutdown(self):
+        """Stop all dispatchers and wait briefly for them; unfinished jobs stay queued in the database"""
+        dispatchers, self.dispatchers = list(self.dispatchers.values()), {}
+        for dispatcher in dispatchers:
+            dispatcher.stop()
+        # One deadline for all of them: a send stuck on a printer is left to its daemon
+        # thread, and its job, still marked printing, is sent again on the next start
+        deadline = time.monotonic() + SHUTDOWN_WAIT_SECONDS
+        for dispatcher in dispatchers:
+            dispatcher.join(max(0, deadline - time.monotonic()))
@@ -0,0 +1,148 @@
+import threading
+import os
+
+# Column order of catalog rows handed out to callers
+CATALOG_COLUMNS = ('id', 'name', 'barcode', 'stock_type', 'quantity', 'category',
+                   'purchase_price', 'wholesale_price', 'sale_price')
+
+PRODUCT_QUERY = '''
+    SELECT id, name, barcode, stock_type, quantity, category_id,
+           COALESCE(purchase_price, 0), COALESCE(wholesale_price, 0), COALESCE(sale_price, 0)
+    FROM products
+'''
+
+
+class ProductCatalog:
+    """In-memory product catalog with hash indexes on id and barcode"""
+
+    def __init__(self, connections):
+        self.connections = connections
+        self._lock = threading.RLock()
+        self._loaded = False
+        self._products = {}         # id -> (id, name, barcode, stock_type, quantity, category_id, purchase, wholesale, sale)
+        self._barcode_index = {}    # barcode -> id
+        self._categories = {}       # id -> (name, color_code)
+
+    def load(self):
+        """Load products and categories in two sequential scans"""
+        # Holding the lock while reading makes concurrent refreshes wait for the load
+        with self._lock, self.connections.read() as conn:
+            categories = {cat_id: (name, color_code) for cat_id, name, color_code
+                          in conn.execute('SELECT id, name, color_code FROM categories')}
+            products = {}
+            barcode_index = {}
+            for row in conn.execute(PRODUCT_QUERY):
+                products[row[0]] = row
+                barcode_index[row[2]] = row[0]
+
+            self._categories = categories
+            self._products = products
+            self._barcode_index = barcode_index
+            self._loaded = True
+
+    def _ensure_loaded(self):
+        if not self._loaded:
+            with self._lock:
+                if not self._loaded:
+                    self.load()
+
+    def _public_row(self, record):
+        """Replace the stored category id with the category name"""
+        category = self._categories.get(record[5])
+        return record[:5] + (category[0] if category else None,) + record[6:]
+
+    def get(self, product_id):
+        """Get a product row by id, or None"""
+        self._ensure_loaded()
+        record = self._products.get(product_id)
+        return self._public_row(record) if record else None
+
+    def get_by_barcode(self, barcode):
+        """Get a product row by exact barcode, or None"""
+        self._ensure_loaded()
+        product_id = self._barcode_index.get(barcode)
+        if product_id is None:
+            return None
+        return self._public_row(self._products[product_id])
+
+    def get_category(self, category_id):
+        """Get (name, color_code) for a category id, or None"""
+        self._ensure_loaded()
+        return self._categories.get(category_id)
+
+    def refresh_product(self, product_id):
+        """Re-read a single product after it was inserted, updated or deleted"""
+        with self.connections.read() as conn:
+            row = conn.execute(PRODUCT_QUERY + ' WHERE id = ?', (product_id,)).fetchone()
+
+        with self._lock:
+            if not self._loaded:
+                return
+            old = self._products.pop(product_id, None)
+            if old and self._barcode_index.get(old[2]) == product_id:
+                del self._barcode_index[old[2]]
+            if row:
+                self._products[product_id] = row
+                self._barcode_index[row[2]] = product_id
+
+    def refresh_product_by_barcode(self, barcode):
+        """Re-read a product that is only known by barcode (e.g. just inserted)"""
+        with self.connections.read() as conn:
+            row = conn.execute('SELECT id FROM products WHERE barcode = ?', (barcode,)).fetchone()
+        if row:
+            self.refresh_product(row[0])
+
+    def refresh_category(self, category_id):
+        """Re-read a single category after it was inserted or updated"""
+        with self.connections.read() as conn:
+            row = conn.execute('SELECT name, color_code FROM categories WHERE id = ?',
+                               (category_id,)).fetchone()
+
+        with self._lock:
+            if not self._loaded:
+                return
+            if row:
+                self._categories[category_id] = row
+            else:
+                self._categories.pop(category_id, None)
+
+    def reassign_category(self, old_category_id, new_category_id):
+        """Move cached products to another category after a bulk UPDATE of category_id"""
+        with self._lock:
+            for product_id, record in self._products.items():
+                if record[5] == old_category_id:
+                    self._products[product_id] = record[:5] + (new_category_id,) + record[6:]
+
+    def update_quantity(self, product_id, quantity):
+        """Apply a known stock level without another database read"""
+        with self._lock:
+            record = self._products.get(product_id)
+            if record:
+                self._products[product_id] = record[:4] + (quantity,) + record[5:]
+
+    def invalidate(self):
+        """Drop everything; the next lookup reloads the whole catalog"""
+        with self._lock:
+            self._loaded = False
+            self._products = {}
+            self._barcode_index = {}
+            self._categories = {}
+
+    def __len__(self):
+        self._ensure_loaded()
+        return len(self._products)
+
+
+_catalogs = {}
+_catalogs_lock = threading.Lock()
+
+
+def get_product_catalog(connections):
+    """Return the process-wide catalog for a connection manager's database"""
+    key = os.path.abspath(connections.db_path)
+    with _catalogs_lock:
+        catalog = _catalogs.get(key)
+        if catalog is None or catalog.connections is not connections:
+            catalog = ProductCatalog(connections)
+            _catalogs[key] = catalog
+        return catalog
@@ -13,373 +13,290 @@ from PyQt6.QtCore import Qt, QDate, pyqtSignal, QThread
 from PyQt6.QtGui import QPixmap, QFont, QIcon
 import random
 import string
+from connection_manager import get_connection_manager
+from product_catalog import get_product_catalog
+import product_search
+import customer_ledger
+import sales_rollups
+import migrations
+from receipt_numbers import get_receipt_allocator
+import scanner_input
 
 class DatabaseManager:
     """Database manager for product-related operations"""
     
     def __init__(self, db_path="pos_database.db"):
         self.db_path = db_path
+        self.connections = get_connection_manager(db_path)
+        self.fts_enabled = False
         self.init_database()
+        self.catalog = get_product_catalog(self.connections)
+        self.receipt_numbers = get_receipt_allocator(self.connections)
     
     def init_database(self):
-        """Initialize the database with required tables"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        # Products table
-        cursor.execute('''
-        CREATE TABLE IF NOT EXISTS products (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            name TEXT NOT NULL,
-            barcode TEXT UNIQUE NOT NULL,
-            stock_type TEXT NOT NULL,
-            quantity INTEGER DEFAULT 0,
-            sub_quantity INTEGER DEFAULT 1,
-            purchase_price REAL DEFAULT 0.0,
-            wholesale_price REAL DEFAULT 0.0,
-            sale_price REAL DEFAULT 0.0,
-            min_stock_threshold INTEGER DEFAULT 0,
-            manufacture_date TEXT,
-            expiry_date TEXT,
-            shelf_number TEXT,
-            category_id INTEGER,
-            description TEXT,
-            vendor_id INTEGER,
-            image_path TEXT,
-            created_date TEXT DEFAULT CURRENT_TIMESTAMP,
-            updated_date TEXT DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (category_id) REFERENCES categories (id),
-            FOREIGN KEY (vendor_id) REFERENCES vendors (id)
-        )
-        ''')
-        
-        # Categories table
-        cursor.execute('''
-        CREATE TABLE IF NOT EXISTS categories (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            name TEXT UNIQUE NOT NULL,
-            description TEXT,
-            color_code TEXT DEFAULT '#4A90E2',
-            created_date TEXT DEFAULT CURRENT_TIMESTAMP
-        )
-        ''')
-        
-        # Vendors table
-        cursor.execute('''
-        CREATE TABLE IF NOT EXISTS vendors (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            name TEXT NOT NULL,
-            contact_person TEXT,
-            address TEXT,
-            phone TEXT,
-            email TEXT,
-            tax_info TEXT,
-            created_date TEXT DEFAULT CURRENT_TIMESTAMP
-        )
-        ''')
-        
-        # Stock types table
-        cursor.execute('''
-        CREATE TABLE IF NOT EXISTS stock_types (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            name TEXT UNIQUE NOT NULL,
-            abbreviation TEXT,
-            item_type TEXT,
-            created_date TEXT DEFAULT CURRENT_TIMESTAMP
-        )
-        ''')
-        
-        # Check if item_type column exists in stock_types table, if not add it
-        cursor.execute("PRAGMA table_info(stock_types)")
-        columns = [column[1] for column in cursor.fetchall()]
-        if 'item_type' not in columns:
-            cursor.execute('ALTER TABLE stock_types ADD COLUMN item_type TEXT')
-            print("Added item_type column to stock_types table")
-        
-        # Check if created_date column exists in stock_types table, if not add it
-        if 'created_date' not in columns:
-            cursor.execute('ALTER TABLE stock_types ADD COLUMN created_date TEXT DEFAULT CURRENT_TIMESTAMP')
-            print("Added created_date column to stock_types table")
-        
-        conn.commit()
-        conn.close()
+        """Bring the database schema up to date (runs the migrations once per process)"""
+        migrations.migrate(self.connections)
+        with self.connections.read() as conn:
+            self.fts_enabled = product_search.search_index_exists(conn)
     
     def generate_barcode(self):
         """Generate a unique barcode"""
         while True:
-            # Generate 13-digit barcode
-            barcode = ''.join(random.choices(string.digits, k=13))
+            # Generate an EAN-13: 12 random digits and their check digit
+            body = ''.join(random.choices(string.digits, k=12))
+            barcode = body + scanner_input.gtin_check_digit(body)
             if not self.barcode_exists(barcode):
                 return barcode
             
     def get_products_by_category(self, category_name):
         """Get products by category name"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
         try:
-            # First, try to get category ID
-            cursor.execute('SELECT id FROM categories WHERE name = ?', (category_name,))
-            category_result = cursor.fetchone()
-            
-            if category_result:
-                category_id = category_result[0]
-                cursor.execute('''
-                    SELECT id, name, barcode, '', quantity, sale_price, '', '', 0 
-                    FROM products 
-                    WHERE category_id = ?
-                    ORDER BY name
-                    LIMIT 50
-                ''', (category_id,))
-            else:
-                # If category not found, return empty list
-                return []
+            with self.connections.read() as conn:
+                cursor = conn.cursor()
+                
+                # First, try to get category ID
+                cursor.execute('SELECT id FROM categories WHERE name = ?', (category_name,))
+                category_result = cursor.fetchone()
                 
-            products = cursor.fetchall()
-            return products
+                if category_result:
+                    category_id = category_result[0]
+                    cursor.execute('''
+                        SELECT id, name, barcode, '', quantity, sale_price, '', '', 0 
+                        FROM products 
+                        WHERE category_id = ?
+                        ORDER BY name
+                        LIMIT 50
+                    ''', (category_id,))
+                else:
+                    # If category not found, return empty list
+                    return []
+                    
+                products = cursor.fetchall()
+                return products
             
         except Exception as e:
             print(f"Error getting products by category: {e}")
             return []
-        finally:
-            conn.close()
 
-    def get_categories(self):
-        """Get all categories"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        try:
-            # Create categories table if it doesn't exist
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS categories (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    name TEXT UNIQUE NOT NULL,
-                    color_code TEXT DEFAULT '#4A90E2'
-                )
-            ''')
+    def next_receipt_number(self):
+            """Allocate a unique receipt number for the next sale"""
+            return self.receipt_numbers.allocate()
+    
+    def save_sale(self, sale_data, sale_items, customer=None):
+            """Commit a whole checkout in one transaction
             
-            # Add category_id column to products table if it doesn't exist
-            try:
-                cursor.execute('ALTER TABLE products ADD COLUMN category_id INTEGER')
-            except sqlite3.OperationalError:
-                # Column already exists
-                pass
+            Writes the sale and its items, takes the sold quantities off stock
+            with matching stock_movements, and posts the sale to the customer's
+            ledger when a customer is given.
+            """
+            receipt_number, total_amount, sale_date = sale_data[0], sale_data[4], sale_data[7]
             
-            # Get all categories
-            cursor.execute('SELECT id, name, color_code FROM categories ORDER BY name')
-            categories = cursor.fetchall()
+            # Quantity sold per product; lines without a product id are not stocked
+            sold = {}
+            for item in sale_items:
+                if item.get('product_id'):
+                    sold[item['product_id']] = sold.get(item['product_id'], 0) + item['quantity']
             
-            # If no categories exist, create some default ones
-            if not categories:
-                default_categories = [
-                    ('General', '#4A90E2'),
-                    ('Food', '#FF6B6B'),
-                    ('Beverages', '#4ECDC4'),
-                    ('Electronics', '#45B7D1'),
-                    ('Clothing', '#96CEB4'),
-                    ('Books', '#FFEAA7')
-                ]
-                
-                for cat_name, cat_color in default_categories:
-                    cursor.execute('INSERT OR IGNORE INTO categories (name, color_code) VALUES (?, ?)', 
-                                (cat_name, cat_color))
-                
-                conn.commit()
+            with self.connections.transaction() as conn:
+                cursor = conn.cursor()
                 
-                # Fetch categories again
-                cursor.execute('SELECT id, name, color_code FROM categories ORDER BY name')
-                categories = cursor.fetchall()
-            
-            return categories
-            
-        except Exception as e:
-            print(f"Error getting categories: {e}")
-            return []
-        finally:
-            conn.close()
-            
-    def save_sale(self, sale_data, sale_items):
-            """Save sale and items to database"""
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            try:
                 # Insert sale
                 cursor.execute('''
                     INSERT INTO sales (receipt_number, subtotal, discount_amount, tax_amount, 
-                                     total_amount, payment_amount, change_amount, sale_date)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-                ''', sale_data)
+                                     total_amount, payment_amount, change_amount, sale_date,
+                                     customer_id, customer_name)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ''', tuple(sale_data) + ((customer['id'], customer['name']) if customer else (None, None)))
                 
                 sale_id = cursor.lastrowid
                 
                 # Insert sale items
-                for item in sale_items:
-                    cursor.execute('''
-                        INSERT INTO sale_items (sale_id, product_id, product_name, quantity, unit_price, total_price)
-                        VALUES (?, ?, ?, ?, ?, ?)
-                    ''', (sale_id, item['product_id'], item['description'], item['quantity'], item['price'], item['total']))
+                cursor.executemany('''
+                    INSERT INTO sale_items (sale_id, product_id, product_name, quantity, unit_price, total_price)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                ''', [(sale_id, item['product_id'], item['description'], item['quantity'], item['price'], item['total'])
+                      for item in sale_items])
+                
+                # Fold the sale into the daily report rollups
+                sales_rollups.record_sale(cursor, sale_id)
+                
+                # Decrement stock, reading current levels inside the same write transaction
+                new_stock = {}
+                if sold:
+                    placeholders = ','.join('?' * len(sold))
+                    cursor.execute(f'SELECT id, quantity FROM products WHERE id IN ({placeholders})',
+                                   tuple(sold))
+                    current_stock = dict(cursor.fetchall())
+                    new_stock = {product_id: (current_stock[product_id] or 0) - quantity
+                                 for product_id, quantity in sold.items() if product_id in current_stock}
+                    
+                    cursor.executemany('''
+                        UPDATE products SET quantity = ?, updated_date = ? WHERE id = ?
+                    ''', [(quantity, sale_date, product_id) for product_id, quantity in new_stock.items()])
+                    
+                    cursor.executemany('''
+                        INSERT INTO stock_movements 
+                        (product_id, movement_type, quantity_change, old_quantity, new_quantity,
+                         reason, reference_number, movement_date)
+                        VALUES (?, 'OUT', ?, ?, ?, 'Sale', ?, ?)
+                    ''', [(product_id, -sold[product_id], current_stock[product_id], quantity,
+                           receipt_number, sale_date) for product_id, quantity in new_stock.items()])
                 
-                conn.commit()
-                return sale_id
-            except Exception as e:
-                conn.rollback()
-                raise e
-            finally:
-                conn.close()
+                # Post the sale to the customer's account
+                if customer:
+                    customer_ledger.post_transaction(cursor, customer['id'], 'SALE', total_amount,
+                                                     f"POS Sale - {len(sale_items)} items",
+                                                     receipt_number, sale_date)
+                    
+                    cursor.execute('''
+                        UPDATE customers 
+                        SET total_purchases = total_purchases + ?,
+                            last_purchase_date = ?
+                        WHERE id = ?
+                    ''', (total_amount, sale_date, customer['id']))
+            
+            # Only after the commit, so a rolled back sale leaves the catalog untouched
+            for product_id, quantity in new_stock.items():
+                self.catalog.update_quantity(product_id, quantity)
+            
+            return sale_id
     
     def barcode_exists(self, barcode):
         """Check if barcode already exists"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        cursor.execute('SELECT id FROM products WHERE barcode = ?', (barcode,))
-        exists = cursor.fetchone() is not None
-        conn.close()
-        return exists
+        with self.connections.read() as conn:
+            cursor = conn.execute('SELECT id FROM products WHERE barcode = ?', (barcode,))
+            return cursor.fetchone() is not None
+    
+    def get_product_by_barcode(self, barcode):
+        """Get product by exact barcode from the in-memory catalog
+        
+        Returns (id, name, barcode, stock_type, quantity, category_name,
+        purchase_price, wholesale_price, sale_price) or None.
+        """
+        return self.catalog.get_by_barcode(barcode)
     
     def get_categories(self):
         """Get all categories"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        cursor.execute('SELECT id, name, color_code FROM categories ORDER BY name')
-        categories = cursor.fetchall()
-        conn.close()
-        return categories
+        with self.connections.read() as conn:
+            cursor = conn.execute('SELECT id, name, color_code FROM categories ORDER BY name')
+            return cursor.fetchall()
+    
+    def get_categories_with_counts(self):
+        """Get all categories with their product counts in one grouped query"""
+        with self.connections.read() as conn:
+            cursor = conn.execute('''
+                SELECT c.id, c.name, c.color_code, COALESCE(counts.product_count, 0)
+                FROM categories c
+                LEFT JOIN (
+                    SELECT category_id, COUNT(*) AS product_count
+                    FROM products
+                    GROUP BY category_id
+                ) counts ON counts.category_id = c.id
+                ORDER BY c.name
+            ''')
+            return cursor.fetchall()
     
     def get_vendors(self):
         """Get all vendors"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        cursor.execute('SELECT id, name FROM vendors ORDER BY name')
-        vendors = cursor.fetchall()
-        conn.close()
-        return vendors
-    def search_products(self, query):
-            """Search products by name or barcode"""
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            cursor.execute('''
-                SELECT id, name, barcode, '', 0, sale_price, '', '', 0 
-                FROM products 
-                WHERE name LIKE ? OR barcode LIKE ?
-                LIMIT 20
-            ''', (f'%{query}%', f'%{query}%'))
-            products = cursor.fetchall()
-            conn.close()
-            return products
+        with self.connections.read() as conn:
+            cursor = conn.execute('SELECT id, name FROM vendors ORDER BY name')
+            return cursor.fetchall()
+    def search_products(self, query, limit=20):
+            """Search products by name, barcode, shelf, category or vendor (bm25 ranked, prefix match)"""
+            with self.connections.read() as conn:
+                if self.fts_enabled:
+                    return product_search.search_products(conn, query, limit)
+                return product_search.search_products_like(conn, query, limit)
     
     def get_stock_types(self):
         """Get all stock types"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        cursor.execute('SELECT id, name, abbreviation, item_type FROM stock_types ORDER BY name')
-        stock_types = cursor.fetchall()
-        conn.close()
-        return stock_types
+        with self.connections.read() as conn:
+            cursor = conn.execute('SELECT id, name, abbreviation, item_type FROM stock_types ORDER BY name')
+            return cursor.fetchall()
     
     def add_stock_type(self, name, abbreviation="", item_type=""):
         """Add new stock type"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
         try:
-            cursor.execute('INSERT INTO stock_types (name, abbreviation, item_type) VALUES (?, ?, ?)',
-                          (name, abbreviation, item_type))
-            conn.commit()
-            stock_type_id = cursor.lastrowid
-            conn.close()
-            return stock_type_id
+            with self.connections.transaction() as conn:
+                cursor = conn.execute('INSERT INTO stock_types (name, abbreviation, item_type) VALUES (?, ?, ?)',
+                                      (name, abbreviation, item_type))
+                return cursor.lastrowid
         except sqlite3.IntegrityError:
-            conn.close()
             return None
     
     def save_product(self, product_data, product_id=None):
         """Save or update product"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        if product_id:
-            # Update existing product
-            cursor.execute('''
-            UPDATE products SET name=?, barcode=?, stock_type=?, quantity=?, sub_quantity=?,
-                               purchase_price=?, wholesale_price=?, sale_price=?, min_stock_threshold=?,
-                               manufacture_date=?, expiry_date=?, shelf_number=?, category_id=?,
-                               description=?, vendor_id=?, image_path=?, updated_date=CURRENT_TIMESTAMP
-            WHERE id=?
-            ''', (*product_data, product_id))
-        else:
-            # Insert new product
-            cursor.execute('''
-            INSERT INTO products (name, barcode, stock_type, quantity, sub_quantity,
-                                 purchase_price, wholesale_price, sale_price, min_stock_threshold,
-                                 manufacture_date, expiry_date, shelf_number, category_id,
-                                 description, vendor_id, image_path)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', product_data)
-        
-        conn.commit()
-        conn.close()
+        with self.connections.transaction() as conn:
+            cursor = conn.cursor()
+            
+            if product_id:
+                # Update existing product
+                cursor.execute('''
+                UPDATE products SET name=?, barcode=?, stock_type=?, quantity=?, sub_quantity=?,
+                                   purchase_price=?, wholesale_price=?, sale_price=?, min_stock_threshold=?,
+                                   manufacture_date=?, expiry_date=?, shelf_number=?, category_id=?,
+                                   description=?, vendor_id=?, image_path=?, updated_date=CURRENT_TIMESTAMP
+                WHERE id=?
+                ''', (*product_data, product_id))
+            else:
+                # Insert new product
+                cursor.execute('''
+                INSERT INTO products (name, barcode, stock_type, quantity, sub_quantity,
+                                     purchase_price, wholesale_price, sale_price, min_stock_threshold,
+                                     manufacture_date, expiry_date, shelf_number, category_id,
+                                     description, vendor_id, image_path)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ''', product_data)
+                product_id = cursor.lastrowid
+        
+        self.catalog.refresh_product(product_id)
+        return product_id
     
     def get_product(self, product_id):
         """Get product by ID"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        cursor.execute('SELECT * FROM products WHERE id = ?', (product_id,))
-        product = cursor.fetchone()
-        conn.close()
-        return product
+        with self.connections.read() as conn:
+            cursor = conn.execute('SELECT * FROM products WHERE id = ?', (product_id,))
+            return cursor.fetchone()
     
     def get_all_products(self):
         """Get all products with category and vendor names"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        cursor.execute('''
-        SELECT p.id, p.name, p.barcode, p.stock_type, p.quantity, p.sale_price,
-               c.name as category_name, v.name as vendor_name, p.min_stock_threshold
-        FROM products p
-        LEFT JOIN categories c ON p.category_id = c.id
-        LEFT JOIN vendors v ON p.vendor_id = v.id
-        ORDER BY p.name
-        ''')
-        products = cursor.fetchall()
-        conn.close()
-        return products
+        with self.connections.read() as conn:
+            cursor = conn.execute('''
+            SELECT p.id, p.name, p.barcode, p.stock_type, p.quantity, p.sale_price,
+                   c.name as category_name, v.name as vendor_name, p.min_stock_threshold
+            FROM products p
+            LEFT JOIN categories c ON p.category_id = c.id
+            LEFT JOIN vendors v ON p.vendor_id = v.id
+            ORDER BY p.name
+            ''')
+            return cursor.fetchall()
     
     def delete_product(self, product_id):
         """Delete product"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        cursor.execute('DELETE FROM products WHERE id = ?', (product_id,))
-        conn.commit()
-        conn.close()
+        with self.connections.transaction() as conn:
+            conn.execute('DELETE FROM products WHERE id = ?', (product_id,))
+        self.catalog.refresh_product(product_id)
     
     def add_category(self, name, description="", color_code="#4A90E2"):
         """Add new category"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
         try:
-            cursor.execute('INSERT INTO categories (name, description, color_code) VALUES (?, ?, ?)',
-                          (name, description, color_code))
-            conn.commit()
-            category_id = cursor.lastrowid
-            conn.close()
-            return category_id
+            with self.connections.transaction() as conn:
+                cursor = conn.execute('INSERT INTO categories (name, description, color_code) VALUES (?, ?, ?)',
+                                      (name, description, color_code))
+                category_id = cursor.lastrowid
         except sqlite3.IntegrityError:
-            conn.close()
             return None
+        self.catalog.refresh_category(category_id)
+        return category_id
     
     def add_vendor(self, name, contact_person="", address="", phone="", email="", tax_info=""):
         """Add new vendor"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        cursor.execute('''
-        INSERT INTO vendors (name, contact_person, address, phone, email, tax_info)
-        VALUES (?, ?, ?, ?, ?, ?)
-        ''', (name, contact_person, address, phone, email, tax_info))
-        conn.commit()
-        vendor_id = cursor.lastrowid
-        conn.close()
-        return vendor_id
+        with self.connections.transaction() as conn:
+            cursor = conn.execute('''
+            INSERT INTO vendors (name, contact_person, address, phone, email, tax_info)
+            VALUES (?, ?, ?, ?, ?, ?)
+            ''', (name, contact_person, address, phone, email, tax_info))
+            return cursor.lastrowid
 
 class AddStockTypeDialog(QDialog):
     """Dialog for adding new stock types"""
@@ -1176,6 +1093,7 @@ class ProductListWidget(QWidget):
         super().__init__(parent)
         self.db_manager = db_manager
         self.count_label = None  # Initialize count label
+        self.total_products = 0
         self.init_ui()
         self.load_products()
     
@@ -1321,12 +1239,21 @@ class ProductListWidget(QWidget):
     def load_products(self):
         """Load products into the table"""
         products = self.db_manager.get_all_products()
-        self.products_table.setRowCount(len(products))
+        self.total_products = len(products)
+        self.display_products(products)
         
         # Update product count if label exists
         if hasattr(self, 'count_label') and self.count_label:
             self.count_label.setText(f"Products: {len(products)}")
         
+        # Keep an active search applied after a refresh
+        if self.search_edit.text().strip():
+            self.filter_products()
+    
+    def display_products(self, products):
+        """Fill the table with product rows"""
+        self.products_table.setRowCount(len(products))
+        
         for row, product in enumerate(products):
             # Adjust for reduced columns (removed vendor column)
             display_data = [
@@ -1360,32 +1287,22 @@ class ProductListWidget(QWidget):
                 self.products_table.setItem(row, col, item)
     
     def filter_products(self):
-        """Filter products based on search text"""
-        search_text = self.search_edit.text().lower()
-        visible_count = 0
-        
-        for row in range(self.products_table.rowCount()):
-            visible = False
-            if not search_text:  # Show all if search is empty
-                visible = True
-            else:
-                # Search in visible columns (skip ID column)
-                for col in range(1, self.products_table.columnCount()):
-                    item = self.products_table.item(row, col)
-                    if item and search_text in item.text().lower():
-                        visible = True
-                        break
-            
-            self.products_table.setRowHidden(row, not visible)
-            if visible:
-                visible_count += 1
+        """Filter products through the full-text search index"""
+        search_text = self.search_edit.text().strip()
+        
+        if search_text:
+            products = self.db_manager.search_products(search_text, limit=None)
+        else:  # Show all if search is empty
+            products = self.db_manager.get_all_products()
+            self.total_products = len(products)
+        self.display_products(products)
         
         # Update count label to show filtered results if label exists
         if hasattr(self, 'count_label') and self.count_label:
             if search_text:
-                self.count_label.setText(f"Showing: {visible_count} of {self.products_table.rowCount()}")
+                self.count_label.setText(f"Showing: {len(products)} of {self.total_products}")
             else:
-                self.count_label.setText(f"Products: {self.products_table.rowCount()}")
+                self.count_label.setText(f"Products: {len(products)}")
     
     def edit_selected_product(self):
         """Edit the selected product"""
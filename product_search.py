@@ -0,0 +1,165 @@
+import re
+import sqlite3
+
+# bm25 column weights: name, barcode, shelf_number, category, vendor
+BM25_WEIGHTS = (10.0, 5.0, 1.0, 2.0, 1.0)
+
+# Columns returned by every search, same order as DatabaseManager.get_all_products
+RESULT_COLUMNS = '''
+    p.id, p.name, p.barcode, p.stock_type, p.quantity, p.sale_price,
+    c.name as category_name, v.name as vendor_name, p.min_stock_threshold
+'''
+
+# Expression that builds one index row for a product, used by triggers and rebuilds
+INDEX_VALUES = '''
+    COALESCE({row}.shelf_number, ''),
+    COALESCE((SELECT name FROM categories WHERE id = {row}.category_id), ''),
+    COALESCE((SELECT name FROM vendors WHERE id = {row}.vendor_id), '')
+'''
+
+SEARCH_INDEX_SCHEMA = [
+    '''
+    CREATE VIRTUAL TABLE IF NOT EXISTS products_fts USING fts5(
+        name, barcode, shelf_number, category, vendor,
+        tokenize = 'unicode61 remove_diacritics 2',
+        prefix = '2 3 4'
+    )
+    ''',
+    f'''
+    CREATE TRIGGER IF NOT EXISTS products_fts_insert AFTER INSERT ON products BEGIN
+        INSERT INTO products_fts (rowid, name, barcode, shelf_number, category, vendor)
+        VALUES (new.id, new.name, new.barcode, {INDEX_VALUES.format(row='new')});
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS products_fts_delete AFTER DELETE ON products BEGIN
+        DELETE FROM products_fts WHERE rowid = old.id;
+    END
+    ''',
+    f'''
+    CREATE TRIGGER IF NOT EXISTS products_fts_update
+    AFTER UPDATE OF name, barcode, shelf_number, category_id, vendor_id ON products BEGIN
+        DELETE FROM products_fts WHERE rowid = old.id;
+        INSERT INTO products_fts (rowid, name, barcode, shelf_number, category, vendor)
+        VALUES (new.id, new.name, new.barcode, {INDEX_VALUES.format(row='new')});
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS categories_fts_update AFTER UPDATE OF name ON categories BEGIN
+        UPDATE products_fts SET category = new.name
+        WHERE rowid IN (SELECT id FROM products WHERE category_id = new.id);
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS categories_fts_delete AFTER DELETE ON categories BEGIN
+        UPDATE products_fts SET category = ''
+        WHERE rowid IN (SELECT id FROM products WHERE category_id = old.id);
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS vendors_fts_update AFTER UPDATE OF name ON vendors BEGIN
+        UPDATE products_fts SET vendor = new.name
+        WHERE rowid IN (SELECT id FROM products WHERE vendor_id = new.id);
+    END
+    ''',
+]
+
+# Added after the index was released, so migrations create it in a step of its own
+VENDOR_DELETE_TRIGGER = '''
+    CREATE TRIGGER IF NOT EXISTS vendors_fts_delete AFTER DELETE ON vendors BEGIN
+        UPDATE products_fts SET vendor = ''
+        WHERE rowid IN (SELECT id FROM products WHERE vendor_id = old.id);
+    END
+'''
+
+
+def create_search_index(cursor):
+    """Create the FTS5 product index and its sync triggers, filling it on first creation
+
+    Returns False when this SQLite build has no FTS5 support.
+    """
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE name = 'products_fts'")
+    exists = cursor.fetchone() is not None
+
+    try:
+        for statement in SEARCH_INDEX_SCHEMA:
+            cursor.execute(statement)
+    except sqlite3.OperationalError as e:
+        print(f"Full-text search unavailable, falling back to LIKE: {e}")
+        return False
+
+    if not exists:
+        rebuild_search_index(cursor)
+    return True
+
+
+def search_index_exists(conn):
+    """Whether the FTS5 product index has been created in this database"""
+    row = conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'products_fts'").fetchone()
+    return row is not None
+
+
+def rebuild_search_index(cursor):
+    """Repopulate the search index from the products table"""
+    cursor.execute('DELETE FROM products_fts')
+    cursor.execute(f'''
+        INSERT INTO products_fts (rowid, name, barcode, shelf_number, category, vendor)
+        SELECT p.id, p.name, p.barcode, {INDEX_VALUES.format(row='p')}
+        FROM products p
+    ''')
+
+
+def create_vendor_delete_trigger(cursor):
+    """Blank the vendor of products whose vendor is deleted, and of those already orphaned"""
+    cursor.execute(VENDOR_DELETE_TRIGGER)
+    cursor.execute('''
+        UPDATE products_fts SET vendor = ''
+        WHERE rowid IN (SELECT id FROM products
+                        WHERE vendor_id IS NOT NULL AND vendor_id NOT IN (SELECT id FROM vendors))
+    ''')
+
+
+def build_match_query(text):
+    """Turn free text into an FTS5 prefix query: every word must match as a prefix"""
+    tokens = re.findall(r'\w+', text)
+    return ' '.join(f'"{token}"*' for token in tokens)
+
+
+def search_products(conn, text, limit=20):
+    """Run a bm25-ranked prefix search; limit=None returns every match"""
+    match_query = build_match_query(text)
+    if not match_query:
+        return []
+
+    weights = ', '.join(str(weight) for weight in BM25_WEIGHTS)
+    cursor = conn.execute(f'''
+        SELECT {RESULT_COLUMNS}
+        FROM products_fts
+        JOIN products p ON p.id = products_fts.rowid
+        LEFT JOIN categories c ON p.category_id = c.id
+        LEFT JOIN vendors v ON p.vendor_id = v.id
+        WHERE products_fts MATCH ?
+        ORDER BY bm25(products_fts, {weights})
+        LIMIT ?
+    ''', (match_query, -1 if limit is None else limit))
+    return cursor.fetchall()
+
+
+def like_pattern(text):
+    """Substring LIKE pattern with the wildcards in text escaped by a backslash"""
+    escaped = text.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+    return f'%{escaped}%'
+
+
+def search_products_like(conn, text, limit=20):
+    """Substring search used only when FTS5 is unavailable"""
+    cursor = conn.execute(f'''
+        SELECT {RESULT_COLUMNS}
+        FROM products p
+        LEFT JOIN categories c ON p.category_id = c.id
+        LEFT JOIN vendors v ON p.vendor_id = v.id
+        WHERE p.name LIKE ? ESCAPE '\\' OR p.barcode LIKE ? ESCAPE '\\'
+        ORDER BY p.name
+        LIMIT ?
+    ''', (like_pattern(text), like_pattern(text), -1 if limit is None else limit))
+    return cursor.fetchall()
@@ -0,0 +1,217 @@
+"""Check that the hot POS queries are served by indexes
+
+Builds a synthetic database of realistic size in a temporary directory, runs
+the schema migrations, then runs every hot code path with its SQL traced and
+EXPLAIN QUERY PLAN on each statement it executed. Fails when a statement scans
+a table or sorts in a temporary B-tree that its path does not explicitly allow.
+Run it after changing a query or the index set:
+
+    python query_plan_check.py [--products N] [--keep PATH]
+"""
+import argparse
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+
+import connection_manager
+import customer_ledger
+import customer_reports
+import migrations
+import product_search
+import receipt_numbers
+import sales_rollups
+import synthetic_data
+from category_management import CATEGORY_PRODUCTS_QUERY
+from customer_management import CUSTOMER_LIST_QUERY
+from inventory_management import InventoryTableModel, StockHistoryModel, NO_CATEGORY
+from product_management import DatabaseManager
+
+# Products in the synthetic database; the other tables scale with it
+DEFAULT_PRODUCTS = 20000
+
+
+def reading(function, *args):
+    """run(db) that calls function(conn, *args) on a pooled reader, as the dialogs do"""
+    def run(db):
+        with db.connections.read() as conn:
+            result = function(conn, *args)
+            if isinstance(result, sqlite3.Cursor):
+                result.fetchall()
+    return run
+
+
+def statement(sql, *params):
+    """run(db) for a statement a dialog executes directly from its module constant"""
+    return reading(lambda conn: conn.execute(sql, params))
+
+
+def inventory_pages(sort_column=1, **filters):
+    """The inventory dialog's first chunk under filters, then the next one by keyset"""
+    def run(db):
+        model = InventoryTableModel(db.connections)
+        model.sort_column = sort_column
+        model.set_filters(**filters)
+        model.fetchMore()
+    return run
+
+
+def history_pages(**filters):
+    """The stock history dialog's first page under filters, then the next one by keyset"""
+    def run(db):
+        model = StockHistoryModel(db.connections)
+        model.set_filters(**filters)
+        model.fetchMore()
+    return run
+
+
+def sales_report(group, date_from='2026-01-01', date_to='2026-10-17'):
+    """Totals plus one breakdown, as the sales report dialog runs them"""
+    def run(conn):
+        sales_rollups.sales_totals(conn, date_from, date_to)
+        if group in sales_rollups.PERIODS:
+            return conn.execute(*sales_rollups.period_query(group, date_from, date_to))
+        return conn.execute(*sales_rollups.dimension_query(group, date_from, date_to, 100))
+    return reading(run)
+
+
+# Every code path the UI runs on a keystroke, scan or page load, and the reports.
+# (name, run, allow_scan): run(db) drives the module that owns the statements,
+# given a DatabaseManager, while the SQL it executes is traced. allow_scan lists
+# the exact plan lines ('SCAN p USING INDEX idx_products_name', 'USE TEMP B-TREE
+# FOR ORDER BY') that the path reads or sorts on purpose; any other SCAN or temp
+# B-tree fails the check, so an index walk that degrades to a bare SCAN fails too.
+NAME_ORDER = 'SCAN p USING INDEX idx_products_name'
+
+HOT_PATHS = [
+    ('product by id', lambda db: db.get_product(42), ()),
+    ('barcode exists', lambda db: db.barcode_exists(synthetic_data.barcode(42)), ()),
+    ('catalog refresh by barcode', lambda db: db.catalog.refresh_product_by_barcode(synthetic_data.barcode(42)), ()),
+    ('products in category', lambda db: db.get_products_by_category('Category 3'), ()),
+    ('product names in category', statement(CATEGORY_PRODUCTS_QUERY, 3), ()),
+    # Whole-table reads on purpose: once per dialog open or catalog load
+    ('category product counts', lambda db: db.get_categories_with_counts(),
+     ('SCAN products USING COVERING INDEX idx_products_category_name',
+      'SCAN c USING INDEX sqlite_autoindex_categories_1')),
+    ('all products by name', lambda db: db.get_all_products(), (NAME_ORDER,)),
+    ('catalog load', lambda db: db.catalog.load(), ('SCAN categories', 'SCAN products')),
+    # bm25 ranking sorts the matched rows
+    ('product search', lambda db: db.search_products('cola ri'), ('USE TEMP B-TREE FOR ORDER BY',)),
+    # Substring LIKE cannot use an index
+    ('product search LIKE fallback', reading(product_search.search_products_like, 'cola'), (NAME_ORDER,)),
+    # The first chunk walks the sort key's index and stops at the LIMIT
+    ('inventory pages', inventory_pages(), (NAME_ORDER,)),
+    ('inventory pages in category', inventory_pages(category=3), ()),
+    ('inventory pages without category', inventory_pages(category=NO_CATEGORY), ()),
+    ('inventory pages for search', inventory_pages(search_text='cola'), (NAME_ORDER,)),
+    # Sort keys from the category join or computed columns have no index
+    ('inventory pages by category', inventory_pages(sort_column=3),
+     ('SCAN p USING INDEX idx_products_category_name', 'USE TEMP B-TREE FOR ORDER BY')),
+    ('stock history pages for product', history_pages(product_id=42), ()),
+    ('stock history pages for date range', history_pages(date_from='2026-01-01', date_to='2026-01-31'), ()),
+    ('customers by name', statement(CUSTOMER_LIST_QUERY), ('SCAN customers USING INDEX idx_customers_name',)),
+    ('customer ledger page', reading(customer_ledger.ledger_page, 42), ()),
+    ('customer ledger page for dates',
+     reading(customer_ledger.ledger_page, 42, '2026-01-01', '2026-03-31', ('2026-02-01', 1000)), ()),
+    ('customer opening balance', reading(customer_ledger.opening_balance, 42, '2026-01-01'), ()),
+    ('customer activity report', reading(customer_reports.REPORTS['Customer Activity']),
+     ('SCAN ct USING INDEX idx_customer_transactions_date',)),
+    ('sales report by month', sales_report('Month'), ('USE TEMP B-TREE FOR GROUP BY',)),
+    ('sales report top products', sales_report('product'),
+     ('USE TEMP B-TREE FOR GROUP BY', 'USE TEMP B-TREE FOR ORDER BY')),
+]
+
+
+def plan_problems(plan, allow_scan):
+    """Plan lines that read a whole table or sort in a temp B-tree without being allowed to"""
+    problems = []
+    for line in plan:
+        if line.startswith('SCAN ') and 'VIRTUAL TABLE' in line and ':M' in line:
+            # An FTS MATCH lookup (INDEX 0:M...) reads only the matching rows
+            continue
+        if not line.startswith(('SCAN ', 'USE TEMP B-TREE')):
+            continue
+        if line not in allow_scan:
+            problems.append(line)
+    return problems
+
+
+def explain(conn, sql, params=()):
+    """EXPLAIN QUERY PLAN detail lines for a statement"""
+    return [row[3] for row in conn.execute(f'EXPLAIN QUERY PLAN {sql}', params)]
+
+
+def traced_statements(db, run):
+    """The queries run(db) executes, with their parameters inlined by SQLite
+
+    Nested read() blocks on one thread share its connection, so tracing the
+    reader borrowed here sees every query the modules run through the pool.
+    """
+    statements = []
+    with db.connections.read() as conn:
+        conn.set_trace_callback(statements.append)
+        try:
+            run(db)
+        finally:
+            conn.set_trace_callback(None)
+    # FTS5 reads its shadow tables ('main'.'products_fts_config', ...) with statements of its own
+    return [sql for sql in statements if sql.lstrip().upper().startswith(('SELECT', 'WITH'))
+            and "'main'.'products_fts_" not in sql]
+
+
+def check(db):
+    """Trace and explain every hot path; returns the number that failed"""
+    failures = 0
+    for name, run, allow_scan in HOT_PATHS:
+        statements = traced_statements(db, run)
+        with db.connections.read() as conn:
+            plans = [explain(conn, sql) for sql in statements]
+        problems = [plan_problems(plan, allow_scan) for plan in plans]
+        failed = not statements or any(problems)
+        print(f"{'FAIL' if failed else 'ok  '}  {name}")
+        if not statements:
+            print("        !! ran no queries")
+        for sql, plan, lines in zip(statements, plans, problems):
+            print(f"        {' '.join(sql.split())[:100]}")
+            for line in plan:
+                print(f"          {'!! ' if line in lines else ''}{line}")
+        if failed:
+            failures += 1
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--products', type=int, default=DEFAULT_PRODUCTS,
+                        help='number of synthetic products (other tables scale with it)')
+    parser.add_argument('--keep', metavar='PATH',
+                        help='build the database at PATH and keep it afterwards')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='pos_query_plan_')
+    db_path = args.keep or os.path.join(workdir, 'query_plan.db')
+    if os.path.exists(db_path):
+        sys.exit(f"Error: {db_path} already exists")
+
+    connections = connection_manager.get_connection_manager(db_path)
+    migrations.migrate(connections)
+    print(f"Building synthetic database with {args.products} products...")
+    synthetic_data.populate(connections, synthetic_data.scale_for_products(args.products))
+
+    try:
+        failures = check(DatabaseManager(db_path))
+    finally:
+        receipt_numbers.release_all_allocators()
+        connections.close()
+        if not args.keep:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    if failures:
+        print(f"\n{failures} hot paths scan whole tables or sort without an index")
+        sys.exit(1)
+    print("\nAll hot paths use indexes")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,154 @@
+import atexit
+import os
+import threading
+from datetime import datetime
+
+# Numbers reserved per database round trip
+DEFAULT_BLOCK_SIZE = 50
+
+# Digits in the numeric part of a receipt number
+RECEIPT_DIGITS = 8
+
+
+class ReceiptNumberAllocator:
+    """Hands out monotonic receipt numbers from blocks reserved in the database
+
+    Each terminal has its own sequence row. A block of numbers is claimed in a
+    BEGIN IMMEDIATE transaction, so processes sharing the database never get
+    the same number, and the block is logged so unused numbers can be audited.
+    """
+
+    def __init__(self, connections, terminal_id="", block_size=DEFAULT_BLOCK_SIZE):
+        self.connections = connections
+        self.terminal_id = terminal_id
+        self.block_size = block_size
+        self.prefix = f"R{terminal_id}-" if terminal_id else "R"
+        self._lock = threading.Lock()
+        self._block_id = None
+        self._next = 0
+        self._last = -1
+
+    def format(self, value):
+        """Receipt number text for a sequence value"""
+        return f"{self.prefix}{value:0{RECEIPT_DIGITS}d}"
+
+    def parse(self, receipt_number):
+        """Sequence value of one of this terminal's receipt numbers, or None"""
+        if not receipt_number or not receipt_number.startswith(self.prefix):
+            return None
+        digits = receipt_number[len(self.prefix):]
+        if len(digits) != RECEIPT_DIGITS or not digits.isdigit():
+            return None
+        return int(digits)
+
+    def _reserve_block(self):
+        """Claim the next block of numbers for this terminal"""
+        with self.connections.transaction() as conn:
+            conn.execute('INSERT OR IGNORE INTO receipt_sequences (terminal_id) VALUES (?)',
+                         (self.terminal_id,))
+            first = conn.execute('SELECT next_value FROM receipt_sequences WHERE terminal_id = ?',
+                                 (self.terminal_id,)).fetchone()[0]
+            last = first + self.block_size - 1
+            conn.execute('UPDATE receipt_sequences SET next_value = ? WHERE terminal_id = ?',
+                         (last + 1, self.terminal_id))
+            cursor = conn.execute('''
+                INSERT INTO receipt_number_blocks (terminal_id, first_value, last_value)
+                VALUES (?, ?, ?)
+            ''', (self.terminal_id, first, last))
+
+        self._block_id = cursor.lastrowid
+        self._next = first
+        self._last = last
+
+    def allocate(self):
+        """Next receipt number; only touches the database when a block runs out"""
+        with self._lock:
+            if self._next > self._last:
+                self.release()
+                self._reserve_block()
+            value = self._next
+            self._next += 1
+            return self.format(value)
+
+    def release(self):
+        """Record how far the current block was used, marking the rest as never issued"""
+        if self._block_id is None:
+            return
+        try:
+            with self.connections.transaction() as conn:
+                conn.execute('''
+                    UPDATE receipt_number_blocks SET last_used = ?, released_date = ?
+                    WHERE id = ?
+                ''', (self._next - 1, datetime.now().isoformat(), self._block_id))
+        except Exception as e:
+            print(f"Error releasing receipt numbers: {e}")
+        self._block_id = None
+        self._last = self._next - 1
+
+    def audit_gaps(self):
+        """Report issued numbers that never reached the sales table
+
+        Returns a list of (receipt_number, reason): 'missing' for numbers that
+        were handed out without a saved sale (failed or abandoned checkouts),
+        'unused' for the tail of a block released before it was used up, and
+        'unreleased' for blocks whose process stopped without releasing them.
+        """
+        with self.connections.read() as conn:
+            blocks = conn.execute('''
+                SELECT id, first_value, last_value, last_used FROM receipt_number_blocks
+                WHERE terminal_id = ? ORDER BY first_value
+            ''', (self.terminal_id,)).fetchall()
+            used = set()
+            for (receipt_number,) in conn.execute('SELECT receipt_number FROM sales WHERE receipt_number LIKE ?',
+                                                  (self.prefix + '%',)):
+                value = self.parse(receipt_number)
+                if value is not None:
+                    used.add(value)
+
+        with self._lock:
+            current_block, issued_through = self._block_id, self._next - 1
+
+        gaps = []
+        for block_id, first, last, last_used in blocks:
+            if block_id == current_block:
+                # Block in use by this process: later numbers are simply not issued yet
+                gaps.extend((self.format(value), 'missing')
+                            for value in range(first, issued_through + 1) if value not in used)
+            elif last_used is None:
+                gaps.extend((self.format(value), 'unreleased')
+                            for value in range(first, last + 1) if value not in used)
+            else:
+                gaps.extend((self.format(value), 'missing')
+                            for value in range(first, last_used + 1) if value not in used)
+                gaps.extend((self.format(value), 'unused') for value in range(last_used + 1, last + 1))
+        return gaps
+
+
+_allocators = {}
+_allocators_lock = threading.Lock()
+
+
+def get_receipt_allocator(connections, terminal_id=None):
+    """Return the process-wide allocator for a database and terminal
+
+    The terminal id defaults to the POS_TERMINAL_ID environment variable.
+    """
+    if terminal_id is None:
+        terminal_id = os.environ.get('POS_TERMINAL_ID', '')
+    key = (os.path.abspath(connections.db_path), terminal_id)
+    with _allocators_lock:
+        allocator = _allocators.get(key)
+        if allocator is None or allocator.connections is not connections:
+            allocator = ReceiptNumberAllocator(connections, terminal_id)
+            _allocators[key] = allocator
+        return allocator
+
+
+# Registered after connection_manager's hook, so it runs before connections close
+@atexit.register
+def release_all_allocators():
+    """Log how far each open block was used before the process exits"""
+    with _allocators_lock:
+        for allocator in _allocators.values():
+            with allocator._lock:
+                allocator.release()
@@ -0,0 +1,327 @@
+import os
+import tempfile
+import time
+from collections import deque
+from PyQt6.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal
+
+# ReportLab is optional; text receipts are produced without it
+try:
+    from reportlab.pdfgen import canvas
+    from reportlab.lib.units import mm
+    REPORTLAB_AVAILABLE = True
+except ImportError:
+    REPORTLAB_AVAILABLE = False
+
+# Recent render times kept for diagnostics; older ones are dropped
+RENDER_TIMES_KEPT = 500
+
+
+def render_pdf_receipt(receipt):
+    """Draw an 80x297mm PDF receipt from an order snapshot and return the file path"""
+    items = receipt['items']
+
+    # Receipt configuration for 80x297mm paper
+    receipt_width = 80 * mm  # 80mm width
+    base_height = 130 * mm   # Increased base height for customer info
+    item_height = 5 * mm     # Height per item
+
+    # Calculate dynamic height based on items (max 297mm)
+    calculated_height = base_height + (len(items) * item_height)
+    receipt_height = min(calculated_height, 297 * mm)  # Cap at 297mm
+
+    # A file of its own: drafts all share one receipt number and may render at the same time
+    fd, receipt_file = tempfile.mkstemp(prefix=f"receipt_{receipt['receipt_number']}_", suffix=".pdf")
+    os.close(fd)
+
+    c = canvas.Canvas(receipt_file, pagesize=(receipt_width, receipt_height))
+    y_position = receipt_height - 10 * mm  # Start from top with margin
+
+    # Define compact column positions for 80mm width
+    left_margin = 1 * mm
+    right_margin = 1 * mm
+
+    # Store Header
+    c.setFont("Helvetica-Bold", 11)
+    c.drawCentredString(receipt_width / 2, y_position, "WHOLESALE DEALER POS")
+    y_position -= 4 * mm
+
+    c.setFont("Helvetica", 9)
+    c.drawCentredString(receipt_width / 2, y_position, "Your Business Name")
+    y_position -= 3 * mm
+    c.drawCentredString(receipt_width / 2, y_position, "123 Business Street")
+    y_position -= 3 * mm
+    c.drawCentredString(receipt_width / 2, y_position, "City, State 12345")
+    y_position -= 3 * mm
+    c.drawCentredString(receipt_width / 2, y_position, "Phone: (555) 123-4567")
+    y_position -= 5 * mm
+
+    # Separator line
+    c.line(left_margin, y_position, receipt_width - right_margin, y_position)
+    y_position -= 4 * mm
+
+    # Receipt Details
+    c.setFont("Helvetica", 8)
+    c.drawString(left_margin, y_position, f"Receipt #: {receipt['receipt_number']}")
+    y_position -= 3 * mm
+    c.drawString(left_margin, y_position, f"Date: {receipt['sale_date'].strftime('%Y-%m-%d %H:%M:%S')}")
+    y_position -= 3 * mm
+    c.drawString(left_margin, y_position, "Cashier: POS User")
+    y_position -= 3 * mm
+
+    # Customer information if available
+    if receipt['customer_name']:
+        c.drawString(left_margin, y_position, f"Customer: {receipt['customer_name']}")
+        y_position -= 3 * mm
+
+    y_position -= 1 * mm
+
+    # Items Header
+    c.line(left_margin, y_position, receipt_width - right_margin, y_position)
+    y_position -= 3 * mm
+
+    c.setFont("Helvetica-Bold", 7)
+    c.drawString(left_margin, y_position, "Item")
+    c.drawString(left_margin + 45 * mm, y_position, "Qty")
+    c.drawString(left_margin + 55 * mm, y_position, "Price")
+    c.drawString(left_margin + 67 * mm, y_position, "Tot")
+    y_position -= 3 * mm
+
+    c.line(left_margin, y_position, receipt_width - right_margin, y_position)
+    y_position -= 3 * mm
+
+    # Items with compact alignment
+    c.setFont("Helvetica", 6)
+    for item in items:
+        # Item name (truncate to fit in 45mm ≈ 18 chars at 6pt)
+        item_name = item['description']
+        if len(item_name) > 18:
+            item_name = item_name[:15] + "..."
+
+        c.drawString(left_margin, y_position, item_name)
+        c.drawRightString(left_margin + 54 * mm, y_position, f"{item['quantity']:.1f}")
+        c.drawRightString(left_margin + 66 * mm, y_position, f"{item['price']:.0f}")
+        c.drawRightString(left_margin + 77 * mm, y_position, f"{item['total']:.0f}")
+
+        y_position -= 3.5 * mm
+
+        # Check if we're running out of space
+        if y_position < 35 * mm:
+            break
+
+    # Totals Section
+    y_position -= 2 * mm
+    c.line(left_margin, y_position, receipt_width - right_margin, y_position)
+    y_position -= 4 * mm
+
+    c.setFont("Helvetica", 8)
+
+    # Subtotal
+    c.drawString(left_margin, y_position, "Subtotal:")
+    c.drawRightString(receipt_width - right_margin, y_position, f"{receipt['subtotal']:.2f}")
+    y_position -= 3 * mm
+
+    # Discount (if applicable)
+    if receipt['discount_amount'] > 0:
+        c.drawString(left_margin, y_position, "Discount:")
+        c.drawRightString(receipt_width - right_margin, y_position, f"-{receipt['discount_amount']:.2f}")
+        y_position -= 3 * mm
+
+    # Tax (if applicable)
+    if receipt['tax_enabled'] and receipt['tax_amount'] > 0:
+        c.drawString(left_margin, y_position, f"Tax ({int(receipt['tax_rate'] * 100)}%):")
+        c.drawRightString(receipt_width - right_margin, y_position, f"{receipt['tax_amount']:.2f}")
+        y_position -= 3 * mm
+
+    # Total
+    y_position -= 1 * mm
+    c.line(left_margin, y_position, receipt_width - right_margin, y_position)
+    y_position -= 4 * mm
+
+    c.setFont("Helvetica-Bold", 10)
+    c.drawString(left_margin, y_position, "TOTAL:")
+    c.drawRightString(receipt_width - right_margin, y_position, f"{receipt['total_amount']:.2f}")
+    y_position -= 5 * mm
+
+    # Payment & Change
+    c.setFont("Helvetica", 8)
+    c.drawString(left_margin, y_position, "Payment:")
+    c.drawRightString(receipt_width - right_margin, y_position, f"{receipt['payment_amount']:.2f}")
+    y_position -= 3 * mm
+
+    c.drawString(left_margin, y_position, "Change:")
+    c.drawRightString(receipt_width - right_margin, y_position, f"{receipt['change_amount']:.2f}")
+    y_position -= 5 * mm
+
+    # Footer
+    c.line(left_margin, y_position, receipt_width - right_margin, y_position)
+    y_position -= 4 * mm
+
+    c.setFont("Helvetica", 8)
+    c.drawCentredString(receipt_width / 2, y_position, "Thank you for your business!")
+    y_position -= 3 * mm
+
+    if receipt['customer_name']:
+        c.drawCentredString(receipt_width / 2, y_position, f"Thank you, {receipt['customer_name']}!")
+        y_position -= 3 * mm
+
+    c.drawCentredString(receipt_width / 2, y_position, "Please come again!")
+    y_position -= 4 * mm
+
+    c.setFont("Helvetica", 7)
+    c.drawCentredString(receipt_width / 2, y_position, "Return Policy: 30 days")
+    y_position -= 2.5 * mm
+    c.drawCentredString(receipt_width / 2, y_position, "Keep this receipt for returns")
+
+    c.save()
+    return receipt_file
+
+
+def render_text_receipt(receipt):
+    """Compact text receipt for 80mm thermal paper (32 characters wide)"""
+    receipt_lines = []
+
+    # Header
+    receipt_lines.append("================================")
+    receipt_lines.append("     WHOLESALE DEALER POS")
+    receipt_lines.append("      Your Business Name")
+    receipt_lines.append("    123 Business Street")
+    receipt_lines.append("      City, State 12345")
+    receipt_lines.append("    Phone: (555) 123-4567")
+    receipt_lines.append("================================")
+    receipt_lines.append("")
+
+    # Receipt info
+    receipt_lines.append(f"Receipt #: {receipt['receipt_number']}")
+    receipt_lines.append(f"Date: {receipt['sale_date'].strftime('%Y-%m-%d %H:%M')}")
+    receipt_lines.append(f"Cashier: POS User")
+
+    # Customer info if available
+    if receipt['customer_name']:
+        receipt_lines.append(f"Customer: {receipt['customer_name'][:22]}")
+
+    receipt_lines.append("--------------------------------")
+    receipt_lines.append("")
+
+    # Compact items header (32 chars total)
+    receipt_lines.append("Item            Qty  Prc  Tot")
+    receipt_lines.append("--------------------------------")
+
+    # Items with tight alignment for 32 chars
+    for item in receipt['items']:
+        name = item['description'][:15].ljust(15)
+        qty_str = f"{item['quantity']:.0f}".rjust(3)
+        price_str = f"{item['price']:.0f}".rjust(4)
+        total_str = f"{item['total']:.0f}".rjust(5)
+        receipt_lines.append(f"{name} {qty_str} {price_str} {total_str}")
+
+    receipt_lines.append("--------------------------------")
+    receipt_lines.append("")
+
+    # Totals with compact alignment
+    receipt_lines.append(f"{'Subtotal:':<20} {receipt['subtotal']:>10.2f}")
+
+    if receipt['discount_amount'] > 0:
+        receipt_lines.append(f"{'Discount:':<20} -{receipt['discount_amount']:>9.2f}")
+
+    if receipt['tax_enabled']:
+        receipt_lines.append(f"{'Tax:':<20} {receipt['tax_amount']:>10.2f}")
+
+    receipt_lines.append("================================")
+    receipt_lines.append(f"{'TOTAL:':<20} {receipt['total_amount']:>10.2f}")
+    receipt_lines.append("================================")
+    receipt_lines.append("")
+
+    # Payment info
+    receipt_lines.append(f"{'Payment:':<20} {receipt['payment_amount']:>10.2f}")
+    receipt_lines.append(f"{'Change:':<20} {receipt['change_amount']:>10.2f}")
+    receipt_lines.append("")
+
+    # Footer
+    receipt_lines.append("================================")
+    receipt_lines.append("    Thank you for your business!")
+
+    if receipt['customer_name']:
+        receipt_lines.append(f"    Thank you, {receipt['customer_name'][:20]}!")
+
+    receipt_lines.append("       Please come again!")
+    receipt_lines.append("")
+    receipt_lines.append("      Return Policy: 30 days")
+    receipt_lines.append("   Keep this receipt for returns")
+    receipt_lines.append("================================")
+
+    return "\n".join(receipt_lines)
+
+
+def render_receipt(receipt, prefer_pdf=True):
+    """Render a receipt snapshot, falling back to text when the PDF cannot be made
+
+    Returns a result dict with the receipt number, kind ('pdf' or 'text'),
+    content (file path or text) and render time in milliseconds.
+    """
+    start = time.perf_counter()
+    kind, content = 'text', None
+
+    if prefer_pdf and REPORTLAB_AVAILABLE:
+        try:
+            receipt_file = render_pdf_receipt(receipt)
+            # Verify the file was created successfully
+            if os.path.exists(receipt_file) and os.path.getsize(receipt_file) > 0:
+                kind, content = 'pdf', receipt_file
+            else:
+                print("PDF creation failed - file not created or empty")
+        except Exception as e:
+            print(f"Error creating PDF receipt: {e}")
+
+    if content is None:
+        content = render_text_receipt(receipt)
+
+    return {
+        'receipt_number': receipt['receipt_number'],
+        'kind': kind,
+        'content': content,
+        'render_ms': (time.perf_counter() - start) * 1000,
+        'context': receipt.get('context', {})
+    }
+
+
+class ReceiptSignals(QObject):
+    """Signals for a receipt render task"""
+    finished = pyqtSignal(dict)
+
+
+class ReceiptRenderTask(QRunnable):
+    """Render one receipt snapshot on a pool thread"""
+
+    def __init__(self, receipt, prefer_pdf):
+        super().__init__()
+        self.receipt = receipt
+        self.prefer_pdf = prefer_pdf
+        self.signals = ReceiptSignals()
+
+    def run(self):
+        self.signals.finished.emit(render_receipt(self.receipt, self.prefer_pdf))
+
+
+class ReceiptRenderer(QObject):
+    """Renders receipts in the background and records how long each one took"""
+    receipt_ready = pyqtSignal(dict)
+
+    def __init__(self, max_threads=2, parent=None):
+        super().__init__(parent)
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(max_threads)
+        self.render_times = deque(maxlen=RENDER_TIMES_KEPT)  # (receipt number, render time in ms)
+
+    def render(self, receipt, prefer_pdf=True):
+        """Queue a receipt snapshot; receipt_ready fires when its artefact exists"""
+        task = ReceiptRenderTask(receipt, prefer_pdf)
+        task.signals.finished.connect(self.on_task_finished)
+        self.pool.start(task)
+
+    def on_task_finished(self, result):
+        self.render_times.append((result['receipt_number'], result['render_ms']))
+        self.receipt_ready.emit(result)
+
+    def shutdown(self):
+        """Wait for receipts that are still rendering"""
+        self.pool.waitForDone()
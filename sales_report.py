@@ -0,0 +1,160 @@
+from PyQt6.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QLabel, QComboBox, QPushButton,
+                             QDateEdit, QTableWidget, QTableWidgetItem, QHeaderView,
+                             QMessageBox, QFileDialog)
+from PyQt6.QtCore import Qt, QDate
+from PyQt6.QtGui import QFont
+from datetime import datetime
+import sales_rollups
+from csv_export import CsvExportJob, EXPORT_FILE_FILTER, start_export
+
+# Rows shown for the customer and product breakdowns
+TOP_LIMIT = 50
+
+# Group-by choice -> (first column header, period or dimension, row limit)
+REPORT_GROUPS = {
+    "Day": ("Day", 'Day', None),
+    "Week": ("Week Starting", 'Week', None),
+    "Month": ("Month", 'Month', None),
+    "Cashier": ("Cashier", 'cashier', None),
+    "Customer": ("Customer", 'customer', TOP_LIMIT),
+    "Top Products": ("Product", 'product', TOP_LIMIT),
+}
+
+FIGURE_HEADERS = ['Sales', 'Subtotal', 'Discount', 'Tax', 'Revenue', 'Items']
+
+
+class SalesReportDialog(QDialog):
+    """Sales report by period, cashier, customer or product, read from the daily rollups"""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.parent_window = parent
+        self.db_manager = parent.db_manager
+        self.init_ui()
+        self.generate_report()
+
+    def init_ui(self):
+        self.setWindowTitle("Sales Report")
+        self.setMinimumSize(900, 600)
+
+        layout = QVBoxLayout()
+
+        # Report options, year to date by default
+        options_layout = QHBoxLayout()
+
+        today = QDate.currentDate()
+        self.date_from = QDateEdit(QDate(today.year(), 1, 1))
+        self.date_from.setCalendarPopup(True)
+        self.date_from.setDisplayFormat("yyyy-MM-dd")
+        self.date_to = QDateEdit(today)
+        self.date_to.setCalendarPopup(True)
+        self.date_to.setDisplayFormat("yyyy-MM-dd")
+
+        self.group_combo = QComboBox()
+        self.group_combo.addItems(list(REPORT_GROUPS))
+        self.group_combo.setCurrentText("Month")
+
+        generate_btn = QPushButton("📊 Generate Report")
+        generate_btn.clicked.connect(self.generate_report)
+
+        options_layout.addWidget(QLabel("From:"))
+        options_layout.addWidget(self.date_from)
+        options_layout.addWidget(QLabel("To:"))
+        options_layout.addWidget(self.date_to)
+        options_layout.addWidget(QLabel("Group by:"))
+        options_layout.addWidget(self.group_combo)
+        options_layout.addWidget(generate_btn)
+        options_layout.addStretch()
+
+        layout.addLayout(options_layout)
+
+        # Totals for the whole range
+        self.totals_label = QLabel()
+        self.totals_label.setFont(QFont("Arial", 11, QFont.Weight.Bold))
+        self.totals_label.setStyleSheet("padding: 8px; background-color: #f8f9fa; border-radius: 5px;")
+        layout.addWidget(self.totals_label)
+
+        # Breakdown
+        self.report_table = QTableWidget()
+        self.report_table.setColumnCount(1 + len(FIGURE_HEADERS))
+        self.report_table.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+        self.report_table.setAlternatingRowColors(True)
+        self.report_table.verticalHeader().setVisible(False)
+        self.report_table.horizontalHeader().setSectionResizeMode(0, QHeaderView.ResizeMode.Stretch)
+        layout.addWidget(self.report_table)
+
+        # Buttons
+        buttons_layout = QHBoxLayout()
+
+        export_btn = QPushButton("📤 Export")
+        export_btn.clicked.connect(self.export_report)
+
+        close_btn = QPushButton("✖️ Close")
+        close_btn.clicked.connect(self.close)
+
+        buttons_layout.addWidget(export_btn)
+        buttons_layout.addStretch()
+        buttons_layout.addWidget(close_btn)
+
+        layout.addLayout(buttons_layout)
+        self.setLayout(layout)
+
+    def date_range(self):
+        return (self.date_from.date().toString("yyyy-MM-dd"),
+                self.date_to.date().toString("yyyy-MM-dd"))
+
+    def report_query(self):
+        """Header, query and params for the selected breakdown"""
+        header, group, limit = REPORT_GROUPS[self.group_combo.currentText()]
+        date_from, date_to = self.date_range()
+        if group in sales_rollups.PERIODS:
+            query, params = sales_rollups.period_query(group, date_from, date_to)
+        else:
+            query, params = sales_rollups.dimension_query(group, date_from, date_to, limit)
+        return [header] + FIGURE_HEADERS, query, params
+
+    def generate_report(self):
+        """Show totals and the selected breakdown for the date range"""
+        try:
+            headers, query, params = self.report_query()
+            with self.db_manager.connections.read() as conn:
+                sales, subtotal, discount, tax, revenue, items = sales_rollups.sales_totals(conn, *self.date_range())
+                rows = conn.execute(query, params).fetchall()
+
+            self.totals_label.setText(
+                f"Sales: {sales:,} | Revenue: ${revenue:,.2f} | Tax: ${tax:,.2f} | "
+                f"Discounts: ${discount:,.2f} | Items Sold: {items:,.0f}"
+            )
+
+            self.report_table.setUpdatesEnabled(False)
+            self.report_table.setHorizontalHeaderLabels(headers)
+            self.report_table.setRowCount(len(rows))
+            for row, (label, *figures) in enumerate(rows):
+                self.report_table.setItem(row, 0, QTableWidgetItem(label or ""))
+                for column, value in enumerate(figures, 1):
+                    text = f"{value or 0:,}" if column == 1 else f"{value or 0:,.2f}"
+                    item = QTableWidgetItem(text)
+                    item.setTextAlignment(Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter)
+                    self.report_table.setItem(row, column, item)
+            self.report_table.setUpdatesEnabled(True)
+
+        except Exception as e:
+            QMessageBox.critical(self, "Error", f"Failed to generate sales report: {str(e)}")
+
+    def export_report(self):
+        """Export the selected breakdown to CSV"""
+        try:
+            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+            group = self.group_combo.currentText().replace(' ', '_').lower()
+            file_path, _ = QFileDialog.getSaveFileName(
+                self, "Export Sales Report", f"sales_by_{group}_{timestamp}.csv",
+                EXPORT_FILE_FILTER
+            )
+
+            if file_path:
+                headers, query, params = self.report_query()
+                job = CsvExportJob(self.db_manager.connections, file_path, headers, query, params)
+                self.export_task = start_export(self, job, "Sales report")
+
+        except Exception as e:
+            QMessageBox.critical(self, "Error", f"Failed to export sales report: {str(e)}")
@@ -0,0 +1,139 @@
+# Daily sales figures per dimension, kept in step with sales at commit time.
+# 'total' has one row per day; 'cashier', 'customer' and 'product' one row per
+# day and cashier, customer or product that sold that day.
+ROLLUP_SCHEMA = '''
+    CREATE TABLE IF NOT EXISTS sales_rollup (
+        dimension TEXT NOT NULL,
+        day TEXT NOT NULL,
+        rollup_key TEXT NOT NULL,
+        label TEXT,
+        sale_count INTEGER NOT NULL DEFAULT 0,
+        subtotal REAL NOT NULL DEFAULT 0.0,
+        discount REAL NOT NULL DEFAULT 0.0,
+        tax REAL NOT NULL DEFAULT 0.0,
+        revenue REAL NOT NULL DEFAULT 0.0,
+        items_sold REAL NOT NULL DEFAULT 0.0,
+        PRIMARY KEY (dimension, day, rollup_key)
+    ) WITHOUT ROWID
+'''
+
+# dimension -> (key, label) expressions over sales s
+SALE_DIMENSIONS = {
+    'total': ("''", "''"),
+    'cashier': ("COALESCE(s.cashier, 'POS User')", "COALESCE(s.cashier, 'POS User')"),
+    'customer': ("COALESCE(CAST(s.customer_id AS TEXT), '')", "COALESCE(s.customer_name, 'Walk-in')"),
+}
+
+# Lines without a product id (custom items) are grouped by their name instead.
+# Discount and tax are charged per sale, so product rows carry line totals only.
+PRODUCT_KEY = "COALESCE(CAST(si.product_id AS TEXT), 'name:' || si.product_name)"
+
+ROLLUP_UPSERT = '''
+    ON CONFLICT (dimension, day, rollup_key) DO UPDATE SET
+        label = excluded.label,
+        sale_count = sale_count + excluded.sale_count,
+        subtotal = subtotal + excluded.subtotal,
+        discount = discount + excluded.discount,
+        tax = tax + excluded.tax,
+        revenue = revenue + excluded.revenue,
+        items_sold = items_sold + excluded.items_sold
+'''
+
+ROLLUP_COLUMNS = '(dimension, day, rollup_key, label, sale_count, subtotal, discount, tax, revenue, items_sold)'
+
+# Period label for a rollup day; weeks start on Monday
+PERIODS = {
+    'Day': 'day',
+    'Week': "DATE(day, '-6 days', 'weekday 1')",
+    'Month': 'SUBSTR(day, 1, 7)',
+}
+
+# Figures every report row carries, summed over the rollup rows it covers
+FIGURES = '''
+    SUM(sale_count), SUM(subtotal), SUM(discount), SUM(tax), SUM(revenue), SUM(items_sold)
+'''
+
+
+def rollup_statements(sale_filter):
+    """Upserts adding the sales matching sale_filter (a condition on s) to every dimension"""
+    statements = [f'''
+        INSERT INTO sales_rollup {ROLLUP_COLUMNS}
+        SELECT '{dimension}', DATE(s.sale_date), {key}, MAX({label}), COUNT(*),
+               SUM(COALESCE(s.subtotal, 0)), SUM(COALESCE(s.discount_amount, 0)),
+               SUM(COALESCE(s.tax_amount, 0)), SUM(COALESCE(s.total_amount, 0)),
+               SUM(COALESCE((SELECT SUM(si.quantity) FROM sale_items si WHERE si.sale_id = s.id), 0))
+        FROM sales s
+        WHERE {sale_filter}
+        GROUP BY DATE(s.sale_date), {key}
+        {ROLLUP_UPSERT}
+    ''' for dimension, (key, label) in SALE_DIMENSIONS.items()]
+
+    statements.append(f'''
+        INSERT INTO sales_rollup {ROLLUP_COLUMNS}
+        SELECT 'product', DATE(s.sale_date), {PRODUCT_KEY}, MAX(si.product_name),
+               COUNT(DISTINCT s.id), SUM(COALESCE(si.total_price, 0)), 0, 0,
+               SUM(COALESCE(si.total_price, 0)), SUM(COALESCE(si.quantity, 0))
+        FROM sale_items si
+        JOIN sales s ON s.id = si.sale_id
+        WHERE {sale_filter}
+        GROUP BY DATE(s.sale_date), {PRODUCT_KEY}
+        {ROLLUP_UPSERT}
+    ''')
+    return statements
+
+
+RECORD_SALE_STATEMENTS = rollup_statements('s.id = ?')
+
+
+def create_rollups(cursor):
+    """Create the rollup table and fill it from the existing sales"""
+    cursor.execute(ROLLUP_SCHEMA)
+    rebuild_rollups(cursor)
+
+
+def rebuild_rollups(cursor):
+    """Recompute every rollup row from sales and sale_items"""
+    cursor.execute('DELETE FROM sales_rollup')
+    for statement in rollup_statements('1=1'):
+        cursor.execute(statement)
+
+
+def record_sale(cursor, sale_id):
+    """Add a sale and its items to the rollups
+
+    Call in the transaction that inserts the sale, after its items.
+    """
+    for statement in RECORD_SALE_STATEMENTS:
+        cursor.execute(statement, (sale_id,))
+
+
+def sales_totals(conn, date_from, date_to):
+    """(sales, subtotal, discount, tax, revenue, items sold) for days date_from..date_to inclusive"""
+    row = conn.execute(f'''
+        SELECT {FIGURES} FROM sales_rollup
+        WHERE dimension = 'total' AND day BETWEEN ? AND ?
+    ''', (date_from, date_to)).fetchone()
+    return tuple(value or 0 for value in row)
+
+
+def period_query(period, date_from, date_to):
+    """Query and params for figures per day, week or month, oldest first"""
+    return f'''
+        SELECT {PERIODS[period]} AS period, {FIGURES}
+        FROM sales_rollup
+        WHERE dimension = 'total' AND day BETWEEN ? AND ?
+        GROUP BY period
+        ORDER BY period
+    ''', (date_from, date_to)
+
+
+def dimension_query(dimension, date_from, date_to, limit=None):
+    """Query and params for figures per cashier, customer or product, highest revenue first"""
+    return f'''
+        SELECT MAX(label), {FIGURES}
+        FROM sales_rollup
+        WHERE dimension = ? AND day BETWEEN ? AND ?
+        GROUP BY rollup_key
+        ORDER BY SUM(revenue) DESC
+        LIMIT ?
+    ''', (dimension, date_from, date_to, -1 if limit is None else limit)
@@ -0,0 +1,120 @@
+import codecs
+import os
+from collections import namedtuple
+
+# A decoded scan: the code without prefix or suffix, and the symbology it reads as
+Scan = namedtuple('Scan', 'code symbology')
+
+# Keyboard wedge scanners type a whole code within a few milliseconds per key;
+# people rarely manage two keys this close together, let alone a whole code
+DEFAULT_MAX_GAP_MS = 40
+DEFAULT_MIN_LENGTH = 4
+DEFAULT_SUFFIX = '\r'   # Enter, which scanners send by default
+
+# GTIN symbologies by digit count; other printable codes are taken as Code 128
+GTIN_LENGTHS = {13: 'EAN-13', 12: 'UPC-A', 8: 'EAN-8'}
+CODE_128 = 'Code 128'
+SYMBOLOGIES = ('EAN-13', 'UPC-A', 'EAN-8', CODE_128)
+
+
+def gtin_check_digit(body):
+    """Check digit for the digits of an EAN/UPC code that come before it"""
+    # Weights run 3, 1, 3, ... leftwards from the last digit of the body
+    total = sum(int(c) * (3 if i % 2 == 0 else 1) for i, c in enumerate(reversed(body)))
+    return str((10 - total % 10) % 10)
+
+
+def gtin_check_digit_ok(code):
+    """True if the last digit of an EAN/UPC code is its check digit"""
+    return gtin_check_digit(code[:-1]) == code[-1]
+
+
+def symbology_of(code):
+    """Name of the symbology a decoded code reads as, or None if no barcode encodes it"""
+    if code.isdigit() and len(code) in GTIN_LENGTHS and gtin_check_digit_ok(code):
+        return GTIN_LENGTHS[len(code)]
+    if code.isascii() and code.isprintable():
+        return CODE_128
+    return None
+
+
+class ScannerDecoder:
+    """Tells scanner bursts from human typing by the time between keystrokes
+
+    Keys are fed one at a time with their timestamps. A run of keys each
+    arriving within max_gap_ms of the last is a burst; any slower key starts
+    a new one, so typing never joins a scan. A burst ending in the suffix
+    is returned as a Scan the moment the suffix arrives, provided it starts
+    with the prefix, has at least min_length characters and reads as one of
+    the enabled symbologies. Scanners set up without a suffix are finished
+    by calling flush() once max_gap_ms passes without a key, or by Enter
+    should one arrive anyway. A burst long enough to be a scan that is not
+    one is left in rejected by the key or flush that ended it, so the till
+    can say the scan was not recognised.
+    """
+
+    def __init__(self, prefix='', suffix=DEFAULT_SUFFIX, max_gap_ms=DEFAULT_MAX_GAP_MS,
+                 min_length=DEFAULT_MIN_LENGTH, symbologies=SYMBOLOGIES):
+        self.prefix = prefix
+        self.suffix = suffix
+        self.max_gap_ms = max_gap_ms
+        self.min_length = min_length
+        self.symbologies = frozenset(symbologies)
+        self.buffer = []
+        self.last_key_ms = None
+        self.rejected = None
+
+    def feed(self, text, timestamp_ms):
+        """Add one keystroke; returns a Scan if it completed one, otherwise None"""
+        if self.last_key_ms is None or timestamp_ms - self.last_key_ms > self.max_gap_ms:
+            self.buffer = []
+        self.last_key_ms = timestamp_ms
+        self.rejected = None
+
+        if text == (self.suffix or DEFAULT_SUFFIX):
+            return self.flush()
+        if text:
+            self.buffer.append(text)
+        return None
+
+    def pending(self):
+        """True while a burst is collecting and could still turn out to be a scan"""
+        return bool(self.buffer)
+
+    def flush(self):
+        """End the current burst; returns it as a Scan if it is one"""
+        burst = ''.join(self.buffer)
+        self.buffer = []
+        self.last_key_ms = None
+        self.rejected = None
+        code = burst[len(self.prefix):]
+        symbology = symbology_of(code)
+        if (not burst.startswith(self.prefix) or len(code) < self.min_length
+                or symbology not in self.symbologies):
+            if len(burst) >= self.min_length:
+                self.rejected = burst
+            return None
+        return Scan(code, symbology)
+
+
+def decoder_from_environment():
+    """Decoder configured from the POS_SCANNER_* environment variables
+
+    POS_SCANNER_PREFIX and POS_SCANNER_SUFFIX take backslash escapes
+    ("\\x02", "\\r"; an empty suffix means the scanner sends none),
+    POS_SCANNER_MAX_GAP_MS and POS_SCANNER_MIN_LENGTH are integers and
+    POS_SCANNER_SYMBOLOGIES is a comma separated list from SYMBOLOGIES.
+    """
+    def escaped(name, default):
+        value = os.environ.get(name)
+        return default if value is None else codecs.decode(value, 'unicode_escape')
+
+    symbologies = os.environ.get('POS_SCANNER_SYMBOLOGIES')
+    return ScannerDecoder(
+        prefix=escaped('POS_SCANNER_PREFIX', ''),
+        suffix=escaped('POS_SCANNER_SUFFIX', DEFAULT_SUFFIX),
+        max_gap_ms=int(os.environ.get('POS_SCANNER_MAX_GAP_MS', DEFAULT_MAX_GAP_MS)),
+        min_length=int(os.environ.get('POS_SCANNER_MIN_LENGTH', DEFAULT_MIN_LENGTH)),
+        symbologies=([name.strip() for name in symbologies.split(',')]
+                     if symbologies else SYMBOLOGIES),
+    )
@@ -0,0 +1,94 @@
+from PyQt6.QtCore import QObject, QRunnable, QThreadPool, QTimer, pyqtSignal
+
+# Quiet period after the last keystroke before a search is started
+SEARCH_DEBOUNCE_MS = 150
+
+
+class SearchSignals(QObject):
+    """Signals emitted by a search task (QRunnable cannot emit signals itself)"""
+    finished = pyqtSignal(int, list)   # generation, products
+    failed = pyqtSignal(int, str)      # generation, error message
+
+
+class SearchTask(QRunnable):
+    """Run one product search on a pool thread using a pooled read connection"""
+
+    def __init__(self, db_manager, generation, text, limit):
+        super().__init__()
+        self.db_manager = db_manager
+        self.generation = generation
+        self.text = text
+        self.limit = limit
+        self.signals = SearchSignals()
+
+    def run(self):
+        try:
+            products = self.db_manager.search_products(self.text, limit=self.limit)
+        except Exception as e:
+            self.signals.failed.emit(self.generation, str(e))
+        else:
+            self.signals.finished.emit(self.generation, list(products))
+
+
+class ProductSearchWorker(QObject):
+    """Debounced background product search that only delivers the newest results
+
+    Every request bumps a generation number; results tagged with an older
+    generation arrive after the user kept typing and are dropped.
+    """
+    results_ready = pyqtSignal(list)
+    search_failed = pyqtSignal(str)
+
+    def __init__(self, db_manager, limit=None, debounce_ms=SEARCH_DEBOUNCE_MS, parent=None):
+        super().__init__(parent)
+        self.db_manager = db_manager
+        self.limit = limit
+        self.generation = 0
+        self.pending_text = ""
+
+        # One search at a time; queued tasks for stale generations exit quickly
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(1)
+
+        self.debounce_timer = QTimer(self)
+        self.debounce_timer.setSingleShot(True)
+        self.debounce_timer.setInterval(debounce_ms)
+        self.debounce_timer.timeout.connect(self.start_search)
+
+    def search(self, text, immediate=False):
+        """Schedule a search for text, restarting the debounce window"""
+        self.generation += 1
+        self.pending_text = text
+        if immediate:
+            self.debounce_timer.stop()
+            self.start_search()
+        else:
+            self.debounce_timer.start()
+
+    def cancel(self):
+        """Drop any pending or running search"""
+        self.generation += 1
+        self.debounce_timer.stop()
+        self.pool.clear()
+
+    def start_search(self):
+        """Hand the pending query to the thread pool"""
+        # Anything still queued belongs to an older generation
+        self.pool.clear()
+        task = SearchTask(self.db_manager, self.generation, self.pending_text, self.limit)
+        task.signals.finished.connect(self.on_task_finished)
+        task.signals.failed.connect(self.on_task_failed)
+        self.pool.start(task)
+
+    def on_task_finished(self, generation, products):
+        if generation == self.generation:
+            self.results_ready.emit(products)
+
+    def on_task_failed(self, generation, message):
+        if generation == self.generation:
+            self.search_failed.emit(message)
+
+    def shutdown(self):
+        """Cancel outstanding work and wait for the running search to finish"""
+        self.cancel()
+        self.pool.waitForDone()
@@ -0,0 +1,327 @@
+"""Fill a fresh POS database with synthetic data at a chosen scale
+
+Creates the database through the real migrations, so every table, index and
+trigger is the one the application uses, then inserts products, categories,
+vendors, customers, sales with their items and ledger postings, and stock
+movements. Derived tables (search index, inventory summary, sales rollups,
+ledger balances) end up as the application would have left them.
+
+    python synthetic_data.py PATH [--products N] [--sale-lines N] ...
+
+Row ids and receipt numbers (R00000001...) are sequential, and each product's
+barcode follows from its id (see barcode()), so benchmarks and plan checks can
+name rows that exist.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from collections import namedtuple
+from datetime import datetime, timedelta
+
+import connection_manager
+import customer_ledger
+import inventory_summary
+import migrations
+import receipt_numbers
+import sales_rollups
+import scanner_input
+
+Scale = namedtuple('Scale', 'products categories vendors customers sale_lines stock_movements')
+
+# A large wholesale dealer after a few years of trading
+DEFAULT_SCALE = Scale(products=200000, categories=5000, vendors=500, customers=50000,
+                      sale_lines=5000000, stock_movements=10000000)
+
+# Rows per write transaction while loading the big tables
+CHUNK_ROWS = 50000
+
+# Sales are spread evenly over this many days up to today
+HISTORY_DAYS = 730
+
+LINES_PER_SALE = (1, 9)
+CUSTOMER_SALE_SHARE = 0.3       # the rest are walk-in sales
+PAYMENT_SHARE = 0.6             # customer sales later paid off, wholly or in part
+CASHIERS = ['POS User', 'Cashier 1', 'Cashier 2', 'Cashier 3', 'Cashier 4']
+STOCK_TYPES = [('Piece', 'pc', 'Unit'), ('Box', 'box', 'Pack'), ('Carton', 'ctn', 'Pack'),
+               ('Kg', 'kg', 'Weight'), ('Litre', 'L', 'Volume'), ('Dozen', 'dz', 'Unit')]
+CUSTOMER_TYPES = ['Regular'] * 7 + ['VIP'] * 1 + ['Wholesale'] * 2
+COLORS = ["#FF6B6B", "#4ECDC4", "#04C2ED", "#00BC64", "#FDC716", "#FF53FF", "#FF8147", "#4E41FF"]
+WORDS = ['Cola', 'Rice', 'Soap', 'Tea', 'Flour', 'Sugar', 'Oil', 'Salt', 'Milk', 'Juice',
+         'Biscuit', 'Shampoo', 'Lentils', 'Spice', 'Candle', 'Ghee', 'Coffee', 'Noodles',
+         'Detergent', 'Toothpaste', 'Chocolate', 'Beans', 'Vinegar', 'Honey', 'Jam']
+SIZES = ['100g', '250g', '500g', '1kg', '5kg', '250ml', '500ml', '1L', '1.5L', 'Pack of 6']
+
+
+def scale_for_products(products):
+    """DEFAULT_SCALE shrunk or grown so it has the given number of products"""
+    ratio = products / DEFAULT_SCALE.products
+    return Scale(*(max(1, round(value * ratio)) for value in DEFAULT_SCALE))
+
+
+def barcode(product_id):
+    """Barcode of a synthetic product: a quarter are EAN-13s as generate_barcode makes
+    them, a quarter 13 digits without a check digit as it made them before, the rest
+    Code 128 labels (BC00000001...)"""
+    if product_id % 4 == 0:
+        body = f'20{product_id:010d}'
+        return body + scanner_input.gtin_check_digit(body)
+    if product_id % 4 == 1:
+        body = f'21{product_id:010d}'
+        return body + str((int(scanner_input.gtin_check_digit(body)) + 1) % 10)
+    return f'BC{product_id:08d}'
+
+
+def skewed(rng, count):
+    """Id from 1..count where low ids come up far more often, like best sellers"""
+    return int(count * rng.random() ** 3) + 1
+
+
+def insert_chunked(connections, sql, rows):
+    """executemany over an iterable of rows, committing every CHUNK_ROWS rows"""
+    rows = iter(rows)
+    while True:
+        chunk = [row for _, row in zip(range(CHUNK_ROWS), rows)]
+        if not chunk:
+            return
+        with connections.transaction() as conn:
+            conn.executemany(sql, chunk)
+
+
+def insert_catalog(connections, scale, rng, today):
+    """Stock types, categories, vendors and products; returns (name, sale price) by product id"""
+    with connections.transaction() as conn:
+        conn.executemany('INSERT OR IGNORE INTO stock_types (name, abbreviation, item_type) VALUES (?, ?, ?)',
+                         STOCK_TYPES)
+        conn.executemany('INSERT INTO categories (id, name, description, color_code) VALUES (?, ?, ?, ?)',
+                         [(i, f'Category {i}', f'Synthetic category {i}', rng.choice(COLORS))
+                          for i in range(1, scale.categories + 1)])
+        conn.executemany('''
+            INSERT INTO vendors (id, name, contact_person, phone, email)
+            VALUES (?, ?, ?, ?, ?)
+        ''', [(i, f'Vendor {i}', f'Contact {i}', f'0300{i:07d}', f'vendor{i}@example.com')
+              for i in range(1, scale.vendors + 1)])
+
+    catalog = [None]
+    products = []
+    for i in range(1, scale.products + 1):
+        purchase_price = round(rng.uniform(10, 5000), 2)
+        # A few products are priced below cost, as happens after supplier price rises
+        sale_price = round(purchase_price * rng.uniform(0.9 if rng.random() < 0.02 else 1.1, 1.4), 2)
+        expiry_date = None
+        manufacture_date = None
+        if rng.random() < 0.6:
+            expiry = today + timedelta(days=rng.randint(-60, 720))
+            expiry_date = expiry.date().isoformat()
+            manufacture_date = (expiry - timedelta(days=rng.randint(180, 1080))).date().isoformat()
+        vendor_id = rng.randint(1, scale.vendors)
+        name = f'{rng.choice(WORDS)} {rng.choice(WORDS)} {rng.choice(SIZES)} {i}'
+        catalog.append((name, sale_price))
+        products.append((
+            i, name, barcode(i),
+            rng.choice(STOCK_TYPES)[0], 0 if rng.random() < 0.05 else rng.randint(1, 500),
+            rng.choice([1, 1, 1, 6, 12, 24]), purchase_price, round(purchase_price * 1.08, 2),
+            sale_price, rng.randint(5, 20), manufacture_date, expiry_date, f'S{i % 300}',
+            skewed(rng, scale.categories), vendor_id, f'Vendor {vendor_id}',
+        ))
+    insert_chunked(connections, '''
+        INSERT INTO products (id, name, barcode, stock_type, quantity, sub_quantity,
+                              purchase_price, wholesale_price, sale_price, min_stock_threshold,
+                              manufacture_date, expiry_date, shelf_number, category_id,
+                              vendor_id, supplier)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ''', products)
+    return catalog
+
+
+def insert_customers(connections, scale, rng):
+    """Customers with contact details; balances are filled in after the sales"""
+    insert_chunked(connections, '''
+        INSERT INTO customers (id, name, contact_number, company_name, address, email,
+                               credit_limit, customer_type, discount_percentage)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ''', ((i, f'Customer {i}', f'0321{i:07d}', f'Company {i % 2000}' if rng.random() < 0.4 else None,
+           f'{rng.randint(1, 999)} Market Road', f'customer{i}@example.com',
+           rng.choice([0, 5000, 20000, 100000]), rng.choice(CUSTOMER_TYPES),
+           rng.choice([0, 0, 0, 2.5, 5]))
+          for i in range(1, scale.customers + 1)))
+
+
+def insert_sales(connections, scale, rng, catalog, start, span):
+    """Sales, their items and the customer ledger postings, oldest first"""
+    sales = []
+    items = []
+    postings = []
+    sale_id = 0
+    lines = 0
+
+    def flush():
+        with connections.transaction() as conn:
+            conn.executemany('''
+                INSERT INTO sales (id, receipt_number, subtotal, discount_amount, tax_amount,
+                                   total_amount, payment_amount, change_amount, sale_date,
+                                   cashier, customer_id, customer_name)
+                VALUES (?, ?, ?, ?, 0, ?, ?, ?, ?, ?, ?, ?)
+            ''', sales)
+            conn.executemany('''
+                INSERT INTO sale_items (sale_id, product_id, product_name, quantity, unit_price, total_price)
+                VALUES (?, ?, ?, ?, ?, ?)
+            ''', items)
+            conn.executemany('''
+                INSERT INTO customer_transactions (customer_id, transaction_type, amount,
+                                                   description, reference_number, transaction_date)
+                VALUES (?, ?, ?, ?, ?, ?)
+            ''', postings)
+        sales.clear()
+        items.clear()
+        postings.clear()
+
+    average_lines = sum(LINES_PER_SALE) / 2
+    while lines < scale.sale_lines:
+        sale_id += 1
+        # Ids grow with the sale date, as they do at a real till
+        sale_date = start + timedelta(seconds=span * lines / scale.sale_lines)
+        sale_date += timedelta(seconds=rng.random() * span * average_lines / scale.sale_lines)
+        receipt_number = f'R{sale_id:0{receipt_numbers.RECEIPT_DIGITS}d}'
+
+        count = min(rng.randint(*LINES_PER_SALE), scale.sale_lines - lines)
+        subtotal = 0.0
+        for _ in range(count):
+            product_id = skewed(rng, scale.products)
+            quantity = rng.choice([1, 1, 1, 2, 3, 5, 10])
+            name, price = catalog[product_id]
+            total = round(quantity * price, 2)
+            subtotal += total
+            items.append((sale_id, product_id, name, quantity, price, total))
+        lines += count
+
+        subtotal = round(subtotal, 2)
+        discount = round(subtotal * 0.05, 2) if rng.random() < 0.1 else 0.0
+        total_amount = round(subtotal - discount, 2)
+        payment = round(total_amount + rng.choice([0, 0, 10, 50, 100]), 2)
+        customer_id = customer_name = None
+        if rng.random() < CUSTOMER_SALE_SHARE:
+            customer_id = skewed(rng, scale.customers)
+            customer_name = f'Customer {customer_id}'
+            iso_date = sale_date.isoformat()
+            postings.append((customer_id, 'SALE', total_amount, f'POS Sale - {count} items',
+                             receipt_number, iso_date))
+            if rng.random() < PAYMENT_SHARE:
+                paid = total_amount if rng.random() < 0.8 else round(total_amount / 2, 2)
+                postings.append((customer_id, 'PAYMENT', paid, 'Payment received', receipt_number,
+                                 (sale_date + timedelta(seconds=1)).isoformat()))
+        sales.append((sale_id, receipt_number, subtotal, discount, total_amount, payment,
+                      round(payment - total_amount, 2), sale_date.isoformat(),
+                      rng.choice(CASHIERS), customer_id, customer_name))
+
+        if len(items) >= CHUNK_ROWS:
+            flush()
+    if sales:
+        flush()
+
+    # Continue the default terminal's receipt sequence after the generated sales,
+    # logged as one fully used block so the gap audit stays clean
+    with connections.transaction() as conn:
+        conn.execute('INSERT OR REPLACE INTO receipt_sequences (terminal_id, next_value) VALUES (?, ?)',
+                     ('', sale_id + 1))
+        conn.execute('''
+            INSERT INTO receipt_number_blocks (terminal_id, first_value, last_value, last_used, released_date)
+            VALUES ('', 1, ?, ?, ?)
+        ''', (sale_id, sale_id, datetime.now().isoformat()))
+
+
+def insert_stock_movements(connections, scale, rng, start, span):
+    """Stock movements for random products, oldest first"""
+    def rows():
+        for i in range(scale.stock_movements):
+            movement_date = start + timedelta(seconds=span * (i + rng.random()) / scale.stock_movements)
+            kind = rng.random()
+            old_quantity = rng.randint(0, 500)
+            if kind < 0.7:
+                movement_type, change, reason = 'OUT', -rng.randint(1, 10), 'Sale'
+            elif kind < 0.95:
+                movement_type, change, reason = 'IN', rng.randint(10, 200), 'Purchase'
+            else:
+                movement_type, change, reason = 'ADJUSTMENT', rng.randint(-5, 5), 'Stock count'
+            yield (skewed(rng, scale.products), movement_type, change, old_quantity,
+                   old_quantity + change, reason, f'M{i + 1:09d}', movement_date.isoformat())
+
+    insert_chunked(connections, '''
+        INSERT INTO stock_movements (product_id, movement_type, quantity_change, old_quantity,
+                                     new_quantity, reason, reference_number, movement_date)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    ''', rows())
+
+
+def finish_derived_tables(connections):
+    """Customer balances and ledger running balances, sales rollups, summary and statistics"""
+    with connections.transaction() as conn:
+        cursor = conn.cursor()
+        signs = ' '.join(f"WHEN '{name}' THEN {sign}" for name, sign in customer_ledger.BALANCE_SIGNS.items())
+        balances = dict(cursor.execute(f'''
+            SELECT customer_id, SUM(CASE transaction_type {signs} ELSE 1 END * amount)
+            FROM customer_transactions GROUP BY customer_id
+        ''').fetchall())
+        purchases = cursor.execute('''
+            SELECT customer_id, SUM(total_amount), MAX(sale_date)
+            FROM sales WHERE customer_id IS NOT NULL GROUP BY customer_id
+        ''').fetchall()
+        cursor.executemany('''
+            UPDATE customers SET current_balance = ?, total_purchases = ?, last_purchase_date = ?
+            WHERE id = ?
+        ''', [(round(balances.get(customer_id) or 0, 2), total, last_date, customer_id)
+              for customer_id, total, last_date in purchases])
+        customer_ledger.backfill_balances(cursor)
+        sales_rollups.rebuild_rollups(cursor)
+        inventory_summary.rebuild_summary(cursor)
+        cursor.execute('ANALYZE')
+
+
+def populate(connections, scale, seed=12345, verbose=False):
+    """Fill a freshly migrated database with synthetic rows at the given scale"""
+    rng = random.Random(seed)
+    today = datetime.now().replace(microsecond=0)
+    start = today - timedelta(days=HISTORY_DAYS)
+    span = (today - start).total_seconds()
+
+    def timed(name, step, *args):
+        began = time.perf_counter()
+        result = step(*args)
+        if verbose:
+            print(f"  {name}: {time.perf_counter() - began:.1f} s")
+        return result
+
+    catalog = timed('catalog', insert_catalog, connections, scale, rng, today)
+    timed('customers', insert_customers, connections, scale, rng)
+    timed('sales', insert_sales, connections, scale, rng, catalog, start, span)
+    timed('stock movements', insert_stock_movements, connections, scale, rng, start, span)
+    timed('derived tables', finish_derived_tables, connections)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('path', help='database file to create (must not exist yet)')
+    for field in Scale._fields:
+        parser.add_argument(f"--{field.replace('_', '-')}", type=int, default=getattr(DEFAULT_SCALE, field),
+                            help=f"number of {field.replace('_', ' ')} (default {getattr(DEFAULT_SCALE, field)})")
+    parser.add_argument('--seed', type=int, default=12345, help='random seed (default 12345)')
+    args = parser.parse_args()
+
+    if os.path.exists(args.path):
+        sys.exit(f"Error: {args.path} already exists")
+
+    scale = Scale(*(getattr(args, field) for field in Scale._fields))
+    connections = connection_manager.get_connection_manager(args.path)
+    try:
+        migrations.migrate(connections)
+        print(f"Generating {', '.join(f'{value:,} {field}' for field, value in scale._asdict().items())}")
+        began = time.perf_counter()
+        populate(connections, scale, args.seed, verbose=True)
+        print(f"Done in {time.perf_counter() - began:.1f} s")
+    finally:
+        connections.close()
+
+
+if __name__ == '__main__':
+    main()